@@ -1,10 +1,22 @@
 from typing import Annotated
 
 from fastapi import Depends
+from pymongo.asynchronous.database import AsyncDatabase
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.common.dependencies import get_session, pagination_params
-from app.common.types import PaginationParamsType
+from app.common.dependencies import (
+    cursor_pagination_params,
+    get_mongo_database,
+    get_read_session,
+    get_session,
+    pagination_params,
+)
+from app.common.types import CursorPaginationParamsType, PaginationParamsType
 
 DatabaseSession = Annotated[AsyncSession, Depends(get_session)]
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+MongoDatabase = Annotated[AsyncDatabase, Depends(get_mongo_database)]
 PaginationParams = Annotated[PaginationParamsType, Depends(pagination_params)]
+CursorPaginationParams = Annotated[
+    CursorPaginationParamsType, Depends(cursor_pagination_params)
+]
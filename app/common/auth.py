@@ -1,13 +1,163 @@
+import asyncio
+import hashlib
+import math
+import time
+from contextlib import suppress
 from datetime import datetime, timedelta
+from uuid import uuid4
 
 import jwt
 from fastapi import HTTPException, status
 
+from app.common.cache import LocalCache
+from app.common.dependencies import get_redis_client
 from app.common.exceptions import Unauthorized
+from app.core.logger import get_logger
 from app.core.settings import get_settings
 
 # Globals
 settings = get_settings()
+logger = get_logger(__name__)
+
+# Constants
+TOKEN_REVOCATION_KEY = "auth:revoked"
+TOKEN_REVOCATION_CHANNEL = "auth:revoke"
+
+
+class BloomFilter:
+    """
+    Fixed size set membership filter, may answer false positives but never false negatives
+    """
+
+    def __init__(self, *, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str):
+        """
+        Add an item
+        """
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class TokenRevocationList:
+    """
+    Deny list of token ids (jti), shared by every worker through redis.
+
+    Revoked ids are stored in a redis sorted set scored by the token's expiry, and
+    mirrored in a local bloom filter kept up to date via pub/sub. Only ids the
+    filter flags (revoked ones and rare false positives) are confirmed with redis,
+    the happy path costs no round trip. The filter is rebuilt periodically to
+    drop expired ids and catch up on missed messages.
+    """
+
+    def __init__(self, *, capacity: int, error_rate: float, refresh_interval: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.bloom = BloomFilter(capacity=capacity, error_rate=error_rate)
+        self.task: asyncio.Task | None = None
+
+    async def load(self):
+        """
+        Rebuild the bloom filter from the unexpired revoked ids
+        """
+        redis_client = get_redis_client()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(TOKEN_REVOCATION_KEY, "-inf", time.time())
+            pipe.zrange(TOKEN_REVOCATION_KEY, 0, -1)
+            _, jtis = await pipe.execute()
+
+        bloom = BloomFilter(capacity=self.capacity, error_rate=self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self.bloom = bloom
+
+    async def _refresh(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.load()
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.warning("Token revocation list refresh error: %s", exc)
+
+    async def start(self):
+        """
+        Load the revoked ids and start the periodic rebuild
+        """
+        await self.load()
+        if self.task is None:
+            self.task = asyncio.create_task(self._refresh())
+
+    async def stop(self):
+        """
+        Stop the periodic rebuild
+        """
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def revoke(self, jti: str, expires_at: float):
+        """
+        Revoke a token id until the token expires
+
+        Args:
+            jti (str): The token id
+            expires_at (float): The token's expiry timestamp, the id is dropped after it
+        """
+        self.bloom.add(jti)
+        async with get_redis_client().pipeline(transaction=False) as pipe:
+            pipe.zadd(TOKEN_REVOCATION_KEY, {jti: expires_at})
+            pipe.publish(TOKEN_REVOCATION_CHANNEL, jti)
+            await pipe.execute()
+
+    async def is_revoked(self, jti: str) -> bool:
+        """
+        Check if a token id is revoked, only ids flagged by the bloom filter hit redis
+        """
+        if jti not in self.bloom:
+            return False
+
+        expires_at = await get_redis_client().zscore(TOKEN_REVOCATION_KEY, jti)
+        return expires_at is not None and expires_at > time.time()
+
+
+token_revocation_list = TokenRevocationList(
+    capacity=settings.AUTH_REVOCATION_CAPACITY,
+    error_rate=settings.AUTH_REVOCATION_ERROR_RATE,
+    refresh_interval=settings.AUTH_REVOCATION_REFRESH_INTERVAL,
+)
+
+
+async def handle_token_revocation(message: str):
+    """
+    Pub/sub handler adding the ids revoked by other workers to the bloom filter
+    """
+    token_revocation_list.bloom.add(message)
+
+
+def token_digest(token: str) -> str:
+    """
+    Key of a token in the verified token cache
+    """
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
 
 
 class TokenGenerator:
@@ -19,6 +169,13 @@ class TokenGenerator:
         self.secret_key = secret_key
         self.expire_in = expire_in
 
+        # Tokens already verified by this generator: (sub_head, ID, jti) by token digest
+        self.verified = LocalCache(
+            max_entries=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES,
+            max_bytes=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES * 1024,
+            max_ttl=expire_in * 60,
+        )
+
     async def generate(self, sub: str):
         """This method generates a JWT token.
 
@@ -45,6 +202,7 @@ class TokenGenerator:
             "iat": iat.timestamp(),
             "exp": expire.timestamp(),
             "iss": "behemoth.grandgale.tech",
+            "jti": uuid4().hex,
         }
         return jwt.encode(
             data,
@@ -52,20 +210,25 @@ class TokenGenerator:
             algorithm="HS256",
         )
 
-    async def verify(self, token: str, sub_head: str) -> str | None:
+    async def _verified(self, token: str) -> tuple[str, str, str | None]:
         """
-        Verifies the provided JWT token.
-
-        Args:
-            token (str): The JWT token to verify.
-            sub_head (str): Expected prefix of the 'sub' field in the token payload.
+        Verify a token, from the cache when it was already verified
 
         Returns:
-            str | None: The sub's ID if verification succeeds, or None if invalid.
+            tuple[str, str, str | None]: The head and ID of the 'sub' field and the token id
 
         Raises:
-            Unauthorized: If the token is invalid or expired.
+            Unauthorized: If the token is invalid, expired or revoked.
         """
+        digest = token_digest(token)
+        cached = self.verified.get(digest)
+        if cached is not None:
+            jti = cached[2]
+            if jti and await token_revocation_list.is_revoked(jti):
+                self.verified.delete(digest)
+                raise Unauthorized("Token has been revoked")
+            return cached
+
         try:
             # Decode and validate the token
             payload = jwt.decode(
@@ -85,14 +248,87 @@ class TokenGenerator:
 
             # Validate the 'sub' structure
             sub_parts = sub.split("-")
-            if sub_parts[0] != sub_head or len(sub_parts) < 2:
+            if len(sub_parts) < 2:
                 raise Unauthorized("Token 'sub' field structure is invalid")
 
-            # Return the ID part of 'sub'
-            return "".join(sub_parts[1:])
+            # Tokens issued before ids were added can't be revoked
+            jti: str | None = payload.get("jti")
+            if jti and await token_revocation_list.is_revoked(jti):
+                raise Unauthorized("Token has been revoked")
+
+            verified = (sub_parts[0], "".join(sub_parts[1:]), jti)
+            # Tokens without an expiry are cached for the longest time allowed
+            exp = payload.get("exp")
+            ttl = self.verified.max_ttl if exp is None else exp - time.time()
+            self.verified.set(digest, verified, ttl)
+            return verified
 
         except jwt.ExpiredSignatureError:
             raise Unauthorized("Token has expired")
 
         except jwt.PyJWTError:
             raise Unauthorized("Token verification failed")
+
+    async def verify(self, token: str, sub_head: str) -> str | None:
+        """
+        Verifies the provided JWT token.
+
+        Verified tokens are cached until they expire, so repeat requests skip the
+        signature check and claim parsing. Revoked tokens are rejected.
+
+        Args:
+            token (str): The JWT token to verify.
+            sub_head (str): Expected prefix of the 'sub' field in the token payload.
+
+        Returns:
+            str | None: The sub's ID if verification succeeds, or None if invalid.
+
+        Raises:
+            Unauthorized: If the token is invalid or expired.
+        """
+        head, sub_id, _ = await self._verified(token)
+        if head != sub_head:
+            raise Unauthorized("Token 'sub' field structure is invalid")
+        return sub_id
+
+    async def subject(self, token: str) -> str | None:
+        """
+        The 'sub' field of a valid, unrevoked token, None otherwise
+
+        Shares the verified token cache with `verify`, e.g to tell users apart
+        before the route's authentication runs (see `RateLimiter(by="user")`).
+        """
+        try:
+            head, sub_id, _ = await self._verified(token)
+        except Unauthorized:
+            return None
+        return f"{head}-{sub_id}"
+
+    async def revoke(self, token: str):
+        """
+        Revoke a token (e.g on logout) so it is rejected until it expires, by every worker
+
+        Args:
+            token (str): The JWT token to revoke
+
+        Raises:
+            Unauthorized: If the token is invalid, expired or has no id
+        """
+        try:
+            payload = jwt.decode(
+                jwt=token,
+                key=self.secret_key,
+                algorithms=["HS256"],
+            )
+        except jwt.ExpiredSignatureError:
+            raise Unauthorized("Token has expired")
+        except jwt.PyJWTError:
+            raise Unauthorized("Token verification failed")
+
+        jti: str | None = payload.get("jti")
+        if not jti:
+            raise Unauthorized("Token can't be revoked")
+
+        self.verified.delete(token_digest(token))
+        # Tokens without an expiry stay revoked
+        await token_revocation_list.revoke(jti, payload.get("exp", math.inf))
@@ -1,15 +1,51 @@
+import asyncio
 import hashlib
-import json
-from typing import Any, Generic, Type, TypeVar
+import math
+import random
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Sequence, Type, TypeVar
+from uuid import uuid4
 
-from fastapi.encoders import jsonable_encoder
 from logfire import info, instrument
+from redis.asyncio.client import Pipeline
 
-from app.common.dependencies import get_redis_client
+from app.common.codecs import CacheCodec, dumps_key
+from app.common.dependencies import get_binary_redis_client, get_redis_client
+from app.common.types import CacheBatchResultType
+from app.core.instrumentation import instrument_cache
+from app.core.settings import get_settings
+
+# Globals
+settings = get_settings()
 
 # Type vars
 T = TypeVar("T")
 
+# Constants
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+WORKER_ID = uuid4().hex
+LOCK_POLL_INTERVAL = 0.05
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+TAG_PREFIX = "cache:tag:"
+# Reads and drops a tag set atomically, only touches KEYS[1] so it also runs
+# on Redis Cluster (the member keys are deleted by the client)
+POP_TAG_SCRIPT = """
+local members = redis.call("SMEMBERS", KEYS[1])
+redis.call("DEL", KEYS[1])
+return members
+"""
+
+# In-flight loads per cache key (single-flight)
+_inflight: dict[str, asyncio.Task] = {}
+
 
 def generate_cache_key(data: dict, prefix: str) -> str:
     """
@@ -17,12 +53,250 @@ def generate_cache_key(data: dict, prefix: str) -> str:
     Handles non-JSON-serializable types like datetime.date, Decimal, etc.
     """
 
-    json_str = json.dumps(jsonable_encoder(data), sort_keys=True)
-    cache_hash = hashlib.sha256(json_str.encode()).hexdigest()
+    cache_hash = hashlib.blake2b(dumps_key(data), digest_size=16).hexdigest()
     cache_key = f"{prefix}{cache_hash}"
     return cache_key
 
 
+class FrequencySketch:
+    """
+    Count-min sketch used by the TinyLFU admission policy to estimate how often
+    a key has been requested recently.
+
+    Counters are halved every `sample_size` increments so old popularity fades out.
+    """
+
+    def __init__(self, width: int, depth: int = 4):
+        self.width = max(width, 16)
+        self.depth = depth
+        self.table = [[0] * self.width for _ in range(depth)]
+        self.sample_size = self.width * 10
+        self.additions = 0
+
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=self.depth * 4).digest()
+        for row in range(self.depth):
+            chunk = digest[row * 4 : (row + 1) * 4]
+            yield row, int.from_bytes(chunk, "little") % self.width
+
+    def increment(self, key: str):
+        """
+        Record an access to key
+        """
+        for row, index in self._indexes(key):
+            self.table[row][index] += 1
+
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.table = [[count >> 1 for count in row] for row in self.table]
+            self.additions //= 2
+
+    def estimate(self, key: str) -> int:
+        """
+        Estimate the access frequency of key
+        """
+        return min(self.table[row][index] for row, index in self._indexes(key))
+
+
+class LocalCache:
+    """
+    Bounded in-process (L1) cache that sits in front of redis.
+
+    Entries are evicted in LRU order once `max_entries` or `max_bytes` is reached,
+    with the `tinylfu` policy a new key is only admitted if it is requested more
+    often than the entry it would evict.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        max_bytes: int,
+        max_ttl: float,
+        policy: str = "lru",
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self.entries: OrderedDict[str, tuple[Any, float, int]] = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+        self.sketch = FrequencySketch(max_entries) if policy == "tinylfu" else None
+
+    def get(self, key: str) -> Any | None:
+        """
+        Get a value if present and not expired
+        """
+        if self.sketch:
+            self.sketch.increment(key)
+
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        """
+        Store a value for at most `ttl` seconds (capped at `max_ttl`)
+        """
+        size = sys.getsizeof(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        self.delete(key)
+
+        # TinyLFU admission: keep the victim if it is more popular than the newcomer
+        if self.sketch and self.entries and len(self.entries) >= self.max_entries:
+            victim = next(iter(self.entries))
+            if self.sketch.estimate(key) <= self.sketch.estimate(victim):
+                return
+
+        while self.entries and (
+            len(self.entries) >= self.max_entries or self.size + size > self.max_bytes
+        ):
+            _, (_, _, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+        expires_at = time.monotonic() + min(ttl, self.max_ttl)
+        self.entries[key] = (value, expires_at, size)
+        self.size += size
+
+    def delete(self, key: str):
+        """
+        Drop a key
+        """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def clear(self):
+        """
+        Drop every key
+        """
+        self.entries.clear()
+        self.size = 0
+
+
+local_cache = LocalCache(
+    max_entries=settings.CACHE_L1_MAX_ENTRIES,
+    max_bytes=settings.CACHE_L1_MAX_BYTES,
+    max_ttl=settings.CACHE_L1_MAX_TTL,
+    policy=settings.CACHE_L1_POLICY,
+)
+
+cache_codec = CacheCodec(
+    serializer=settings.CACHE_SERIALIZER,
+    compression=settings.CACHE_COMPRESSION,
+    min_size=settings.CACHE_COMPRESSION_MIN_SIZE,
+    level=settings.CACHE_COMPRESSION_LEVEL,
+)
+
+# Hit/miss counters per tier (per worker)
+cache_stats = {"l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0}
+
+
+def get_cache_stats() -> dict:
+    """
+    Get the hit/miss counters of both cache tiers and the L1 usage of this worker
+    """
+    return {
+        **cache_stats,
+        "l1_entries": len(local_cache.entries),
+        "l1_bytes": local_cache.size,
+        "l1_evictions": local_cache.evictions,
+    }
+
+
+async def handle_cache_invalidation(message: str):
+    """
+    Pub/sub handler dropping the L1 entries of keys changed by another worker.
+
+    Messages are formatted as `<worker id>:<cache key>[\n<cache key>...]`.
+    """
+    origin, _, cache_keys = message.partition(":")
+    if origin != WORKER_ID:
+        for cache_key in cache_keys.split("\n"):
+            local_cache.delete(cache_key)
+
+
+def tag_key(tag: str) -> str:
+    """
+    Redis key of the set holding the cache keys of a tag
+    """
+    return f"{TAG_PREFIX}{tag}"
+
+
+def add_to_tags(pipe: Pipeline, tags: Sequence[str], cache_key: str, ttl: int):
+    """
+    Queue the commands registering a cache key under tags on a pipeline.
+
+    A tag set lives as long as its longest lived key.
+    """
+    for tag in tags:
+        key = tag_key(tag)
+        pipe.sadd(key, cache_key)
+        pipe.expire(key, ttl, nx=True)
+        pipe.expire(key, ttl, gt=True)
+
+
+@instrument("Invalidate cache tags")
+async def invalidate_tags(*tags: str) -> int:
+    """
+    Delete every cache entry tagged with any of `tags`, in every worker's L1 too.
+
+    Args:
+        *tags (str): The tags e.g "model:users", "model:users:42"
+
+    Returns:
+        int: The number of invalidated keys
+    """
+    if not tags:
+        return 0
+
+    redis_client = get_redis_client()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for tag in tags:
+            pipe.eval(POP_TAG_SCRIPT, 1, tag_key(tag))
+        members = await pipe.execute()
+
+    # One command per key, the keys of a tag may live on different cluster slots
+    deleted = list(dict.fromkeys(key for keys in members for key in keys))
+    if deleted:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for cache_key in deleted:
+                pipe.unlink(cache_key)
+            await pipe.execute()
+
+        for cache_key in deleted:
+            local_cache.delete(cache_key)
+
+        await redis_client.publish(
+            CACHE_INVALIDATION_CHANNEL, f"{WORKER_ID}:" + "\n".join(deleted)
+        )
+
+    info(f"Invalidated {len(deleted)} keys for tags: {tags}")
+    return len(deleted)
+
+
+def _load_done(cache_key: str, task: asyncio.Task):
+    """
+    Done callback of single-flight load tasks
+    """
+    _inflight.pop(cache_key, None)
+
+    # Retrieve the exception so background refresh failures are not reported as unhandled
+    if not task.cancelled() and task.exception() is not None:
+        info(f"Cache load failed for key {cache_key}: {task.exception()}")
+
+
 class CacheManager(Generic[T]):
     """
     Generic cache manager for Redis-backed caching.
@@ -32,23 +306,92 @@ class CacheManager(Generic[T]):
         self,
         ttl: int,
         cache_prefix: str,
-        data: dict,
-        model_class: Type[T] | None = None,
+        data: dict | None = None,
+        model_class: Type[T] | Any | None = None,
+        local: bool = False,
+        codec: CacheCodec | None = None,
+        tags: Sequence[str] = (),
     ):
         """
         Initialize the cache manager.
 
         Args:
             ttl: Time-to-live for cached items in seconds
-            model_class: (optional) Pydantic or dataclass type for decoding cached data
+            model_class: (optional) Pydantic or dataclass type (or type hint e.g list[Model]) for decoding cached data
             cache_prefix: The cache prefix
-            data: Dictionary containing the data to generate cache key from
+            data: Dictionary containing the data to generate cache key from (not needed for batch operations)
+            local: (optional) Keep a copy in the in-process L1 cache, invalidated across workers via pub/sub
+            codec: (optional) Codec used to encode/decode values, defaults to the one configured in settings
+            tags: (optional) Tags the cached entries depend on, see `invalidate_tags`
         """
-        self.redis_client = get_redis_client()
+        self.redis_client = get_binary_redis_client()
         self.ttl = ttl
         self.model_class = model_class
         self.cache_prefix = cache_prefix
         self.data = data
+        self.local = local
+        self.codec = codec or cache_codec
+        self.tags = tags
+
+    def _decode(self, cached_data: bytes) -> T:
+        # If model_class is provided, parse into that model
+        return self.codec.decode(cached_data, self.model_class)
+
+    @instrument_cache
+    async def _read(self, cache_key: str) -> Any | None:
+        """
+        Read the raw cached data, from L1 first when enabled
+        """
+        if self.local:
+            cached_data = local_cache.get(cache_key)
+            if cached_data is not None:
+                cache_stats["l1_hits"] += 1
+                info(f"L1 cache hit for key: {cache_key}")
+                return cached_data
+
+            cache_stats["l1_misses"] += 1
+
+            # Fetch the remaining TTL in the same round trip so L1 never outlives redis
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                cached_data, pttl = await pipe.get(cache_key).pttl(cache_key).execute()
+        else:
+            cached_data = await self.redis_client.get(cache_key)
+
+        if not cached_data:
+            cache_stats["l2_misses"] += 1
+            info(f"Cache miss for key: {cache_key}")
+            return None
+
+        cache_stats["l2_hits"] += 1
+        info(f"Cache hit for key: {cache_key}")
+
+        if self.local:
+            # A negative PTTL means the key has no expiry
+            local_ttl = pttl / 1000 if pttl > 0 else local_cache.max_ttl
+            local_cache.set(cache_key, cached_data, local_ttl)
+
+        return cached_data
+
+    @instrument_cache
+    async def _write(self, cache_key: str, encoded_data: Any, ttl: int):
+        """
+        Write the raw encoded data, to L1 too when enabled.
+
+        The invalidation is published even when this manager is not `local`: another
+        manager of the same key may keep it in the L1 cache of any worker.
+        """
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.setex(cache_key, ttl, encoded_data)
+            add_to_tags(pipe, self.tags, cache_key, ttl)
+            pipe.publish(CACHE_INVALIDATION_CHANNEL, f"{WORKER_ID}:{cache_key}")
+            await pipe.execute()
+
+        if self.local:
+            local_cache.set(cache_key, encoded_data, ttl)
+        else:
+            local_cache.delete(cache_key)
+
+        info(f"Cache key {cache_key} set with TTL {ttl}")
 
     @instrument("Get cached data from Redis")
     async def get(self) -> T | None:
@@ -61,19 +404,11 @@ class CacheManager(Generic[T]):
         cache_key = generate_cache_key(self.data, self.cache_prefix)
         info(f"Looking for cache key: {cache_key}")
 
-        cached_data = await self.redis_client.get(cache_key)
-        if not cached_data:
-            info(f"Cache miss for key: {cache_key}")
+        cached_data = await self._read(cache_key)
+        if cached_data is None:
             return None
 
-        info(f"Cache hit for key: {cache_key}")
-        data = json.loads(cached_data)
-
-        # If model_class is provided, parse into that model
-        if self.model_class:
-            return self.model_class(**data)
-
-        return data  # type: ignore
+        return self._decode(cached_data)
 
     @instrument("Set cached data in Redis")
     async def set(
@@ -84,13 +419,250 @@ class CacheManager(Generic[T]):
         Cache data in Redis.
 
         Args:
-            value: The value to cache (will be JSON-encoded)
+            value: The value to cache (will be encoded with the codec)
         """
         cache_key = generate_cache_key(self.data, self.cache_prefix)
         info(f"Setting cache key: {cache_key}")
 
-        encoded_data = json.dumps(jsonable_encoder(value))
+        encoded_data = self.codec.encode(value)
+        await self._write(cache_key, encoded_data, self.ttl)
+
+    @instrument("Delete cached data from Redis")
+    @instrument_cache
+    async def delete(self):
+        """
+        Delete the cached data from Redis (and from the L1 cache of every worker)
+        """
+        cache_key = generate_cache_key(self.data, self.cache_prefix)
+        info(f"Deleting cache key: {cache_key}")
+
+        local_cache.delete(cache_key)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.delete(cache_key)
+            pipe.publish(CACHE_INVALIDATION_CHANNEL, f"{WORKER_ID}:{cache_key}")
+            await pipe.execute()
+
+    @instrument("Get many cached data from Redis")
+    @instrument_cache
+    async def get_many(self, items: Sequence[dict]) -> CacheBatchResultType[T]:
+        """
+        Get the cached data of many items in a single round trip (MGET).
+
+        Args:
+            items: Dictionaries containing the data to generate each cache key from
+
+        Returns:
+            CacheBatchResultType: The decoded hits and the indexes of the missing items,
+                so the caller can load every miss at once
+        """
+        cache_keys = [generate_cache_key(item, self.cache_prefix) for item in items]
+        hits: dict[int, T] = {}
+        pending: list[int] = []
+
+        for index, cache_key in enumerate(cache_keys):
+            cached_data = local_cache.get(cache_key) if self.local else None
+            if cached_data is not None:
+                hits[index] = self._decode(cached_data)
+            else:
+                pending.append(index)
+
+        if self.local:
+            cache_stats["l1_hits"] += len(hits)
+            cache_stats["l1_misses"] += len(pending)
+
+        if not pending:
+            return CacheBatchResultType(hits=hits, misses=[])
+
+        pending_keys = [cache_keys[index] for index in pending]
+        if self.local:
+            # Fetch the remaining TTLs in the same round trip so L1 never outlives redis
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.mget(pending_keys)
+                for cache_key in pending_keys:
+                    pipe.pttl(cache_key)
+                values, *pttls = await pipe.execute()
+        else:
+            values = await self.redis_client.mget(pending_keys)
+
+        misses: list[int] = []
+        for position, (index, cached_data) in enumerate(zip(pending, values)):
+            if cached_data is None:
+                misses.append(index)
+                continue
+
+            hits[index] = self._decode(cached_data)
+            if self.local:
+                pttl = pttls[position]
+                local_ttl = pttl / 1000 if pttl > 0 else local_cache.max_ttl
+                local_cache.set(cache_keys[index], cached_data, local_ttl)
+
+        cache_stats["l2_hits"] += len(pending) - len(misses)
+        cache_stats["l2_misses"] += len(misses)
+        info(
+            f"Cache lookup of {len(items)} keys: {len(hits)} hits, {len(misses)} misses"
+        )
+
+        return CacheBatchResultType(hits=hits, misses=misses)
+
+    @instrument("Set many cached data in Redis")
+    @instrument_cache
+    async def set_many(self, entries: Sequence[tuple]):
+        """
+        Cache the data of many items with one pipelined SETEX batch.
+
+        Args:
+            entries: `(data, value)` or `(data, value, ttl)` tuples, `data` generates the
+                cache key and `ttl` overrides the manager TTL for that item
+        """
+        if not entries:
+            return
+
+        cache_keys = []
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for data, value, *ttl in entries:
+                cache_key = generate_cache_key(data, self.cache_prefix)
+                item_ttl = ttl[0] if ttl else self.ttl
+                encoded_data = self.codec.encode(value)
+
+                pipe.setex(cache_key, item_ttl, encoded_data)
+                add_to_tags(pipe, self.tags, cache_key, item_ttl)
+                cache_keys.append(cache_key)
+                if self.local:
+                    local_cache.set(cache_key, encoded_data, item_ttl)
+                else:
+                    local_cache.delete(cache_key)
+
+            # One invalidation message for the whole batch, see `_write`
+            pipe.publish(
+                CACHE_INVALIDATION_CHANNEL, f"{WORKER_ID}:" + "\n".join(cache_keys)
+            )
+            await pipe.execute()
+
+        info(f"Cached {len(entries)} keys")
+
+    @instrument("Get or set cached data in Redis")
+    async def get_or_set(
+        self,
+        loader: Callable[[], Awaitable[Any]],
+        *,
+        stale_ttl: int = 0,
+        beta: float = 1.0,
+        lock: bool = False,
+        lock_timeout: float = 5,
+    ) -> T | Any:
+        """
+        Get cached data, calling `loader` to compute and cache it on a miss.
+
+        Concurrent misses for the same key in this worker share a single `loader` call.
+        Entries are stored with the time it took to compute them so that they are
+        refreshed probabilistically before they expire (XFetch), the closer to expiry
+        and the slower the loader, the likelier the early refresh.
+
+        NOTE: entries are stored in an envelope, keys written with `get_or_set`
+        must only be read with `get_or_set`.
+
+        NOTE: early and stale refreshes call `loader` in the background, after the
+        request may have returned. Loaders must not capture request-scoped objects
+        such as the route's `AsyncSession`, they should open their own session
+        (e.g `async with AsyncSessionLocal() as session`).
+
+        Args:
+            loader: Coroutine function computing the value on a miss
+            stale_ttl: (optional) Seconds an expired value may still be served while
+                a background task refreshes it
+            beta: (optional) XFetch aggressiveness, 0 disables early refresh
+            lock: (optional) Hold a redis lock while computing so only one worker
+                calls `loader` at a time for this key
+            lock_timeout: (optional) Max seconds the lock is held or waited for
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        cache_key = generate_cache_key(self.data, self.cache_prefix)
+        info(f"Looking for cache key: {cache_key}")
+
+        cached_data = await self._read(cache_key)
+        if cached_data is not None:
+            envelope = self.codec.loads(cached_data)
+            value = self.codec.convert(envelope["v"], self.model_class)
+            now = time.time()
+
+            # XFetch: recompute early with a probability growing as expiry approaches
+            early = now - envelope["d"] * beta * math.log(random.random() or 1e-12)
+            if early < envelope["e"]:
+                return value
+
+            # Still valid (early refresh) or expired but within the stale window
+            if now < envelope["e"] or stale_ttl:
+                info(f"Refreshing cache key in the background: {cache_key}")
+                self._single_flight(cache_key, loader, stale_ttl, lock, lock_timeout)
+                return value
+
+        return await asyncio.shield(
+            self._single_flight(cache_key, loader, stale_ttl, lock, lock_timeout)
+        )
+
+    def _single_flight(
+        self,
+        cache_key: str,
+        loader: Callable[[], Awaitable[Any]],
+        stale_ttl: int,
+        lock: bool,
+        lock_timeout: float,
+    ) -> asyncio.Task:
+        """
+        Get the in-flight load task of a key, starting one if there is none
+        """
+        task = _inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(
+                self._load(cache_key, loader, stale_ttl, lock, lock_timeout)
+            )
+            _inflight[cache_key] = task
+            task.add_done_callback(lambda done: _load_done(cache_key, done))
+        return task
+
+    async def _load(
+        self,
+        cache_key: str,
+        loader: Callable[[], Awaitable[Any]],
+        stale_ttl: int,
+        lock: bool,
+        lock_timeout: float,
+    ) -> Any:
+        """
+        Call the loader and store its result in an envelope with its compute time
+        """
+        lock_key = f"{cache_key}:lock"
+        token = uuid4().hex
+
+        if lock and not await self.redis_client.set(
+            lock_key, token, nx=True, px=int(lock_timeout * 1000)
+        ):
+            # Another worker is computing the value, wait for it to land
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                cached_data = await self.redis_client.get(cache_key)
+                if cached_data is not None:
+                    envelope = self.codec.loads(cached_data)
+                    if envelope["e"] > time.time():
+                        return self.codec.convert(envelope["v"], self.model_class)
+
+            info(f"Timed out waiting for the lock of cache key: {cache_key}")
+            lock = False
+
+        try:
+            start = time.monotonic()
+            value = await loader()
+            delta = time.monotonic() - start
 
-        await self.redis_client.setex(cache_key, self.ttl, encoded_data)
+            envelope = {"v": value, "d": delta, "e": time.time() + self.ttl}
+            encoded_data = self.codec.encode(envelope)
+            await self._write(cache_key, encoded_data, self.ttl + stale_ttl)
+        finally:
+            if lock:
+                await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
 
-        info(f"Cache key {cache_key} set with TTL {self.ttl}")
+        # Same type as a hit (e.g a model rather than the ORM object the loader returned)
+        return self.codec.convert(self.codec.loads(encoded_data)["v"], self.model_class)
@@ -0,0 +1,183 @@
+from functools import lru_cache
+from typing import Any, Literal
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from pydantic_core import PydanticSerializationError, to_jsonable_python
+
+# Optional dependencies
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+# Constants
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+ORJSON_KEY_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+# Frame header, the first byte of every encoded value tells how the rest was encoded
+# so entries stay readable when the codec settings change
+RAW = 0x00
+ZSTD = 0x01
+LZ4 = 0x02
+COMPRESSION_MASK = 0x03
+MSGPACK = 0x04
+
+
+def default_encoder(obj: Any) -> Any:
+    """
+    Fallback for the types orjson/msgpack can't serialize natively (pydantic models, Decimal...)
+    """
+    try:
+        return to_jsonable_python(obj)
+    except PydanticSerializationError:
+        return jsonable_encoder(obj)
+
+
+@lru_cache(maxsize=512)
+def get_type_adapter(tp: Any) -> TypeAdapter:
+    """
+    Get the (cached) TypeAdapter of a type, building its validator is the expensive part
+
+    Args:
+        tp (Any): A pydantic model, dataclass or any type hint e.g list[Model]
+
+    Returns:
+        TypeAdapter: The type adapter
+    """
+    return TypeAdapter(tp)
+
+
+def dumps_key(data: Any) -> bytes:
+    """
+    Deterministic serialization of cache key data (sorted keys)
+    """
+    return orjson.dumps(data, default=default_encoder, option=ORJSON_KEY_OPTIONS)
+
+
+class CacheCodec:
+    """
+    Serializes cache values to bytes and back.
+
+    Values are serialized with orjson (or msgpack) and compressed with zstd/lz4 once
+    they are bigger than `min_size`. Decoding into a type goes through a cached
+    pydantic TypeAdapter, straight from the JSON bytes when possible.
+    """
+
+    def __init__(
+        self,
+        *,
+        serializer: Literal["orjson", "msgpack"] = "orjson",
+        compression: Literal["none", "zstd", "lz4"] = "none",
+        min_size: int = 1024,
+        level: int = 3,
+    ):
+        if serializer == "msgpack" and msgpack is None:
+            raise ImportError(
+                "The msgpack cache serializer requires 'msgpack' (uv sync --extra msgpack)"
+            )
+        if compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "The zstd cache compression requires 'zstandard' (uv sync --extra zstd)"
+            )
+        if compression == "lz4" and lz4_frame is None:
+            raise ImportError(
+                "The lz4 cache compression requires 'lz4' (uv sync --extra lz4)"
+            )
+
+        self.serializer = serializer
+        self.compression = compression
+        self.min_size = min_size
+        self.level = level
+
+        if compression == "zstd":
+            self._zstd_compressor = zstandard.ZstdCompressor(level=level)
+
+    def _compress(self, data: bytes) -> tuple[int, bytes]:
+        if self.compression == "none" or len(data) < self.min_size:
+            return RAW, data
+        if self.compression == "zstd":
+            return ZSTD, self._zstd_compressor.compress(data)
+        return LZ4, lz4_frame.compress(data, compression_level=self.level)
+
+    def _unpack(self, data: bytes) -> tuple[bool, bytes]:
+        header, payload = data[0], data[1:]
+        compression = header & COMPRESSION_MASK
+        if compression == ZSTD:
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif compression == LZ4:
+            payload = lz4_frame.decompress(payload)
+        return bool(header & MSGPACK), payload
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Serialize (and compress) a value
+
+        Args:
+            value (Any): The value, pydantic models, dataclasses, datetimes etc are supported
+
+        Returns:
+            bytes: The encoded value
+        """
+        if self.serializer == "msgpack":
+            header, payload = self._compress(
+                msgpack.packb(value, default=default_encoder)
+            )
+            header |= MSGPACK
+        else:
+            header, payload = self._compress(
+                orjson.dumps(value, default=default_encoder, option=ORJSON_OPTIONS)
+            )
+
+        return bytes((header,)) + payload
+
+    def loads(self, data: bytes) -> Any:
+        """
+        Decode bytes into python primitives
+        """
+        is_msgpack, payload = self._unpack(data)
+        if is_msgpack:
+            return msgpack.unpackb(payload, strict_map_key=False)
+        return orjson.loads(payload)
+
+    def decode(self, data: bytes, model_class: Any | None = None) -> Any:
+        """
+        Decode bytes, validating into `model_class` if given
+
+        Args:
+            data (bytes): The encoded value
+            model_class (Any | None): The type to validate into e.g Model or list[Model]
+
+        Returns:
+            Any: The decoded value
+        """
+        if model_class is None:
+            return self.loads(data)
+
+        is_msgpack, payload = self._unpack(data)
+        if is_msgpack:
+            return get_type_adapter(model_class).validate_python(
+                msgpack.unpackb(payload, strict_map_key=False)
+            )
+
+        # Validate straight from the JSON bytes, no intermediate dict
+        return get_type_adapter(model_class).validate_json(payload)
+
+    def convert(self, obj: Any, model_class: Any | None = None) -> Any:
+        """
+        Validate already decoded primitives into `model_class` if given
+        """
+        if model_class is None:
+            return obj
+        return get_type_adapter(model_class).validate_python(obj)
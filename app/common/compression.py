@@ -0,0 +1,188 @@
+import zlib
+from functools import lru_cache
+from typing import Sequence
+
+from app.core.settings import get_settings
+
+# Optional dependencies
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# Globals
+settings = get_settings()
+
+# Constants
+# Content types that are already compressed, compressing them again is wasted CPU
+SKIP_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/pdf",
+    "application/octet-stream",
+    "text/event-stream",
+)
+# ...except these
+COMPRESSIBLE_CONTENT_TYPES = ("image/svg+xml",)
+
+
+def configured_encodings() -> tuple[str, ...]:
+    """
+    The encodings of `COMPRESSION_ENCODINGS`, in order of preference
+    """
+    return tuple(
+        encoding.strip()
+        for encoding in settings.COMPRESSION_ENCODINGS.split(",")
+        if encoding.strip()
+    )
+
+
+def available_encodings() -> tuple[str, ...]:
+    """
+    The configured encodings (in order of preference) whose library is installed
+    """
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return tuple(
+        encoding for encoding in configured_encodings() if installed.get(encoding)
+    )
+
+
+def missing_encodings() -> tuple[str, ...]:
+    """
+    The configured encodings that can't be used (unknown or library not installed)
+    """
+    available = available_encodings()
+    return tuple(
+        encoding for encoding in configured_encodings() if encoding not in available
+    )
+
+
+def compression_level(encoding: str) -> int:
+    """
+    The configured compression level of an encoding
+    """
+    return {
+        "br": settings.COMPRESSION_BR_LEVEL,
+        "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+        "gzip": settings.COMPRESSION_GZIP_LEVEL,
+    }[encoding]
+
+
+def compression_min_size(encoding: str) -> int:
+    """
+    The configured size (bytes) from which responses are compressed with an encoding
+    """
+    return {
+        "br": settings.COMPRESSION_BR_MIN_SIZE,
+        "zstd": settings.COMPRESSION_ZSTD_MIN_SIZE,
+        "gzip": settings.COMPRESSION_GZIP_MIN_SIZE,
+    }[encoding]
+
+
+def is_compressible(content_type: str | None) -> bool:
+    """
+    Check if a content type is worth compressing
+    """
+    if not content_type:
+        return True
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_CONTENT_TYPES) or not (
+        content_type.startswith(SKIP_CONTENT_TYPES)
+    )
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: str, encodings: Sequence[str]) -> str | None:
+    """
+    Pick the encoding of a response from the request's Accept-Encoding header
+
+    Args:
+        accept_encoding (str): The Accept-Encoding header e.g "gzip, deflate, br;q=0.9"
+        encodings (Sequence[str]): The available encodings, in order of preference
+
+    Returns:
+        str | None: The encoding with the highest q-value (ties broken by preference), None for identity
+    """
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip()] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str, level: int | None = None) -> bytes:
+    """
+    Compress a whole body
+    """
+    level = compression_level(encoding) if level is None else level
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, level, wbits=16 + zlib.MAX_WBITS)
+
+
+class StreamCompressor:
+    """
+    Incremental compressor of a streamed body, every chunk is flushed so the
+    client receives it right away
+    """
+
+    def __init__(self, encoding: str, level: int | None = None):
+        level = compression_level(encoding) if level is None else level
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=level)
+        elif encoding == "zstd":
+            self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            self.compressor = zlib.compressobj(
+                level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compress and flush a chunk
+        """
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        if self.encoding == "zstd":
+            return self.compressor.compress(data) + self.compressor.flush(
+                zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """
+        Compress the last chunk and end the stream
+        """
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.finish()
+        return self.compressor.compress(data) + self.compressor.flush()
@@ -1,24 +1,99 @@
 # type: ignore
+import asyncio
 from typing import Generic, Type, TypeVar
 
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.asynchronous.collection import AsyncCollection
 from pymongo.collection import Collection
+from redis.exceptions import RedisError
+from sqlalchemy import delete, insert, inspect, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.common.cache import invalidate_tags
+from app.common.codecs import get_type_adapter
+from app.core.logger import get_logger
+
+# Globals
+logger = get_logger(__name__)
+
 # Types
 T = TypeVar("T")
 P = TypeVar("P")
 
+# Constants
+BULK_BATCH_SIZE = 1000
+# Bind parameters per statement accepted by Postgres (asyncpg)
+MAX_BIND_PARAMS = 32767
+STREAM_YIELD_PER = 1000
+
+
+def chunked(items: list, size: int):
+    """
+    Split a list in chunks of at most `size` items
+    """
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def model_tag(model) -> str:
+    """
+    Cache tag of every entry depending on a model (e.g lists)
+    """
+    return f"model:{model.__tablename__}"
+
+
+def row_tag(model, obj_or_pk) -> str:
+    """
+    Cache tag of every entry depending on a single row, from the row or its primary key
+    """
+    if isinstance(obj_or_pk, model):
+        obj_or_pk = inspect(obj_or_pk).identity
+    if isinstance(obj_or_pk, tuple):
+        obj_or_pk = ",".join(str(part) for part in obj_or_pk)
+    return f"{model_tag(model)}:{obj_or_pk}"
+
 
 class CRUDBase(Generic[T]):
     """
     CRUD object with default methods to Create, Read, Update, Delete (CRUD).
     """
 
-    def __init__(self, model: Type[T], db: AsyncSession):
+    batch_size = BULK_BATCH_SIZE
+    yield_per = STREAM_YIELD_PER
+
+    def __init__(
+        self, model: Type[T], db: AsyncSession, invalidate_cache: bool = False
+    ):
+        """
+        Args:
+            model: The SQLAlchemy model
+            db: The database session
+            invalidate_cache: (optional) Invalidate the model's (and written rows') cache tags on writes
+        """
         self.model = model
         self.db = db
+        self.invalidate_cache = invalidate_cache
+
+    async def _invalidate(self, *objs):
+        """
+        Invalidate the cache tags of the model and the given rows.
+
+        Runs after the commit, a redis failure is logged rather than failing a
+        write that already succeeded (entries then live until their TTL).
+        """
+        if not self.invalidate_cache:
+            return
+
+        tags = (model_tag(self.model), *(row_tag(self.model, obj) for obj in objs))
+        try:
+            await invalidate_tags(*tags)
+        except (RedisError, OSError, asyncio.TimeoutError) as exc:
+            logger.error(
+                "Cache invalidation failed after a write: %s", exc, extra={"tags": tags}
+            )
 
     async def create(self, *, data: dict):
         """
@@ -28,6 +103,7 @@ class CRUDBase(Generic[T]):
         self.db.add(db_obj)
         await self.db.commit()
         await self.db.refresh(db_obj)
+        await self._invalidate(db_obj)
 
         return db_obj
 
@@ -38,6 +114,20 @@ class CRUDBase(Generic[T]):
         obj = await self.db.execute(select(self.model).filter_by(**kwargs))
         return obj.scalars().first()
 
+    async def get_in(self, *, field: str, values: list, batch_size: int | None = None):
+        """
+        Retrieve the objects whose `field` is in values, with WHERE field IN (...) queries
+
+        Returns:
+            list[T]: The matching objects, in no particular order
+        """
+        column = getattr(self.model, field)
+        objs = []
+        for chunk in chunked(values, batch_size or self.batch_size):
+            result = await self.db.execute(select(self.model).where(column.in_(chunk)))
+            objs.extend(result.scalars().all())
+        return objs
+
     async def get_all(self, return_qs: bool = False):
         """
         Get all objects
@@ -48,13 +138,193 @@ class CRUDBase(Generic[T]):
         result = await self.db.execute(qs)
         return result.scalars().all()
 
+    async def stream(self, *, qs=None, yield_per: int | None = None):
+        """
+        Iterate over objects with a server-side cursor, `yield_per` rows are
+        fetched (and held in memory) at a time
+
+        NOTE: the session must stay open while iterating, when streaming a response
+        open the session inside the generator rather than using the route's session
+        """
+        qs = select(self.model) if qs is None else qs
+        result = await self.db.stream_scalars(
+            qs.execution_options(yield_per=yield_per or self.yield_per)
+        )
+        async for obj in result:
+            yield obj
+
+    async def update(self, *, obj: T, data: dict):
+        """
+        Update object
+        """
+        for field, value in data.items():
+            setattr(obj, field, value)
+        await self.db.commit()
+        await self.db.refresh(obj)
+        await self._invalidate(obj)
+
+        return obj
+
+    async def delete(self, *, obj: T):
+        """
+        Delete object
+        """
+        await self.db.delete(obj)
+        await self.db.commit()
+        await self._invalidate(obj)
+
+    def _returning(self, stmt, returning: bool):
+        """
+        Return the rows when asked, else only the primary keys if they are needed for cache invalidation
+        """
+        if returning:
+            return stmt.returning(self.model)
+        if self.invalidate_cache:
+            return stmt.returning(*inspect(self.model).primary_key)
+        return stmt
+
+    async def _run_bulk(self, stmt, returning: bool, params: list | None = None):
+        """
+        Execute a bulk statement, returning the ORM rows (or the affected row count)
+        """
+        stmt = self._returning(stmt, returning)
+        result = await self.db.execute(
+            stmt, params, execution_options={"populate_existing": True}
+        )
+
+        if returning:
+            return list(result.scalars().all())
+        if self.invalidate_cache:
+            return [tuple(row) for row in result.all()]
+
+        # executemany (INSERT with params) doesn't report a reliable row count
+        return len(params) if params is not None else result.rowcount
+
+    async def _finish_bulk(self, results: list, returning: bool):
+        """
+        Commit a bulk operation and invalidate the touched rows
+        """
+        await self.db.commit()
+
+        if returning or self.invalidate_cache:
+            rows = [row for chunk in results for row in chunk]
+            await self._invalidate(*rows)
+            return rows if returning else len(rows)
+
+        return sum(results)
+
+    async def create_many(
+        self, *, data: list[dict], returning: bool = True, batch_size: int | None = None
+    ):
+        """
+        Create objects with multi-row INSERT ... RETURNING statements, in one transaction
+
+        Args:
+            data (list[dict]): The objects' data
+            returning (bool): Return the created objects, False skips fetching them back
+            batch_size (int | None): Max rows per statement
+
+        Returns:
+            list[T] | int: The created objects or the number of created rows
+        """
+        results = [
+            await self._run_bulk(insert(self.model), returning, chunk)
+            for chunk in chunked(data, batch_size or self.batch_size)
+        ]
+        return await self._finish_bulk(results, returning)
+
+    async def upsert_many(
+        self,
+        *,
+        data: list[dict],
+        index_elements: list[str],
+        update_fields: list[str] | None = None,
+        returning: bool = True,
+        batch_size: int | None = None,
+    ):
+        """
+        Insert objects or update them on conflict (Postgres INSERT ... ON CONFLICT DO UPDATE)
+
+        Args:
+            data (list[dict]): The objects' data
+            index_elements (list[str]): The columns of the unique constraint to detect conflicts on
+            update_fields (list[str] | None): The columns to update on conflict (among the ones each row carries), defaults to every given column of the row
+            returning (bool): Return the upserted objects, False skips fetching them back
+            batch_size (int | None): Max rows per statement, lowered to fit the bind parameter limit
+
+        Returns:
+            list[T] | int: The upserted objects or the number of upserted rows
+        """
+        # Rows carrying different columns go in different statements, a multi-row
+        # VALUES only takes the columns of its first row
+        groups: dict[tuple, list[dict]] = {}
+        for row in data:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        results = []
+        for columns, rows in groups.items():
+            # Only update the columns the rows carry, excluded.<column> of a
+            # column missing from the VALUES is its default (NULL) and would wipe it
+            fields = [
+                field
+                for field in (update_fields or columns)
+                if field in columns and field not in index_elements
+            ]
+            # Every row binds one parameter per column
+            size = max(
+                1,
+                min(
+                    batch_size or self.batch_size,
+                    MAX_BIND_PARAMS // max(len(columns), 1),
+                ),
+            )
+            for chunk in chunked(rows, size):
+                stmt = pg_insert(self.model).values(chunk)
+                if fields:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=index_elements,
+                        set_={field: stmt.excluded[field] for field in fields},
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+                results.append(await self._run_bulk(stmt, returning))
+
+        return await self._finish_bulk(results, returning)
+
+    async def update_where(self, *, filters: dict, data: dict, returning: bool = True):
+        """
+        Update every object matching filters with a single UPDATE ... RETURNING
+
+        Returns:
+            list[T] | int: The updated objects or the number of updated rows
+        """
+        stmt = update(self.model).filter_by(**filters).values(**data)
+        return await self._finish_bulk(
+            [await self._run_bulk(stmt, returning)], returning
+        )
+
+    async def delete_where(self, *, filters: dict, returning: bool = False):
+        """
+        Delete every object matching filters with a single DELETE (... RETURNING)
+
+        Returns:
+            list[T] | int: The deleted objects or the number of deleted rows
+        """
+        stmt = delete(self.model).filter_by(**filters)
+        return await self._finish_bulk(
+            [await self._run_bulk(stmt, returning)], returning
+        )
+
 
 class MongoCRUDBase(Generic[P]):
     """
     CRUD base class for MongoDB using Pymongo and Pydantic
+
+    NOTE: pymongo's sync collection blocks the event loop, use AsyncMongoCRUDBase in async routes
     """
 
-    def __init__(self, model: Type(P), collection: Collection):
+    def __init__(self, model: Type[P], collection: Collection):
         self.model = model
         self.collection = collection
 
@@ -89,3 +359,181 @@ class MongoCRUDBase(Generic[P]):
         """
         result = self.collection.delete_one({"_id": ObjectId(id)})
         return result.deleted_count == 1
+
+
+class AsyncMongoCRUDBase(Generic[P]):
+    """
+    Async CRUD base class for MongoDB using Pymongo's async client and Pydantic
+    """
+
+    batch_size = BULK_BATCH_SIZE
+
+    def __init__(self, model: Type[P], collection: AsyncCollection):
+        self.model = model
+        self.collection = collection
+
+    def _hydrate(self, doc: dict, model=None, trusted: bool = False, raw: bool = False):
+        """
+        Convert a document to a model, `trusted` documents skip validation (model_construct)
+        """
+        if raw:
+            return doc
+        model = model or self.model
+        return model.model_construct(**doc) if trusted else model.model_validate(doc)
+
+    def _hydrate_many(
+        self, docs: list[dict], model=None, trusted: bool = False, raw: bool = False
+    ) -> list:
+        """
+        Convert documents to models, validated in one pass through a cached TypeAdapter
+        """
+        if raw:
+            return docs
+        model = model or self.model
+        if trusted:
+            return [model.model_construct(**doc) for doc in docs]
+        return get_type_adapter(list[model]).validate_python(docs)
+
+    async def create(self, data: dict) -> P:
+        """
+        Insert a new document and return it as a model
+        """
+        doc = dict(data)
+        result = await self.collection.insert_one(doc)
+        doc["_id"] = result.inserted_id
+        return self.model(**doc)
+
+    async def get(self, filters: dict) -> P | None:
+        """
+        Retrieve a single document matching filters
+        """
+        doc = await self.collection.find_one(filters)
+        return self.model(**doc) if doc else None
+
+    async def update(self, filters: dict, data: dict) -> P | None:
+        """
+        Update a document matching filters and return the updated document
+        """
+        doc = await self.collection.find_one_and_update(
+            filters, {"$set": data}, return_document=ReturnDocument.AFTER
+        )
+        return self.model(**doc) if doc else None
+
+    async def delete(self, id: str) -> bool:
+        """
+        Delete a document by it's ID
+        """
+        result = await self.collection.delete_one({"_id": ObjectId(id)})
+        return result.deleted_count == 1
+
+    async def insert_many(
+        self,
+        data: list[dict],
+        *,
+        ordered: bool = True,
+        batch_size: int | None = None,
+    ) -> list[ObjectId]:
+        """
+        Insert documents in chunks of `batch_size`
+
+        Args:
+            data (list[dict]): The documents
+            ordered (bool): Stop at the first failing document, unordered inserts are faster
+                and carry on past errors
+            batch_size (int | None): Max documents per insert_many call
+
+        Returns:
+            list[ObjectId]: The inserted ids
+        """
+        inserted_ids = []
+        for chunk in chunked(data, batch_size or self.batch_size):
+            result = await self.collection.insert_many(
+                [dict(doc) for doc in chunk], ordered=ordered
+            )
+            inserted_ids.extend(result.inserted_ids)
+        return inserted_ids
+
+    async def bulk_write(
+        self,
+        operations: list,
+        *,
+        ordered: bool = True,
+        batch_size: int | None = None,
+    ) -> dict[str, int]:
+        """
+        Run write operations (InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne...) in chunks
+
+        Args:
+            operations (list): The pymongo write operations
+            ordered (bool): Stop at the first failing operation, unordered writes may run in parallel
+            batch_size (int | None): Max operations per bulk_write call
+
+        Returns:
+            dict[str, int]: The inserted/matched/modified/deleted/upserted counts
+        """
+        counts = dict.fromkeys(
+            ("inserted", "matched", "modified", "deleted", "upserted"), 0
+        )
+        for chunk in chunked(operations, batch_size or self.batch_size):
+            result = await self.collection.bulk_write(chunk, ordered=ordered)
+            counts["inserted"] += result.inserted_count
+            counts["matched"] += result.matched_count
+            counts["modified"] += result.modified_count
+            counts["deleted"] += result.deleted_count
+            counts["upserted"] += result.upserted_count
+        return counts
+
+    async def find_many(
+        self,
+        filters: dict,
+        *,
+        projection: dict | list | None = None,
+        sort: list | None = None,
+        skip: int = 0,
+        limit: int = 0,
+        model=None,
+        trusted: bool = False,
+        raw: bool = False,
+    ) -> list:
+        """
+        Retrieve the documents matching filters
+
+        Args:
+            filters (dict): The filters
+            projection (dict | list | None): The fields to fetch, so only those are transferred and hydrated
+            sort (list | None): The sort spec e.g [("created_at", -1)]
+            skip (int): The number of documents to skip
+            limit (int): The max number of documents, 0 for no limit
+            model: (optional) The model to hydrate into e.g a model of the projected fields
+            trusted (bool): Skip validation for documents known to be valid (model_construct)
+            raw (bool): Return the raw documents
+
+        Returns:
+            list: The models (or documents)
+        """
+        cursor = self.collection.find(
+            filters, projection, sort=sort, skip=skip, limit=limit
+        )
+        return self._hydrate_many(await cursor.to_list(), model, trusted, raw)
+
+    async def stream(
+        self,
+        filters: dict,
+        *,
+        projection: dict | list | None = None,
+        sort: list | None = None,
+        batch_size: int | None = None,
+        model=None,
+        trusted: bool = False,
+        raw: bool = False,
+    ):
+        """
+        Iterate over the documents matching filters, `batch_size` documents are fetched per round trip
+
+        See `find_many` for the arguments
+        """
+        cursor = self.collection.find(
+            filters, projection, sort=sort, batch_size=batch_size or self.batch_size
+        )
+        async for doc in cursor:
+            yield self._hydrate(doc, model, trusted, raw)
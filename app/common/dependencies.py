@@ -1,19 +1,58 @@
+from contextlib import asynccontextmanager
 from typing import Literal
 
-import redis.asyncio as redis
+from fastapi import Request
 
-from app.common.types import PaginationParamsType
-from app.core.database import AsyncSessionLocal
+from app.common.types import CursorPaginationParamsType, PaginationParamsType
+from app.core.database import AsyncSessionLocal, ReadSessionLocal
+from app.core.mongo import mongo_registry
+from app.core.redis import redis_registry
 from app.core.settings import get_settings
 
 settings = get_settings()
 
 
-async def get_session():
+def _request_db_state(request: Request) -> dict:
     """
-    Start a db session
+    State shared by the db sessions of a request (read your writes)
     """
-    async with AsyncSessionLocal() as session:  # type: ignore
+    if not hasattr(request.state, "db"):
+        request.state.db = {"wrote": False}
+    return request.state.db
+
+
+@asynccontextmanager
+async def db_session(request: Request | None = None, *, read_only: bool = False):
+    """
+    Start a db session, also usable outside of a request (scripts, tests):
+
+        async with db_session() as session:
+            ...
+
+    Args:
+        request (Request | None): The request whose read your writes state the session shares
+        read_only (bool): Route the queries to a read replica when there is one
+    """
+    session_factory = ReadSessionLocal if read_only else AsyncSessionLocal
+    async with session_factory() as session:  # type: ignore
+        if settings.POSTGRES_READ_YOUR_WRITES and request is not None:
+            session.info["request_state"] = _request_db_state(request)
+        yield session
+
+
+async def get_session(request: Request):
+    """
+    Start a db session (outside of a request, use `db_session`)
+    """
+    async with db_session(request) as session:
+        yield session
+
+
+async def get_read_session(request: Request):
+    """
+    Start a read only db session, routed to a read replica when there is one
+    """
+    async with db_session(request, read_only=True) as session:
         yield session
 
 
@@ -29,10 +68,35 @@ def pagination_params(
     return PaginationParamsType(q=q, page=page, size=size, order_by=order_by)
 
 
+def cursor_pagination_params(
+    q: str | None = None,
+    cursor: str | None = None,
+    size: int = 10,
+    order_by: Literal["asc", "desc"] = "desc",
+):
+    """
+    Helper Dependency for cursor pagination
+    """
+    return CursorPaginationParamsType(q=q, cursor=cursor, size=size, order_by=order_by)
+
+
 def get_redis_client():
     """
-    Helper dependency for redis
+    Helper dependency for redis, the client borrows from the shared pool
+    """
+    return redis_registry.get_client()
+
+
+def get_binary_redis_client():
+    """
+    Helper dependency for redis returning raw bytes (encoded cache values), the
+    client borrows from the shared binary pool
+    """
+    return redis_registry.get_binary_client()
+
+
+def get_mongo_database():
+    """
+    Helper dependency for mongo, the database borrows from the shared client
     """
-    return redis.from_url(
-        settings.REDIS_BROKER_URL, encoding="utf-8", decode_responses=True
-    )
+    return mongo_registry.get_database()
@@ -6,10 +6,18 @@ class CustomHTTPException(Exception):
     Common base class for all http exceptions
     """
 
-    def __init__(self, msg: str, *, status_code: int, loc: list | None = None):
+    def __init__(
+        self,
+        msg: str,
+        *,
+        status_code: int,
+        loc: list | None = None,
+        headers: dict[str, str] | None = None,
+    ):
         self.status_code = status_code
         self.msg = msg
         self.loc = loc
+        self.headers = headers
 
     def __str__(self) -> str:
         return f"Status Code: {self.status_code}\nMessage: {self.msg}\nLocation: {self.loc}"
@@ -43,6 +51,8 @@ class BadGatewayError(Exception):
         payload: dict | None = None,
         response_status_code: int | None = None,
         response: str | dict | None = None,
+        elapsed: float | None = None,
+        attempts: int | None = None,
     ):
         self.msg = msg
         self.loc = loc
@@ -50,6 +60,8 @@ class BadGatewayError(Exception):
         self.payload = payload
         self.response_status_code = response_status_code
         self.response = response
+        self.elapsed = elapsed
+        self.attempts = attempts
         self.timestamp = datetime.now()
 
     def __str__(self) -> str:
@@ -60,6 +72,8 @@ class BadGatewayError(Exception):
             f"Timestamp: {self.timestamp}\n"
             f"Payload: {self.payload}\n"
             f"Response: {self.response}\n"
+            f"Elapsed: {self.elapsed}\n"
+            f"Attempts: {self.attempts}\n"
         )
 
 
@@ -97,3 +111,18 @@ class NotFound(CustomHTTPException):
 
     def __init__(self, msg: str, *, loc: list | None = None):
         super().__init__(msg, status_code=404, loc=loc)
+
+
+class TooManyRequests(CustomHTTPException):
+    """
+    Common base class for 429 TOO MANY REQUESTS exceptions
+    """
+
+    def __init__(
+        self,
+        msg: str = "Too Many Requests",
+        *,
+        loc: list | None = None,
+        headers: dict[str, str] | None = None,
+    ):
+        super().__init__(msg, status_code=429, loc=loc, headers=headers)
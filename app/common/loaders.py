@@ -0,0 +1,151 @@
+import asyncio
+from typing import Any, Generic, Hashable, Sequence, TypeVar
+
+from app.common.cache import CacheManager
+from app.common.codecs import get_type_adapter
+from app.common.crud import CRUDBase
+
+# Type vars
+T = TypeVar("T")
+
+
+class CRUDLoader(Generic[T]):
+    """
+    Request-scoped loader batching `CRUDBase` lookups by a unique field.
+
+    The `load` calls made in the same event loop tick (e.g in a loop under
+    `asyncio.gather`) are resolved by a single WHERE field IN (...) query, and
+    every key is loaded at most once per loader (memoized). Create one loader per
+    request, the memo is never invalidated:
+
+        users = CRUDLoader(CRUDBase(User, db))
+        authors = await asyncio.gather(*(users.load(post.author_id) for post in posts))
+
+    With a `cache`, keys are looked up with `CacheManager.get_many` first and the
+    rows loaded from the db are cached. The loader then returns instances of the
+    cache's `model_class` (a schema validated from the rows' attributes) rather than
+    ORM objects, so hits and misses look the same.
+    """
+
+    def __init__(
+        self,
+        crud: CRUDBase[T],
+        *,
+        field: str = "id",
+        cache: CacheManager | None = None,
+    ):
+        """
+        Args:
+            crud: The CRUD object of the model, its session runs the queries
+            field: (optional) The unique field the keys are matched against
+            cache: (optional) Cache manager of the rows, keyed by `{field: key}`
+        """
+        if cache is not None and cache.model_class is None:
+            raise ValueError("The loader's cache manager requires a model_class")
+
+        self.crud = crud
+        self.field = field
+        self.cache = cache
+        self._memo: dict[Hashable, asyncio.Future] = {}
+        self._queue: list[tuple[Hashable, asyncio.Future]] = []
+        # Strong references to the running batches, the loop only keeps weak ones
+        self._tasks: set[asyncio.Task] = set()
+
+    def load(self, key: Hashable) -> "asyncio.Future[T | None]":
+        """
+        Load the object whose field equals key, None if it doesn't exist
+
+        Returns:
+            asyncio.Future: Awaitable resolving to the object
+        """
+        future = self._memo.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = self._memo[key] = loop.create_future()
+        self._queue.append((key, future))
+
+        # Dispatch once the other coroutines of this tick had a chance to queue their keys
+        if len(self._queue) == 1:
+            loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, keys: Sequence[Hashable]) -> list[T | None]:
+        """
+        Load many objects at once, in the order of keys
+        """
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Hashable, value: T | None):
+        """
+        Store an already loaded object so it isn't loaded again
+        """
+        if key not in self._memo:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._memo[key] = future
+
+    def clear(self, key: Hashable | None = None):
+        """
+        Forget a key (e.g after updating the object) or every key
+        """
+        if key is None:
+            self._memo.clear()
+        else:
+            self._memo.pop(key, None)
+
+    def _dispatch(self):
+        queue, self._queue = self._queue, []
+        task = asyncio.create_task(self._batch(queue))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _batch(self, queue: list[tuple[Hashable, asyncio.Future]]):
+        # The futures travel with their keys, `clear` may have dropped them from the memo
+        keys = list(dict.fromkeys(key for key, _ in queue))
+        try:
+            values = await self._fetch(keys)
+        except asyncio.CancelledError:
+            for _, future in queue:
+                future.cancel()
+            raise
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            for key, future in queue:
+                # Failed keys may be loaded again
+                if self._memo.get(key) is future:
+                    del self._memo[key]
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for key, future in queue:
+            if not future.done():
+                future.set_result(values.get(key))
+
+    async def _fetch(self, keys: list[Hashable]) -> dict[Hashable, Any]:
+        values: dict[Hashable, Any] = {}
+        if self.cache is not None:
+            result = await self.cache.get_many([{self.field: key} for key in keys])
+            values = {keys[index]: value for index, value in result.hits.items()}
+            keys = [keys[index] for index in result.misses]
+            if not keys:
+                return values
+
+        # A session can't run concurrent queries, loaders sharing it take turns
+        lock = self.crud.db.info.setdefault("loader_lock", asyncio.Lock())
+        async with lock:
+            objs = await self.crud.get_in(field=self.field, values=keys)
+
+        rows = {getattr(obj, self.field): obj for obj in objs}
+        if self.cache is not None:
+            adapter = get_type_adapter(self.cache.model_class)
+            rows = {
+                key: adapter.validate_python(obj, from_attributes=True)
+                for key, obj in rows.items()
+            }
+            await self.cache.set_many(
+                [({self.field: key}, value) for key, value in rows.items()]
+            )
+
+        return values | rows
@@ -1,7 +1,21 @@
+import base64
+import binascii
+import hashlib
+import hmac
 import math
+from typing import Literal
 
+import orjson
+from sqlalchemy import Select, tuple_
 from sqlalchemy.orm import Query
 
+from app.common.codecs import default_encoder, get_type_adapter
+from app.common.exceptions import BadRequest
+from app.core.settings import get_settings
+
+# Globals
+settings = get_settings()
+
 
 async def get_pagination_metadata(*, tno_items: int, count: int, page: int, size: int):
     """This function is used to the pagination metadata of a response.
@@ -49,3 +63,176 @@ async def paginate(*, qs: Query, page: int, size: int):
         Query: The paginated qs
     """
     return qs.limit(size).offset(size * (page - 1))
+
+
+def encode_cursor(*, values: list, direction: str, order_by: str) -> str:
+    """This function builds an opaque, signed keyset cursor.
+
+    Args:
+        values (list): The sort key values of the boundary row
+        direction (str): "next" or "prev"
+        order_by (str): The sort order the cursor was built for
+
+    Returns:
+        str: The cursor
+    """
+    payload = base64.urlsafe_b64encode(
+        orjson.dumps(
+            {"v": values, "d": direction, "o": order_by}, default=default_encoder
+        )
+    ).rstrip(b"=")
+    signature = hmac.new(
+        settings.SECRET_KEY.encode(), payload, hashlib.sha256
+    ).digest()[:16]
+    return f"{payload.decode()}.{base64.urlsafe_b64encode(signature).rstrip(b'=').decode()}"
+
+
+def decode_cursor(*, cursor: str, sort_keys: list, order_by: str) -> tuple[list, str]:
+    """This function verifies and decodes a keyset cursor.
+
+    Args:
+        cursor (str): The cursor
+        sort_keys (list): The sort key columns, used to restore the values' types
+        order_by (str): The current sort order
+
+    Raises:
+        BadRequest: If the cursor is invalid, tampered with or was built for another sort order
+
+    Returns:
+        tuple[list, str]: The sort key values and the direction
+    """
+    try:
+        payload, signature = cursor.encode().split(b".")
+        expected = hmac.new(
+            settings.SECRET_KEY.encode(), payload, hashlib.sha256
+        ).digest()[:16]
+        if not hmac.compare_digest(_b64decode(signature), expected):
+            raise ValueError("Invalid signature")
+
+        data = orjson.loads(_b64decode(payload))
+        if data["o"] != order_by or len(data["v"]) != len(sort_keys):
+            raise ValueError("Cursor doesn't match the sort order")
+
+        values = [_coerce(column, value) for column, value in zip(sort_keys, data["v"])]
+    except (ValueError, KeyError, TypeError, binascii.Error) as exc:
+        raise BadRequest("Invalid cursor", loc=["query", "cursor"]) from exc
+
+    return values, data["d"]
+
+
+def _coerce(column, value):
+    """
+    Restore the type of a sort key value, kept as decoded from JSON when the
+    column's type has no Python type (e.g. some dialect-specific types)
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    return get_type_adapter(python_type).validate_python(value)
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+async def keyset_paginate(
+    *,
+    qs: Select,
+    sort_keys: list,
+    size: int,
+    cursor: str | None = None,
+    order_by: Literal["asc", "desc"] = "desc",
+):
+    """This function paginates a select with keyset (cursor) pagination.
+
+    Unlike `paginate`, every page costs the same as the first one: rows are located
+    with a `WHERE (sort keys) > (cursor values)` on an index instead of an OFFSET.
+
+    Args:
+        qs (Select): The select to paginate (without order_by)
+        sort_keys (list): The ordered sort key columns, the last one must be unique e.g [Model.created_at, Model.id]
+        size (int): The max number of items to return
+        cursor (str | None): The cursor of the page to return, None for the first page
+        order_by (Literal["asc", "desc"]): The sort order
+
+    Returns:
+        Select: The paginated select, it fetches one extra row to detect if there are more pages
+    """
+    direction = "next"
+    values = None
+    if cursor:
+        values, direction = decode_cursor(
+            cursor=cursor, sort_keys=sort_keys, order_by=order_by
+        )
+
+    # Pages before the cursor are read backwards
+    ascending = (order_by == "asc") == (direction == "next")
+    if values is not None:
+        boundary = tuple_(*sort_keys)
+        qs = qs.where(
+            boundary > tuple_(*values) if ascending else boundary < tuple_(*values)
+        )
+
+    qs = qs.order_by(*(key.asc() if ascending else key.desc() for key in sort_keys))
+
+    return qs.limit(size + 1)
+
+
+async def get_keyset_pagination_metadata(
+    *,
+    items: list,
+    sort_keys: list,
+    size: int,
+    cursor: str | None = None,
+    order_by: Literal["asc", "desc"] = "desc",
+):
+    """This function builds the page and pagination metadata of a keyset paginated select.
+
+    Args:
+        items (list): The rows returned by the select from `keyset_paginate`
+        sort_keys (list): The sort key columns passed to `keyset_paginate`
+        size (int): The number of items per page
+        cursor (str | None): The cursor of the current page
+        order_by (Literal["asc", "desc"]): The sort order
+
+    Returns:
+        tuple[list, dict]: The page items and the pagination metadata
+
+    Sample:
+        {
+            "size": 10,
+            "count": 10,
+            "next_cursor": "eyJ2Ijp...",
+            "prev_cursor": None,
+            "has_next_page": True,
+            "has_prev_page": False
+        }
+    """
+    direction = "next"
+    if cursor:
+        _, direction = decode_cursor(
+            cursor=cursor, sort_keys=sort_keys, order_by=order_by
+        )
+
+    has_more = len(items) > size
+    items = list(items[:size])
+    if direction == "prev":
+        items.reverse()
+
+    has_next_page = has_more if direction == "next" else bool(cursor)
+    has_prev_page = bool(cursor) if direction == "next" else has_more
+
+    def boundary(item, item_direction: str):
+        values = [getattr(item, key.key) for key in sort_keys]
+        return encode_cursor(values=values, direction=item_direction, order_by=order_by)
+
+    metadata = {
+        "size": size,
+        "count": len(items),
+        "next_cursor": boundary(items[-1], "next") if has_next_page and items else None,
+        "prev_cursor": boundary(items[0], "prev") if has_prev_page and items else None,
+        "has_next_page": has_next_page,
+        "has_prev_page": has_prev_page,
+    }
+    return items, metadata
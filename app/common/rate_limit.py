@@ -0,0 +1,228 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Literal
+
+from fastapi import Request
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+
+from app.common.auth import TokenGenerator
+from app.common.dependencies import get_redis_client
+from app.common.exceptions import TooManyRequests
+from app.core.logger import get_logger
+from app.core.settings import get_settings
+
+# Globals
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Constants
+RATE_LIMIT_PREFIX = "ratelimit:"
+# Headers of the allowed requests, added to the response by RateLimitHeadersMiddleware
+RATE_LIMIT_HEADERS_STATE = "rate_limit_headers"
+LOCAL_LEASES_MAX_ENTRIES = 10_000
+
+# GCRA (generic cell rate algorithm): a single "theoretical arrival time" per key.
+# Takes up to `quantity` tokens at once, as many as are available.
+# Returns {taken, remaining, retry_after_ms, reset_ms}, taken = 0 when rejected
+GCRA_SCRIPT = """
+local emission_interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local quantity = tonumber(ARGV[3])
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local tat = tonumber(redis.call("GET", KEYS[1]) or now)
+tat = math.max(tat, now)
+
+-- (the epsilon absorbs the rounding of tolerance / emission_interval)
+local available = math.floor((now - (tat - tolerance)) / emission_interval + 1e-9)
+if available < 1 then
+    return {0, 0, tat + emission_interval - tolerance - now, tat - now}
+end
+
+local taken = math.min(quantity, available)
+local new_tat = tat + taken * emission_interval
+redis.call("SET", KEYS[1], new_tat, "PX", math.ceil(new_tat - now))
+return {taken, available - taken, 0, new_tat - now}
+"""
+
+
+def client_ip(request: Request) -> str:
+    """
+    Identify a request by the client's IP
+    """
+    return request.client.host if request.client else "unknown"
+
+
+async def client_user(request: Request, token_generator: TokenGenerator) -> str:
+    """
+    Identify a request by the subject of its bearer token (verified by
+    `token_generator`, through its verified token cache), falling back to the
+    client's IP when there is no token or it is invalid or revoked (so a client
+    can't get a new limit by sending made-up tokens)
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    token = token.strip()
+    sub = (
+        await token_generator.subject(token)
+        if scheme.lower() == "bearer" and token
+        else None
+    )
+    return f"sub:{sub}" if sub else client_ip(request)
+
+
+class RateLimiter:
+    """
+    Rate limit dependency backed by a GCRA limiter in redis.
+
+    Declared on routers or routes, the limit applies per route and per client IP
+    (`by="ip"`), per user (`by="user"`, the subject of a valid bearer token checked
+    by `token_generator`) or to every client of the route at once (`by="route"`):
+
+        router.include_router(
+            sample_router, dependencies=[Depends(RateLimiter(times=3, seconds=1))]
+        )
+
+    With `lease`, each worker takes that many tokens (or what is left) from redis
+    at once and spends them locally, so most requests don't touch redis. Leased
+    tokens are reserved for the worker until they are spent or the lease expires
+    (`seconds`), a client spread over many workers may be limited a bit early.
+
+    When redis fails or is slower than `RATE_LIMIT_REDIS_TIMEOUT`, requests are let
+    through if `RATE_LIMIT_FAIL_OPEN` is set.
+
+    The RateLimit-* headers are stored on `request.state` and added to the response
+    by `RateLimitHeadersMiddleware`, whatever the route returns.
+    """
+
+    def __init__(
+        self,
+        *,
+        times: int,
+        seconds: float,
+        by: Literal["ip", "user", "route"] = "ip",
+        burst: int | None = None,
+        lease: int | None = None,
+        identifier: Callable[[Request], Awaitable[str] | str] | None = None,
+        token_generator: TokenGenerator | None = None,
+    ):
+        """
+        Args:
+            times: Requests allowed per `seconds`
+            seconds: The period in seconds
+            by: (optional) What the limit applies to, ignored if `identifier` is given
+            burst: (optional) Requests allowed at once, defaults to `times`
+            lease: (optional) Tokens leased from redis at once, defaults to `RATE_LIMIT_LEASE_SIZE`
+            identifier: (optional) Custom (possibly async) client identifier
+            token_generator: (optional) The app's token generator, required by `by="user"`
+        """
+        if by == "user" and identifier is None and token_generator is None:
+            raise ValueError('RateLimiter(by="user") requires a token_generator')
+
+        self.times = times
+        self.seconds = seconds
+        self.by = by
+        self.burst = burst or times
+        self.lease = settings.RATE_LIMIT_LEASE_SIZE if lease is None else lease
+        self.identifier = identifier
+        self.token_generator = token_generator
+        self.emission_interval = seconds * 1000 / times
+        self.tolerance = self.emission_interval * self.burst
+        self.script: AsyncScript | None = None
+        # Local leases: key -> [tokens, remaining in redis, reset_at, expires_at]
+        self.leases: OrderedDict[str, list] = OrderedDict()
+
+    async def _identify(self, request: Request) -> str:
+        if self.identifier is not None:
+            identity = self.identifier(request)
+            if asyncio.iscoroutine(identity):
+                identity = await identity
+            return identity  # type: ignore
+        if self.by == "user":
+            return await client_user(request, self.token_generator)  # type: ignore
+        if self.by == "ip":
+            return client_ip(request)
+        return ""
+
+    async def _take(self, key: str, quantity: int) -> list[int]:
+        if self.script is None:
+            self.script = get_redis_client().register_script(GCRA_SCRIPT)
+
+        return await asyncio.wait_for(
+            self.script(
+                keys=[key],
+                args=[self.emission_interval, self.tolerance, quantity],
+                client=get_redis_client(),
+            ),
+            timeout=settings.RATE_LIMIT_REDIS_TIMEOUT,
+        )
+
+    def _take_leased(self, key: str) -> tuple[int, float] | None:
+        lease = self.leases.get(key)
+        if lease is None:
+            return None
+
+        tokens, remaining, reset_at, expires_at = lease
+        now = time.monotonic()
+        if tokens <= 0 or expires_at <= now:
+            del self.leases[key]
+            return None
+
+        lease[0] -= 1
+        self.leases.move_to_end(key)
+        return remaining + lease[0], max(reset_at - now, 0)
+
+    def _store_lease(self, key: str, tokens: int, remaining: int, reset: float):
+        now = time.monotonic()
+        self.leases[key] = [tokens, remaining, now + reset, now + self.seconds]
+        self.leases.move_to_end(key)
+        while len(self.leases) > LOCAL_LEASES_MAX_ENTRIES:
+            self.leases.popitem(last=False)
+
+    def _headers(self, remaining: int, reset: float) -> dict[str, str]:
+        return {
+            "RateLimit-Limit": str(self.times),
+            "RateLimit-Remaining": str(max(remaining, 0)),
+            "RateLimit-Reset": str(math.ceil(reset)),
+            "RateLimit-Policy": f"{self.times};w={self.seconds:g}",
+        }
+
+    async def __call__(self, request: Request):
+        route = request.scope.get("route")
+        try:
+            # Checking a user's token may need redis too (revocation list)
+            identity = await self._identify(request)
+            key = f"{RATE_LIMIT_PREFIX}{getattr(route, 'path', request.url.path)}:{self.by}:{identity}"
+
+            leased = self._take_leased(key) if self.lease > 1 else None
+            if leased is not None:
+                setattr(request.state, RATE_LIMIT_HEADERS_STATE, self._headers(*leased))
+                return
+
+            # One round trip, leasing takes what is left when it's less than a lease
+            taken, remaining, retry_after, reset = await self._take(
+                key, max(self.lease, 1)
+            )
+        except (RedisError, OSError, asyncio.TimeoutError) as exc:
+            if not settings.RATE_LIMIT_FAIL_OPEN:
+                raise
+            logger.warning(
+                "Rate limiter unavailable, letting the request through: %s", exc
+            )
+            return
+
+        if taken > 1:
+            # Keep the first token for this request
+            self._store_lease(key, taken - 1, remaining, reset / 1000)
+            remaining += taken - 1
+
+        headers = self._headers(remaining, reset / 1000)
+        if not taken:
+            headers["Retry-After"] = str(math.ceil(retry_after / 1000))
+            raise TooManyRequests(headers=headers)
+
+        setattr(request.state, RATE_LIMIT_HEADERS_STATE, headers)
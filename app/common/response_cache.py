@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import inspect
+from functools import wraps
+from typing import Any, Awaitable, Callable, Sequence
+
+import orjson
+from fastapi import Request, Response, status
+from logfire import info
+from redis.exceptions import RedisError
+
+from app.common.cache import add_to_tags
+from app.common.codecs import default_encoder, dumps_key, get_type_adapter
+from app.common.compression import (
+    available_encodings,
+    compress,
+    compression_min_size,
+    negotiate,
+)
+from app.common.dependencies import get_binary_redis_client
+from app.core.logger import get_logger
+from app.core.settings import get_settings
+
+# Globals
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Constants
+RESPONSE_CACHE_PREFIX = "response:"
+
+
+def _find_request_param(signature: inspect.Signature) -> str | None:
+    for param in signature.parameters.values():
+        if param.annotation is Request:
+            return param.name
+    return None
+
+
+def serialize_body(result: Any, response_model: Any | None = None) -> bytes:
+    """
+    Serialize a route result to JSON bytes, validating it against `response_model` if given
+    (what FastAPI would have done with the route's response_model)
+    """
+    if response_model is None:
+        return orjson.dumps(result, default=default_encoder)
+
+    adapter = get_type_adapter(response_model)
+    return adapter.dump_json(adapter.validate_python(result))
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Strong ETag of a response body
+    """
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def variant_etag(etag: str, encoding: str | None) -> str:
+    """
+    ETag of a compressed variant, distinct from the plain body's
+    """
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def compress_variants(body: bytes, encodings: Sequence[str]) -> dict[str, bytes]:
+    """
+    The hash fields of the compressed variants of a body (`body:<encoding>`), for
+    the encodings whose minimum size the body reaches
+    """
+    return {
+        f"body:{encoding}": compress(body, encoding)
+        for encoding in encodings
+        if len(body) >= compression_min_size(encoding)
+    }
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check the request's If-None-Match header against an ETag
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def cache_response(
+    *,
+    ttl: int,
+    response_model: Any | None = None,
+    status_code: int = status.HTTP_200_OK,
+    vary: Sequence[str] = (),
+    vary_on: Callable[[Request], Awaitable[str] | str] | None = None,
+    cache_control: str | None = None,
+    tags: Sequence[str] = (),
+    prefix: str = RESPONSE_CACHE_PREFIX,
+    precompress: bool | None = None,
+):
+    """
+    Cache the serialized JSON body of a route in Redis.
+
+    Cache hits skip the route handler, response_model validation and JSON encoding,
+    the stored bytes are sent as is with an ETag. Requests whose If-None-Match
+    matches get a 304. With `precompress`, the body is also stored compressed with
+    every available encoding, hits are sent precompressed and CompressionMiddleware
+    leaves them alone. When redis fails, the route is served uncached. Must be
+    placed below the router decorator:
+
+        @router.get("", response_model=ResponseSchema)
+        @cache_response(ttl=60, response_model=ResponseSchema)
+        async def route_sample_get(): ...
+
+    Args:
+        ttl (int): Seconds the response is cached for
+        response_model (Any | None): The route's response_model, used to validate and serialize on a miss
+        status_code (int): The status code of the route
+        vary (Sequence[str]): Request headers the response depends on e.g ("authorization",)
+        vary_on (Callable | None): Extra (possibly async) key function e.g returning the auth subject
+        cache_control (str | None): Cache-Control header, defaults to private/public max-age=ttl
+        tags (Sequence[str]): Cache tags the response depends on, see `invalidate_tags`
+        prefix (str): The cache key prefix
+        precompress (bool | None): Store compressed variants, defaults to `COMPRESSION_CACHE_VARIANTS`
+
+    Returns:
+        Callable: The decorator
+    """
+    vary = tuple(header.lower() for header in vary)
+    if cache_control is None:
+        visibility = "private" if vary or vary_on else "public"
+        cache_control = f"{visibility}, max-age={ttl}"
+
+    if precompress is None:
+        precompress = settings.COMPRESSION_CACHE_VARIANTS
+    encodings = available_encodings() if precompress else ()
+    vary_header = ", ".join((*vary, "accept-encoding") if encodings else vary)
+
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        signature = inspect.signature(func)
+        request_param = _find_request_param(signature)
+        inject_request = request_param is None
+
+        # Ask FastAPI for the request if the route doesn't already take it
+        if inject_request:
+            request_param = "request__"
+            signature = signature.replace(
+                parameters=[
+                    *signature.parameters.values(),
+                    inspect.Parameter(
+                        request_param,
+                        inspect.Parameter.KEYWORD_ONLY,
+                        annotation=Request,
+                    ),
+                ]
+            )
+
+        async def build_key(request: Request) -> str:
+            route = request.scope.get("route")
+            parts: list[Any] = [
+                getattr(route, "path", None),
+                request.url.path,
+                sorted(request.query_params.multi_items()),
+                [request.headers.get(header) for header in vary],
+            ]
+            if vary_on:
+                vary_value = vary_on(request)
+                if inspect.isawaitable(vary_value):
+                    vary_value = await vary_value
+                parts.append(vary_value)
+
+            digest = hashlib.blake2b(dumps_key(parts), digest_size=16).hexdigest()
+            return f"{prefix}{digest}"
+
+        def build_response(
+            request: Request, body: bytes, etag: str, encoding: str | None = None
+        ) -> Response:
+            etag = variant_etag(etag, encoding)
+            headers = {"ETag": etag, "Cache-Control": cache_control}
+            if vary_header:
+                headers["Vary"] = vary_header
+            if encoding:
+                headers["Content-Encoding"] = encoding
+
+            if etag_matches(request, etag):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+                )
+
+            return Response(
+                content=body,
+                status_code=status_code,
+                media_type="application/json",
+                headers=headers,
+            )
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Request = (
+                kwargs.pop(request_param) if inject_request else kwargs[request_param]
+            )
+            redis_client = get_binary_redis_client()
+            cache_key = await build_key(request)
+
+            encoding = (
+                negotiate(request.headers.get("accept-encoding", ""), encodings)
+                if encodings
+                else None
+            )
+            fields = (
+                ["etag", "body", f"body:{encoding}"] if encoding else ["etag", "body"]
+            )
+            try:
+                etag, body, *variant = await redis_client.hmget(cache_key, fields)
+            except (RedisError, OSError, asyncio.TimeoutError) as exc:
+                # Fail open, the route doesn't need redis to answer
+                logger.warning("Response cache unavailable, not caching: %s", exc)
+                return await func(*args, **kwargs)
+
+            if body is not None:
+                info(f"Response cache hit for key: {cache_key}")
+                if variant and variant[0] is not None:
+                    return build_response(request, variant[0], etag.decode(), encoding)
+                return build_response(request, body, etag.decode())
+
+            info(f"Response cache miss for key: {cache_key}")
+            result = await func(*args, **kwargs)
+
+            # Responses built by the route are sent untouched
+            if isinstance(result, Response):
+                return result
+
+            body = serialize_body(result, response_model)
+            etag = make_etag(body)
+
+            variants = compress_variants(body, encodings)
+
+            try:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    pipe.hset(
+                        cache_key, mapping={"etag": etag, "body": body, **variants}
+                    )
+                    pipe.expire(cache_key, ttl)
+                    add_to_tags(pipe, tags, cache_key, ttl)
+                    await pipe.execute()
+            except (RedisError, OSError, asyncio.TimeoutError) as exc:
+                logger.warning("Response cache unavailable, not caching: %s", exc)
+
+            variant_field = f"body:{encoding}"
+            if variant_field in variants:
+                return build_response(request, variants[variant_field], etag, encoding)
+            return build_response(request, body, etag)
+
+        wrapper.__signature__ = signature  # type: ignore
+        return wrapper
+
+    return decorator
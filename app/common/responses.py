@@ -0,0 +1,217 @@
+import csv
+import io
+from typing import Any, AsyncIterable, Callable, Sequence
+
+import orjson
+from fastapi import Response, status
+from fastapi.responses import StreamingResponse
+
+from app.common.codecs import ORJSON_OPTIONS, default_encoder, get_type_adapter
+
+# Constants
+STREAM_CHUNK_SIZE = 500  # Rows per chunk sent to the client
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize to JSON bytes with orjson (pydantic models, dataclasses, datetimes... supported)
+    """
+    return orjson.dumps(obj, default=default_encoder, option=ORJSON_OPTIONS)
+
+
+def envelope(
+    data: Any,
+    *,
+    model: Any | None = None,
+    from_attributes: bool = False,
+    msg: str = "Request Successful",
+    meta: Any | None = None,
+    status_: str = "success",
+) -> bytes:
+    """
+    Serialize the response envelope `{"status", "msg", "data"[, "meta"]}` to JSON in one pass.
+
+    With `model` (e.g list[ItemSchema]) data is dumped by its cached TypeAdapter,
+    straight to JSON bytes. `from_attributes` validates ORM objects into the model first.
+
+    Args:
+        data (Any): The response data
+        model (Any | None): The type of data
+        from_attributes (bool): Validate data (e.g ORM objects) into the model before dumping it
+        msg (str): The response message
+        meta (Any | None): Pagination metadata, see `PaginatedResponseSchema`
+        status_ (str): The response status
+
+    Returns:
+        bytes: The JSON body
+    """
+    if model is None:
+        data_json = dumps(data)
+    else:
+        adapter = get_type_adapter(model)
+        if from_attributes:
+            data = adapter.validate_python(data, from_attributes=True)
+        data_json = adapter.dump_json(data)
+
+    body = b'{"status":' + dumps(status_) + b',"msg":' + dumps(msg)
+    body += b',"data":' + data_json
+    if meta is not None:
+        body += b',"meta":' + dumps(meta)
+    return body + b"}"
+
+
+def envelope_response(
+    data: Any,
+    *,
+    model: Any | None = None,
+    from_attributes: bool = False,
+    msg: str = "Request Successful",
+    meta: Any | None = None,
+    status_code: int = status.HTTP_200_OK,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    Response with the envelope body built by `envelope`.
+
+    FastAPI sends returned responses as is, skipping the response_model validation
+    and jsonable_encoder pass. Keep the response_model on the route for the OpenAPI
+    schema:
+
+        @router.get("", response_model=PaginatedResponseSchema[list[ItemSchema]])
+        async def route_item_list(...):
+            items, meta = await paginate(...)
+            return envelope_response(
+                items, model=list[ItemSchema], from_attributes=True, meta=meta
+            )
+    """
+    return Response(
+        content=envelope(
+            data, model=model, from_attributes=from_attributes, msg=msg, meta=meta
+        ),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def error_envelope(msg: str, loc: Any = None) -> bytes:
+    """
+    Serialize the error envelope `{"status": "error", "error": {"msg", "loc"}, "data": null}`
+    """
+    return dumps({"status": "error", "error": {"msg": msg, "loc": loc}, "data": None})
+
+
+def _attachment_headers(filename: str | None) -> dict[str, str] | None:
+    if filename is None:
+        return None
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+def ndjson_response(
+    rows: AsyncIterable[Any],
+    *,
+    formatter: Callable[[Any], Any] | None = None,
+    filename: str | None = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> StreamingResponse:
+    """
+    Stream rows as newline delimited JSON, with constant memory.
+
+    Rows are encoded with orjson and sent `chunk_size` at a time, the response works
+    with the GZip middleware. The rows' session must outlive the route, e.g:
+
+        async def rows():
+            async with AsyncSessionLocal() as db:
+                async for user in CRUDBase(User, db).stream():
+                    yield user
+
+        return ndjson_response(rows(), formatter=format_user, filename="users.ndjson")
+
+    Args:
+        rows (AsyncIterable[Any]): The rows
+        formatter (Callable | None): Converts a row to a JSON serializable object
+        filename (str | None): Sends the response as an attachment with this name
+        chunk_size (int): Rows per chunk
+
+    Returns:
+        StreamingResponse: The response
+    """
+
+    async def content():
+        chunk = bytearray()
+        count = 0
+        async for row in rows:
+            chunk += orjson.dumps(
+                formatter(row) if formatter else row, default=default_encoder
+            )
+            chunk += b"\n"
+            count += 1
+            if count >= chunk_size:
+                yield bytes(chunk)
+                chunk.clear()
+                count = 0
+
+        if chunk:
+            yield bytes(chunk)
+
+    return StreamingResponse(
+        content(),
+        media_type="application/x-ndjson",
+        headers=_attachment_headers(filename),
+    )
+
+
+def csv_response(
+    rows: AsyncIterable[Any],
+    *,
+    fields: Sequence[str],
+    formatter: Callable[[Any], dict] | None = None,
+    filename: str | None = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> StreamingResponse:
+    """
+    Stream rows as CSV (with a header row), with constant memory.
+
+    See `ndjson_response` for how to keep the rows' session open.
+
+    Args:
+        rows (AsyncIterable[Any]): The rows
+        fields (Sequence[str]): The columns, in order
+        formatter (Callable | None): Converts a row to a dict, defaults to reading the fields as attributes
+        filename (str | None): Sends the response as an attachment with this name
+        chunk_size (int): Rows per chunk
+
+    Returns:
+        StreamingResponse: The response
+    """
+
+    def to_dict(row: Any) -> dict:
+        if formatter:
+            return formatter(row)
+        if isinstance(row, dict):
+            return row
+        return {field: getattr(row, field) for field in fields}
+
+    async def content():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+
+        count = 0
+        async for row in rows:
+            writer.writerow(to_dict(row))
+            count += 1
+            if count >= chunk_size:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+                count = 0
+
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    return StreamingResponse(
+        content(),
+        media_type="text/csv",
+        headers=_attachment_headers(filename),
+    )
@@ -1,14 +1,20 @@
-from typing import Any
+from typing import Generic, TypeVar
 
 from pydantic import BaseModel, Field
 
+# Type vars
+T = TypeVar("T")
 
-class ResponseSchema(BaseModel):
-    """This is the generic base response schema"""
+
+class ResponseSchema(BaseModel, Generic[T]):
+    """
+    This is the generic base response schema, `ResponseSchema[ItemSchema]`
+    documents (and validates) the type of data
+    """
 
     status: str = Field(description="The response status", default="success")
     msg: str = Field(default="Request Successful", description="The response message")
-    data: Any = Field(description="The response data")
+    data: T = Field(description="The response data")
 
 
 class PaginationSchema(BaseModel):
@@ -23,9 +29,28 @@ class PaginationSchema(BaseModel):
     has_prev_page: bool = Field(description="Indicates if there is a previous page")
 
 
-class PaginatedResponseSchema(ResponseSchema):
+class PaginatedResponseSchema(ResponseSchema[T], Generic[T]):
     """
-    Generic schema for paginated responses
+    Generic schema for paginated responses, e.g `PaginatedResponseSchema[list[ItemSchema]]`
     """
 
     meta: PaginationSchema = Field(description="The pagination metadata")
+
+
+class CursorPaginationSchema(BaseModel):
+    """The cursor (keyset) pagination schema for the application."""
+
+    size: int = Field(description="Max number of items to return per page")
+    count: int = Field(description="The number of items returned")
+    next_cursor: str | None = Field(description="The cursor of the next page")
+    prev_cursor: str | None = Field(description="The cursor of the previous page")
+    has_next_page: bool = Field(description="Indicates if there is a next page")
+    has_prev_page: bool = Field(description="Indicates if there is a previous page")
+
+
+class CursorPaginatedResponseSchema(ResponseSchema[T], Generic[T]):
+    """
+    Generic schema for cursor paginated responses
+    """
+
+    meta: CursorPaginationSchema = Field(description="The pagination metadata")
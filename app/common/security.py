@@ -1,23 +1,156 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 from sqlalchemy import Column
 
+from app.core.settings import get_settings
+
 # Globals
-ph = PasswordHasher()
+settings = get_settings()
+ph = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM,
+    hash_len=settings.ARGON2_HASH_LEN,
+    salt_len=settings.ARGON2_SALT_LEN,
+)
+
+
+class PasswordHashingPool:
+    """
+    Bounded thread pool running the argon2 hashing off the event loop.
+
+    argon2 releases the GIL while hashing, so threads hash in parallel. At most
+    `max_workers` hashes run at once, the other callers wait (without blocking the
+    event loop) and the time they spend waiting is tracked.
+
+    The threads are started on first use and stopped by `close`, a closed pool
+    starts new ones when used again (e.g by the next lifespan of the process).
+    """
+
+    def __init__(self, *, max_workers: int):
+        self.max_workers = max_workers
+        self.executor: ThreadPoolExecutor | None = None
+        self.semaphore: asyncio.Semaphore | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.running = 0
+        self.waiting = 0
+        self.waiting_max = 0
+        self.completed = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Run a (blocking) hashing function in the pool
+        """
+        # Created lazily so it binds to the running loop, again if the loop changed
+        loop = asyncio.get_running_loop()
+        if self.semaphore is None or self.loop is not loop:
+            self.semaphore = asyncio.Semaphore(self.max_workers)
+            self.loop = loop
+        semaphore = self.semaphore
+
+        self.waiting += 1
+        self.waiting_max = max(self.waiting_max, self.waiting)
+        start = time.perf_counter()
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        waited = time.perf_counter() - start
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hashing"
+            )
+
+        self.running += 1
+        try:
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            semaphore.release()
+
+    def stats(self) -> dict:
+        """
+        Get the pool statistics
+
+        Returns:
+            dict: running/waiting calls and queueing times
+        """
+        return {
+            "max_workers": self.max_workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "waiting_max": self.waiting_max,
+            "completed": self.completed,
+            "wait_time_avg": self.wait_time_total / self.completed
+            if self.completed
+            else 0.0,
+            "wait_time_max": self.wait_time_max,
+        }
+
+    def close(self):
+        """
+        Stop the pool's threads
+        """
+        executor, self.executor = self.executor, None
+        self.semaphore = self.loop = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hashing_pool = PasswordHashingPool(
+    max_workers=settings.PASSWORD_HASHING_WORKERS
+)
+
+
+def _verify(raw: str, hashed: str) -> bool:
+    try:
+        return ph.verify(hash=hashed, password=raw)
+    except VerifyMismatchError:
+        return False
+
+
+def _verify_and_update(raw: str, hashed: str) -> tuple[bool, str | None]:
+    if not _verify(raw, hashed):
+        return False, None
+    if ph.check_needs_rehash(hashed):
+        return True, ph.hash(raw)
+    return True, None
 
 
 async def hash_password(*, raw: str):
     """
     Hash password
     """
-    return ph.hash(raw)
+    return await password_hashing_pool.run(ph.hash, raw)
 
 
 async def verify_password(*, raw: str, hashed: str | Column[str]):
     """
     Verify password
     """
-    try:
-        return ph.verify(hash=str(hashed), password=raw)
-    except VerifyMismatchError:
-        return False
+    return await password_hashing_pool.run(_verify, raw, str(hashed))
+
+
+async def verify_and_update_password(
+    *, raw: str, hashed: str | Column[str]
+) -> tuple[bool, str | None]:
+    """
+    Verify password, rehashing it if it was hashed with outdated argon2 parameters
+
+    Returns:
+        tuple[bool, str | None]: If the password matches, and the new hash to store
+            (None when the current hash is up to date)
+    """
+    return await password_hashing_pool.run(_verify_and_update, raw, str(hashed))
@@ -1,4 +1,7 @@
-from typing import Literal, NamedTuple
+from typing import Any, Generic, Literal, NamedTuple, TypeVar
+
+# Type vars
+T = TypeVar("T")
 
 
 class PaginationParamsType(NamedTuple):
@@ -10,3 +13,29 @@ class PaginationParamsType(NamedTuple):
     page: int
     size: int
     order_by: Literal["asc", "desc"]
+
+
+class CursorPaginationParamsType(NamedTuple):
+    """
+    The cursor (keyset) pagination parameters for the application.
+    """
+
+    q: str | None
+    cursor: str | None
+    size: int
+    order_by: Literal["asc", "desc"]
+
+
+class CacheBatchResultType(NamedTuple, Generic[T]):
+    """
+    The result of a batched cache lookup, indexes refer to the requested items.
+    """
+
+    hits: dict[int, T]
+    misses: list[int]
+
+    def get(self, index: int, default: Any = None) -> T | Any:
+        """
+        Get the cached value of the item at index
+        """
+        return self.hits.get(index, default)
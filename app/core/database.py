@@ -1,16 +1,306 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import suppress
+from uuid import uuid4
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    NullPool,
+    QueuePool,
+)
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.core.settings import get_settings
 
 settings = get_settings()
 
-engine = create_async_engine(
-    url=settings.POSTGRES_DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=100,  # The size of the connection pool
-    max_overflow=50,  # The maximum number of connections that can be opened beyond the pool size. Set to -1 for no limit.
-)
+
+class PoolMetricsMixin:
+    """
+    Keeps track of a pool's checkouts, how long callers wait for a connection
+    and how long connections live
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.overflow_max = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.lifetime_total = 0.0
+        self.lifetime_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+
+        self.checkouts += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        if isinstance(self, QueuePool):
+            self.overflow_max = max(self.overflow_max, self.overflow())
+        return connection
+
+    def record_connect(self, connection_record: ConnectionPoolEntry):
+        """
+        Called when the pool opens a new DBAPI connection
+        """
+        self.connections_opened += 1
+        connection_record.info["connected_at"] = time.monotonic()
+
+    def record_close(self, connection_record: ConnectionPoolEntry):
+        """
+        Called when the pool closes a DBAPI connection
+        """
+        connected_at = connection_record.info.pop("connected_at", None)
+        if connected_at is None:
+            return
+
+        lifetime = time.monotonic() - connected_at
+        self.connections_closed += 1
+        self.lifetime_total += lifetime
+        self.lifetime_max = max(self.lifetime_max, lifetime)
+
+    def stats(self) -> dict:
+        """
+        Get the pool statistics
+
+        Returns:
+            dict: checkouts, wait times, overflow use and connection lifetimes
+        """
+        checkouts, closed = self.checkouts, self.connections_closed
+        data = {
+            "checkouts": checkouts,
+            "timeouts": self.timeouts,
+            "wait_time_avg": self.wait_time_total / checkouts if checkouts else 0.0,
+            "wait_time_max": self.wait_time_max,
+            "connections_opened": self.connections_opened,
+            "connections_closed": closed,
+            "lifetime_avg": self.lifetime_total / closed if closed else 0.0,
+            "lifetime_max": self.lifetime_max,
+        }
+        if isinstance(self, QueuePool):
+            data |= {
+                "size": self.size(),
+                "checked_out": self.checkedout(),
+                "idle": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "overflow_max": self.overflow_max,
+            }
+        return data
+
+
+class InstrumentedQueuePool(PoolMetricsMixin, AsyncAdaptedQueuePool):
+    """
+    The default async queue pool, instrumented
+    """
+
+
+class InstrumentedNullPool(PoolMetricsMixin, NullPool):
+    """
+    Pool opening a connection per checkout (PgBouncer does the pooling), instrumented
+    """
+
+
+# SQLAlchemy names the pools' loggers after their class, which puts these under the
+# app logger (INFO): keep them at SQLAlchemy's usual WARNING
+for _pool_class in (InstrumentedQueuePool, InstrumentedNullPool):
+    logging.getLogger(f"{_pool_class.__module__}.{_pool_class.__name__}").setLevel(
+        logging.WARNING
+    )
+
+
+def make_engine(url: str) -> AsyncEngine:
+    """
+    Create an async engine (and its connection pool) from the pool settings
+    """
+    kwargs: dict = {
+        "pool_pre_ping": settings.POSTGRES_POOL_PRE_PING,
+        "pool_recycle": settings.POSTGRES_POOL_RECYCLE,
+    }
+
+    if settings.POSTGRES_PGBOUNCER:
+        # PgBouncer in transaction mode can't keep prepared statements across transactions
+        kwargs["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+
+    if settings.POSTGRES_PGBOUNCER and settings.POSTGRES_PGBOUNCER_NULL_POOL:
+        kwargs["poolclass"] = InstrumentedNullPool
+    else:
+        kwargs |= {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": settings.POSTGRES_POOL_SIZE,
+            "max_overflow": settings.POSTGRES_MAX_OVERFLOW,
+            "pool_timeout": settings.POSTGRES_POOL_TIMEOUT,
+        }
+
+    new_engine = create_async_engine(url=url, **kwargs)
+
+    # Listen on the engine, its pool is replaced on dispose()
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def _on_connect(_, connection_record):
+        if isinstance(new_engine.pool, PoolMetricsMixin):
+            new_engine.pool.record_connect(connection_record)
+
+    @event.listens_for(new_engine.sync_engine, "close")
+    def _on_close(_, connection_record):
+        if isinstance(new_engine.pool, PoolMetricsMixin):
+            new_engine.pool.record_close(connection_record)
+
+    return new_engine
+
+
+engine = make_engine(settings.POSTGRES_DATABASE_URL)
+replica_engines = [
+    make_engine(url.strip())
+    for url in settings.POSTGRES_REPLICA_URLS.split(",")
+    if url.strip()
+]
+
+
+class ReplicaRouter:
+    """
+    Picks the read replica a read session uses.
+
+    Replicas are picked round-robin or by least checked out connections. A replica
+    whose connection fails, or that fails the periodic health check, is skipped
+    until it passes a check again; reads fall back to the primary when no replica is up.
+    """
+
+    def __init__(self, engines: list[AsyncEngine], strategy: str):
+        self.engines = engines
+        self.strategy = strategy
+        self.down: set[AsyncEngine] = set()
+        self.counter = itertools.count()
+        self.task: asyncio.Task | None = None
+
+        for replica in engines:
+            event.listen(replica.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context: ExceptionContext):
+        if context.is_disconnect or context.connection is None:
+            for replica in self.engines:
+                if replica.sync_engine is context.engine:
+                    self.down.add(replica)
+
+    def pick(self) -> AsyncEngine | None:
+        """
+        Get a healthy replica, None if there is none
+        """
+        healthy = [replica for replica in self.engines if replica not in self.down]
+        if not healthy:
+            return None
+        if self.strategy == "least_loaded":
+            return min(healthy, key=lambda replica: replica.pool.checkedout())
+        return healthy[next(self.counter) % len(healthy)]
+
+    async def check(self):
+        """
+        Ping every replica and update their status
+        """
+        for replica in self.engines:
+            try:
+                async with asyncio.timeout(
+                    settings.POSTGRES_REPLICA_HEALTH_CHECK_TIMEOUT
+                ):
+                    async with replica.connect() as conn:
+                        await conn.execute(text("SELECT 1"))
+                self.down.discard(replica)
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.down.add(replica)
+
+    async def _run_checks(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.POSTGRES_REPLICA_HEALTH_CHECK_INTERVAL)
+
+    def start(self):
+        """
+        Start the periodic health checks
+        """
+        if self.engines and self.task is None:
+            self.task = asyncio.create_task(self._run_checks())
+
+    async def stop(self):
+        """
+        Stop the health checks and close the replicas' pools
+        """
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+        for replica in self.engines:
+            await replica.dispose()
+
+
+replica_router = ReplicaRouter(replica_engines, settings.POSTGRES_REPLICA_STRATEGY)
+
+
+def get_pool_stats() -> dict:
+    """
+    Get the statistics of the primary's and the replicas' pools in this worker
+    """
+    return {
+        "primary": engine.pool.stats(),  # type: ignore
+        "replicas": [
+            {**replica.pool.stats(), "healthy": replica not in replica_router.down}  # type: ignore
+            for replica in replica_engines
+        ],
+    }
+
+
+class RoutingSession(Session):
+    """
+    Session sending reads to a replica and writes (flushes, DML) to the primary.
+
+    A session sticks to the replica it first picked. With `POSTGRES_READ_YOUR_WRITES`
+    it switches to the primary once a session of the same request committed.
+    """
+
+    replica: AsyncEngine | None = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        request_state = self.info.get("request_state") or {}
+        if (
+            self._flushing
+            or isinstance(clause, UpdateBase)
+            or request_state.get("wrote")
+        ):
+            return engine.sync_engine
+
+        if self.replica is None or self.replica in replica_router.down:
+            self.replica = replica_router.pick()
+        return (self.replica or engine).sync_engine
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_request_to_primary(session: Session):
+    """
+    Pin the reads of the request to the primary after a commit (read your writes)
+    """
+    request_state = session.info.get("request_state")
+    if request_state is not None and not isinstance(session, RoutingSession):
+        request_state["wrote"] = True
 
 
 AsyncSessionLocal = sessionmaker(  # type: ignore
@@ -19,4 +309,10 @@ AsyncSessionLocal = sessionmaker(  # type: ignore
     expire_on_commit=False,
 )
 
+ReadSessionLocal = sessionmaker(  # type: ignore
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+)
+
 DBBase = declarative_base()
@@ -1,34 +1,55 @@
-from fastapi import Request, status
-from fastapi.encoders import jsonable_encoder
+from fastapi import Request, Response, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import ORJSONResponse
 
 from app.common.exceptions import (
     BadGatewayError,
     CustomHTTPException,
     InternalServerError,
 )
+from app.common.responses import error_envelope
+from app.core.logger import get_logger, request_id_var
 from app.core.settings import get_settings
 
 # Globals
 settings = get_settings()
+logger = get_logger(__name__)
 
+# Constants (the static error bodies are serialized once)
+INTERNAL_SERVER_ERROR_BODY = error_envelope("Internal Server Error", [])
 
-async def base_exception_handler(_: Request, exc: Exception):
+
+def error_response(
+    body: bytes, *, status_code: int, headers: dict[str, str] | None = None
+) -> Response:
+    """
+    JSON response of a serialized error envelope
+    """
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+async def base_exception_handler(request: Request, exc: Exception):
     """
     Exception handler for general Exception
     """
-    # OPTIONAL: send email to staff
-    print(exc)
-    return ORJSONResponse(
+    # Runs in ServerErrorMiddleware, outside of RequestIdMiddleware (whose context
+    # var is already reset), the id is on the request state
+    request_id = getattr(request.state, "request_id", None)
+    token = request_id_var.set(request_id)
+    try:
+        # OPTIONAL: send email to staff
+        logger.error("Unhandled exception: %s", exc, exc_info=exc)
+    finally:
+        request_id_var.reset(token)
+
+    return error_response(
+        INTERNAL_SERVER_ERROR_BODY,
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content=jsonable_encoder(
-            {
-                "status": "error",
-                "error": {"msg": "Internal Server Error", "loc": []},
-                "data": None,
-            }
-        ),
+        headers={"X-Request-ID": request_id} if request_id else None,
     )
 
 
@@ -40,15 +61,9 @@ async def request_validation_exception_handler(_: Request, exc: RequestValidatio
     # Get error message
     error = exc.errors()[0]
 
-    return ORJSONResponse(
+    return error_response(
+        error_envelope(error["msg"], error["loc"]),
         status_code=status.HTTP_400_BAD_REQUEST,
-        content=jsonable_encoder(
-            {
-                "status": "error",
-                "error": {"msg": error["msg"], "loc": error["loc"]},
-                "data": None,
-            }
-        ),
     )
 
 
@@ -57,16 +72,15 @@ async def internal_server_error_exception_handler(_: Request, exc: InternalServe
     Exception handler for 'InternalServerError' exception
     """
     # OPTIONAL: send email to staff
-    print(exc)
-    return ORJSONResponse(
+    logger.error(
+        "Internal server error: %s",
+        exc.msg,
+        extra={"loc": exc.loc, "error_timestamp": exc.timestamp},
+        exc_info=exc,
+    )
+    return error_response(
+        INTERNAL_SERVER_ERROR_BODY,
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content=jsonable_encoder(
-            {
-                "status": "error",
-                "error": {"msg": "Internal Server Error", "loc": []},
-                "data": None,
-            }
-        ),
     )
 
 
@@ -75,16 +89,24 @@ async def bad_gateway_error_exception_handler(_: Request, exc: BadGatewayError):
     Exception handler for 'BadGatewayError' exception
     """
     # OPTIONAL: send email to staff
-    print(exc)
-    return ORJSONResponse(
+    logger.error(
+        "Bad gateway: %s",
+        exc.msg,
+        extra={
+            "loc": exc.loc,
+            "service": exc.service,
+            "payload": exc.payload,
+            "response_status_code": exc.response_status_code,
+            "response": exc.response,
+            "elapsed": exc.elapsed,
+            "attempts": exc.attempts,
+            "error_timestamp": exc.timestamp,
+        },
+        exc_info=exc,
+    )
+    return error_response(
+        error_envelope("Bad Gateway Please Contact Support", exc.loc),
         status_code=status.HTTP_502_BAD_GATEWAY,
-        content=jsonable_encoder(
-            {
-                "status": "error",
-                "error": {"msg": "Bad Gateway Please Contact Support", "loc": exc.loc},
-                "data": None,
-            }
-        ),
     )
 
 
@@ -92,13 +114,8 @@ async def custom_http_exception_handler(_: Request, exc: CustomHTTPException):
     """
     Exception handler for 'NotFound' exception
     """
-    return ORJSONResponse(
+    return error_response(
+        error_envelope(exc.msg, exc.loc),
         status_code=exc.status_code,
-        content=jsonable_encoder(
-            {
-                "status": "error",
-                "error": {"msg": exc.msg, "loc": exc.loc},
-                "data": None,
-            }
-        ),
+        headers=exc.headers,
     )
@@ -0,0 +1,167 @@
+import time
+
+import httpx
+
+from app.core.logger import get_logger
+from app.core.settings import get_settings
+
+# Optional dependencies
+try:
+    import h2  # HTTP/2 support of httpx (httpx[http2])
+except ImportError:  # pragma: no cover
+    h2 = None
+
+# Globals
+settings = get_settings()
+logger = get_logger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker.
+
+    Opens after `failure_threshold` consecutive failures, calls are then rejected
+    without touching the network. After `reset_timeout` seconds a single trial call
+    is let through (half-open): its success closes the breaker, its failure opens
+    it for another `reset_timeout`.
+    """
+
+    def __init__(self, *, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_at: float | None = None
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """
+        Check if a call may go out, taking the trial slot when half-open
+        """
+        state = self.state
+        if state == "closed":
+            return True
+
+        now = time.monotonic()
+        # One trial at a time, a trial that never reported back expires
+        if state == "half_open" and (
+            self.trial_at is None or now - self.trial_at >= self.reset_timeout
+        ):
+            self.trial_at = now
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.trial_at = None
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+class HTTPClientRegistry:
+    """
+    Owns the outbound HTTP clients of the worker, one `httpx.AsyncClient` (and its
+    connection pool) and one circuit breaker per upstream base URL.
+
+    The clients of the upstreams listed in `HTTP_CLIENT_UPSTREAMS` are created by
+    the app lifespan (`init`), others on first use. Every InternalRequestClient of
+    the same upstream shares them. They are closed by the app lifespan on shutdown.
+    """
+
+    def __init__(self):
+        self.clients: dict[str, httpx.AsyncClient] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def init(self):
+        """
+        Create the clients of the configured upstreams
+        """
+        for base_url in settings.HTTP_CLIENT_UPSTREAMS.split(","):
+            if base_url.strip():
+                self.get_client(base_url.strip())
+
+    def get_client(self, base_url: str) -> httpx.AsyncClient:
+        """
+        Get the shared client of an upstream
+
+        Args:
+            base_url (str): The upstream's base URL
+
+        Returns:
+            httpx.AsyncClient: The shared client
+        """
+        client = self.clients.get(base_url)
+        if client is None:
+            http2 = settings.HTTP_CLIENT_HTTP2
+            if http2 and h2 is None:
+                logger.warning("HTTP/2 requires `uv add httpx[http2]`, using HTTP/1.1")
+                http2 = False
+
+            client = self.clients[base_url] = httpx.AsyncClient(
+                base_url=base_url,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(
+                    settings.HTTP_CLIENT_TIMEOUT,
+                    connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+                    pool=settings.HTTP_CLIENT_POOL_TIMEOUT,
+                ),
+            )
+        return client
+
+    def get_breaker(self, base_url: str) -> CircuitBreaker:
+        """
+        Get the circuit breaker of an upstream
+        """
+        breaker = self.breakers.get(base_url)
+        if breaker is None:
+            breaker = self.breakers[base_url] = CircuitBreaker(
+                failure_threshold=settings.HTTP_CLIENT_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.HTTP_CLIENT_BREAKER_RESET_TIMEOUT,
+            )
+        return breaker
+
+    async def close(self):
+        """
+        Close every client and its connections
+        """
+        clients, self.clients = self.clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def stats(self) -> dict:
+        """
+        Circuit breaker state of every upstream
+        """
+        return {
+            base_url: breaker.stats() for base_url, breaker in self.breakers.items()
+        }
+
+
+http_client_registry = HTTPClientRegistry()
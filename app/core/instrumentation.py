@@ -0,0 +1,182 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Awaitable, Callable, TypeVar
+
+from logfire import warn
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.database import engine, replica_engines
+from app.core.settings import get_settings
+
+# Globals
+settings = get_settings()
+
+# Type vars
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+class RequestMetrics:
+    """
+    Queries and cache operations of a single request
+    """
+
+    __slots__ = ("queries", "db_time", "cache_ops", "cache_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_ops = 0
+        self.cache_time = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def repeated_statements(self, threshold: int) -> dict[str, int]:
+        """
+        Get the statements run at least `threshold` times (likely N+1 queries)
+        """
+        return {
+            statement: count
+            for statement, count in self.statements.items()
+            if count >= threshold
+        }
+
+
+current_metrics: ContextVar[RequestMetrics | None] = ContextVar(
+    "current_metrics", default=None
+)
+
+
+class RouteReport:
+    """
+    Per route aggregate of the sampled requests of this worker
+    """
+
+    def __init__(self):
+        self.routes: dict[str, dict] = {}
+
+    def record(self, route: str, metrics: RequestMetrics, n_plus_one: dict[str, int]):
+        """
+        Add a sampled request to the route's aggregate
+        """
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = {
+                "requests": 0,
+                "queries": 0,
+                "queries_max": 0,
+                "db_time": 0.0,
+                "cache_ops": 0,
+                "cache_time": 0.0,
+                "n_plus_one": {},
+            }
+
+        stats["requests"] += 1
+        stats["queries"] += metrics.queries
+        stats["queries_max"] = max(stats["queries_max"], metrics.queries)
+        stats["db_time"] += metrics.db_time
+        stats["cache_ops"] += metrics.cache_ops
+        stats["cache_time"] += metrics.cache_time
+        for statement, count in n_plus_one.items():
+            stats["n_plus_one"][statement] = max(
+                stats["n_plus_one"].get(statement, 0), count
+            )
+
+    def report(self) -> dict[str, dict]:
+        """
+        Get the aggregate of every route, with per request averages
+        """
+        return {
+            route: {
+                **stats,
+                "queries_avg": stats["queries"] / stats["requests"],
+                "db_time_avg": stats["db_time"] / stats["requests"],
+                "cache_time_avg": stats["cache_time"] / stats["requests"],
+            }
+            for route, stats in self.routes.items()
+        }
+
+
+route_report = RouteReport()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=unused-argument
+    if current_metrics.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=unused-argument
+    metrics = current_metrics.get()
+    if metrics is None or not conn.info.get("query_start"):
+        return
+
+    metrics.queries += 1
+    metrics.db_time += time.perf_counter() - conn.info["query_start"].pop()
+    metrics.statements[statement] += 1
+
+
+def instrument_engine(async_engine: AsyncEngine):
+    """
+    Count the queries (and their time) of the engine in the current request's metrics
+    """
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute
+    )
+    event.listen(
+        async_engine.sync_engine, "after_cursor_execute", _after_cursor_execute
+    )
+
+
+def instrument_cache(func: F) -> F:
+    """
+    Decorator counting a cache operation (and its time) in the current request's metrics
+    """
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return await func(*args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            metrics.cache_ops += 1
+            metrics.cache_time += time.perf_counter() - start
+
+    return wrapper  # type: ignore
+
+
+def server_timing(metrics: RequestMetrics, total: float) -> bytes:
+    """
+    Build the Server-Timing header value of a request (durations in ms)
+    """
+    return (
+        f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries", '
+        f'cache;dur={metrics.cache_time * 1000:.2f};desc="{metrics.cache_ops} ops", '
+        f"total;dur={total * 1000:.2f}"
+    ).encode()
+
+
+def finish_request(route: str, metrics: RequestMetrics):
+    """
+    Flag the N+1 patterns of a finished request and add it to the route report
+    """
+    n_plus_one = metrics.repeated_statements(
+        settings.QUERY_METRICS_N_PLUS_ONE_THRESHOLD
+    )
+    if n_plus_one:
+        warn(
+            "Possible N+1 queries on {route}",
+            route=route,
+            statements=n_plus_one,
+        )
+
+    route_report.record(route, metrics, n_plus_one)
+
+
+if settings.QUERY_METRICS_ENABLED:
+    for _engine in (engine, *replica_engines):
+        instrument_engine(_engine)
@@ -0,0 +1,187 @@
+import logging
+import queue
+import sys
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+from app.core.settings import get_settings
+
+# Globals
+settings = get_settings()
+logger = logging.getLogger("app")
+
+# Request id of the request being handled, set by RequestIdMiddleware
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has, the others are extra fields passed by the caller
+RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "request_id", "suppressed"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats records as JSON lines, with the request id and the caller's extra fields
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        if getattr(record, "suppressed", 0):
+            data["suppressed"] = record.suppressed
+
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                data[key] = value
+
+        return orjson.dumps(data, default=str).decode()
+
+
+class ErrorSampler(logging.Filter):
+    """
+    Lets at most `limit` identical errors through per `window` seconds.
+
+    Errors are identical when they are raised from the same place with the same
+    exception type and message. The first error logged after the window reports
+    how many were dropped (`suppressed`).
+    """
+
+    def __init__(self, *, limit: int, window: float, max_keys: int = 1000):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # key -> [window start, count in window, suppressed]
+        self.seen: dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.ERROR:
+            return True
+
+        exc = record.exc_info[1] if record.exc_info else None
+        key = (
+            record.pathname,
+            record.lineno,
+            type(exc).__name__,
+            str(exc or record.msg),
+        )
+        now = time.monotonic()
+
+        entry = self.seen.get(key)
+        if entry is None or now - entry[0] >= self.window:
+            if entry is None and len(self.seen) >= self.max_keys:
+                self.seen.clear()
+            suppressed = entry[2] if entry else 0
+            self.seen[key] = [now, 1, 0]
+            record.suppressed = suppressed
+            return True
+
+        entry[1] += 1
+        if entry[1] > self.limit:
+            entry[2] += 1
+            return False
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Queue handler capturing the request id in the caller's context.
+
+    Records are formatted by the listener thread, only the message and the
+    traceback are rendered here. Records are dropped (and counted) when the
+    queue is full rather than blocking.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info))
+
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingPipeline:
+    """
+    Owns the log queue and the background thread writing the JSON lines to stdout
+    """
+
+    def __init__(self):
+        self.handler: ContextQueueHandler | None = None
+        self.listener: QueueListener | None = None
+
+    def start(self):
+        """
+        Route the app's loggers through the queue and start the listener thread
+        """
+        if self.listener is not None:
+            return
+
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        self.handler = ContextQueueHandler(log_queue)
+        self.handler.addFilter(
+            ErrorSampler(
+                limit=settings.LOG_ERROR_SAMPLE_LIMIT,
+                window=settings.LOG_ERROR_SAMPLE_WINDOW,
+            )
+        )
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JSONFormatter())
+        self.listener = QueueListener(log_queue, stream_handler)
+        self.listener.start()
+
+        logger.addHandler(self.handler)
+        logger.setLevel(settings.LOG_LEVEL)
+        logger.propagate = False
+
+    def stop(self):
+        """
+        Write the queued records and stop the listener thread
+        """
+        if self.listener is None:
+            return
+
+        logger.removeHandler(self.handler)  # type: ignore
+        self.listener.stop()
+        self.listener = None
+        self.handler = None
+
+
+logging_pipeline = LoggingPipeline()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger of the app, e.g get_logger(__name__)
+    """
+    if name == "app" or name.startswith("app."):
+        return logging.getLogger(name)
+    return logger.getChild(name)
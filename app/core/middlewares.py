@@ -0,0 +1,297 @@
+import random
+import re
+import time
+from typing import Iterable, Mapping
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.common.compression import (
+    StreamCompressor,
+    available_encodings,
+    compress,
+    compression_min_size,
+    is_compressible,
+    missing_encodings,
+    negotiate,
+)
+from app.common.rate_limit import RATE_LIMIT_HEADERS_STATE
+from app.core.instrumentation import (
+    RequestMetrics,
+    current_metrics,
+    finish_request,
+    server_timing,
+)
+from app.core.logger import get_logger, request_id_var
+
+# Globals
+logger = get_logger(__name__)
+
+# Constants
+REQUEST_ID_HEADER = b"x-request-id"
+REQUEST_ID_PATTERN = re.compile(rb"^[A-Za-z0-9._-]{1,128}$")
+
+
+class RequestIdMiddleware:
+    """
+    Tags every request with an id (the incoming X-Request-ID or a new one) for log
+    correlation. The id is returned in the X-Request-ID response header, on
+    unhandled errors by `base_exception_handler`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (
+                value
+                for name, value in scope["headers"]
+                if name == REQUEST_ID_HEADER and REQUEST_ID_PATTERN.match(value)
+            ),
+            uuid4().hex.encode(),
+        )
+        # Also kept on the request state for the 500 handler, which runs outside of
+        # every middleware (in ServerErrorMiddleware), after the reset below
+        scope.setdefault("state", {})["request_id"] = request_id.decode()
+        token = request_id_var.set(request_id.decode())
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER, request_id),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Adds the RateLimit-* headers computed by `RateLimiter` (kept on the request
+    state) to the response, including the responses built by the route itself
+    (`cache_response`, `envelope_response`...).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                rate_limit_headers = scope.get("state", {}).get(
+                    RATE_LIMIT_HEADERS_STATE
+                )
+                if rate_limit_headers:
+                    message["headers"] = list(message.get("headers", []))
+                    headers = MutableHeaders(raw=message["headers"])
+                    for name, value in rate_limit_headers.items():
+                        headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class SecurityHeadersMiddleware:
+    """
+    Adds security headers (e.g those of `secure.Secure`) to every response,
+    except on the exempt paths (docs).
+
+    The raw header block is built once, responses only get it appended when they
+    start, so streaming responses are untouched. Headers already set by the route
+    with the same names are replaced.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        headers: Mapping[str, str],
+        exempt_paths: Iterable[str] = (),
+    ):
+        self.app = app
+        self.raw_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers.items()
+        ]
+        self.header_names = frozenset(name for name, _ in self.raw_headers)
+        self.exempt_paths = frozenset(exempt_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    header
+                    for header in message.get("headers", [])
+                    if header[0].lower() not in self.header_names
+                ] + self.raw_headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class QueryMetricsMiddleware:
+    """
+    Collects the queries and cache operations of (a sample of) the requests.
+
+    Sampled responses get a Server-Timing header and are aggregated per route,
+    see `route_report`. Pure ASGI so streaming responses are not buffered.
+    """
+
+    def __init__(
+        self, app: ASGIApp, sample_rate: float = 1.0, server_timing: bool = True
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or (
+            self.sample_rate < 1 and random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and self.server_timing:
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (
+                        b"server-timing",
+                        server_timing(metrics, time.perf_counter() - start),
+                    )
+                )
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_metrics.reset(token)
+            # Unmatched paths are grouped so the report stays bounded
+            route = scope.get("route")
+            finish_request(getattr(route, "path", "<unmatched>"), metrics)
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with the best encoding the client accepts (br, zstd or
+    gzip, see `COMPRESSION_ENCODINGS`).
+
+    Responses smaller than the encoding's minimum size, already encoded (e.g
+    precompressed by `cache_response`), marked no-transform or of an already
+    compressed content type (images, archives...) are sent untouched. Streaming
+    responses are compressed chunk by chunk, each chunk is flushed right away.
+    Strong ETags of compressed responses are made weak.
+    """
+
+    def __init__(self, app: ASGIApp, encodings: tuple[str, ...] | None = None):
+        self.app = app
+        if encodings is None:
+            encodings = available_encodings()
+            for encoding in missing_encodings():
+                logger.warning(
+                    "%s compression is unavailable (unknown encoding or `compression` extra not installed), skipping it",
+                    encoding,
+                )
+        self.encodings = encodings
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        compressor: StreamCompressor | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, compressor, passthrough
+
+            if passthrough or message["type"] not in (
+                "http.response.start",
+                "http.response.body",
+            ):
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                # Held until the first body chunk tells whether to compress
+                start_message = message
+                return
+
+            if compressor is not None:
+                body = message.get("body", b"")
+                if message.get("more_body", False):
+                    message["body"] = compressor.compress(body)
+                else:
+                    message["body"] = compressor.finish(body)
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start["headers"] = list(start.get("headers", []))  # type: ignore
+            headers = MutableHeaders(raw=start["headers"])  # type: ignore
+
+            if (
+                start["status"] < 200  # type: ignore
+                or start["status"] in (204, 304)  # type: ignore
+                or "content-encoding" in headers
+                or "no-transform" in headers.get("cache-control", "")
+                or not is_compressible(headers.get("content-type"))
+                or (not more_body and len(body) < compression_min_size(encoding))
+            ):
+                passthrough = True
+                await send(start)  # type: ignore
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            # The compressed body is another representation, it can't keep the
+            # identity body's strong ETag
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                compressor = StreamCompressor(encoding)
+                del headers["Content-Length"]
+                message["body"] = compressor.compress(body)
+            else:
+                message["body"] = compress(body, encoding)
+                headers["Content-Length"] = str(len(message["body"]))
+
+            await send(start)  # type: ignore
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
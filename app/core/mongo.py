@@ -0,0 +1,63 @@
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.core.settings import get_settings
+
+settings = get_settings()
+
+
+class MongoClientRegistry:
+    """
+    Owns the single async MongoDB client (and its connection pool) shared by the worker.
+
+    The client is created by the app lifespan when `MONGO_DATABASE_URL` is set
+    and closed on shutdown.
+    """
+
+    def __init__(self):
+        self.client: AsyncMongoClient | None = None
+
+    def init(self) -> AsyncMongoClient:
+        """
+        Create the client (no-op if it already exists)
+
+        Returns:
+            AsyncMongoClient: The shared client
+        """
+        if self.client is None:
+            self.client = AsyncMongoClient(
+                settings.MONGO_DATABASE_URL,
+                maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            )
+        return self.client
+
+    async def close(self):
+        """
+        Close the client and its connections
+        """
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    def get_database(self, name: str | None = None) -> AsyncDatabase:
+        """
+        Get a database, defaults to the one in the connection URL
+        """
+        client = self.init()
+        if name is None:
+            return client.get_default_database()
+        return client.get_database(name)
+
+    def get_collection(self, name: str, database: str | None = None) -> AsyncCollection:
+        """
+        Get a collection of the (default) database
+        """
+        return self.get_database(database).get_collection(name)
+
+
+mongo_registry = MongoClientRegistry()
@@ -0,0 +1,200 @@
+import asyncio
+import time
+from contextlib import suppress
+from typing import Awaitable, Callable
+
+import redis.asyncio as redis
+from redis.asyncio.client import PubSub
+
+from app.core.logger import get_logger
+from app.core.settings import get_settings
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """
+    Blocking connection pool that keeps track of how long callers wait for a connection
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        connection = await super().get_connection(*args, **kwargs)
+        waited = time.perf_counter() - start
+
+        self.checkouts += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        return connection
+
+
+class RedisPoolRegistry:
+    """
+    Owns the redis connection pools shared by every consumer in the worker
+    (cache, rate limiter, pub/sub...).
+
+    Clients of the default pool decode responses to str. Binary values (the
+    encoded CacheManager entries, cached response bodies) go through a second
+    pool whose clients return raw bytes.
+
+    The pools are created by the app lifespan and closed on shutdown, consumers
+    only borrow clients from them.
+    """
+
+    def __init__(self):
+        self.pool: InstrumentedConnectionPool | None = None
+        self.binary_pool: InstrumentedConnectionPool | None = None
+
+    @staticmethod
+    def _create_pool(**kwargs) -> InstrumentedConnectionPool:
+        return InstrumentedConnectionPool.from_url(
+            settings.REDIS_BROKER_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            **kwargs,
+        )
+
+    def init(self) -> InstrumentedConnectionPool:
+        """
+        Create the connection pools (no-op if they already exist)
+
+        Returns:
+            InstrumentedConnectionPool: The shared (decoding) pool
+        """
+        if self.pool is None:
+            self.pool = self._create_pool(encoding="utf-8", decode_responses=True)
+        if self.binary_pool is None:
+            self.binary_pool = self._create_pool()
+        return self.pool
+
+    async def close(self):
+        """
+        Disconnect every connection in the pools
+        """
+        for pool in (self.pool, self.binary_pool):
+            if pool is not None:
+                await pool.disconnect()
+        self.pool = None
+        self.binary_pool = None
+
+    def get_client(self) -> redis.Redis:
+        """
+        Get a redis client bound to the shared pool, responses are decoded to str.
+
+        Clients are cheap wrappers, the connections are owned by the pool.
+        """
+        return redis.Redis(connection_pool=self.init())
+
+    def get_binary_client(self) -> redis.Redis:
+        """
+        Get a redis client bound to the shared binary pool, responses are raw bytes.
+        """
+        self.init()
+        return redis.Redis(connection_pool=self.binary_pool)
+
+    @staticmethod
+    def _pool_stats(pool: InstrumentedConnectionPool) -> dict:
+        checkouts = pool.checkouts
+        wait_time_avg = pool.wait_time_total / checkouts if checkouts else 0.0
+        return {
+            "max_connections": pool.max_connections,
+            "in_use": len(pool._in_use_connections),  # pylint: disable=protected-access
+            "idle": len(pool._available_connections),  # pylint: disable=protected-access
+            "checkouts": checkouts,
+            "wait_time_avg": wait_time_avg,
+            "wait_time_max": pool.wait_time_max,
+        }
+
+    def stats(self) -> dict:
+        """
+        Get the pool statistics
+
+        Returns:
+            dict: in use/idle connections and connection wait times, per pool
+        """
+        if self.pool is None or self.binary_pool is None:
+            return {}
+
+        return {
+            "default": self._pool_stats(self.pool),
+            "binary": self._pool_stats(self.binary_pool),
+        }
+
+
+redis_registry = RedisPoolRegistry()
+
+
+class RedisPubSubListener:
+    """
+    Background listener that dispatches redis pub/sub messages of the worker
+    to the handlers registered per channel.
+
+    A single connection is held for every subscribed channel.
+    """
+
+    def __init__(self):
+        self.handlers: dict[str, Callable[[str], Awaitable[None]]] = {}
+        self.pubsub: PubSub | None = None
+        self.task: asyncio.Task | None = None
+
+    def subscribe(self, channel: str, handler: Callable[[str], Awaitable[None]]):
+        """
+        Register a handler for a channel, must be called before start()
+
+        Args:
+            channel (str): The channel name
+            handler (Callable): Coroutine called with the message data
+        """
+        self.handlers[channel] = handler
+
+    async def start(self):
+        """
+        Subscribe to the registered channels and start listening
+        """
+        if not self.handlers or self.task is not None:
+            return
+
+        self.pubsub = redis_registry.get_client().pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(*self.handlers)
+        self.task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """
+        Stop listening and release the pub/sub connection
+        """
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+            self.pubsub = None
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self.pubsub.listen():  # type: ignore
+                    handler = self.handlers.get(message["channel"])
+                    if handler:
+                        await handler(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                # The connection is re-established (and channels re-subscribed) on the next read
+                logger.warning("Redis pub/sub listener error: %s", exc)
+                await asyncio.sleep(1)
+
+
+pubsub_listener = RedisPubSubListener()
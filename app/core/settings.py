@@ -1,6 +1,7 @@
 # type: ignore
 import os
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -16,14 +17,153 @@ class Settings(BaseSettings):
     # Logfire
     LOGFIRE_TOKEN: str | None = os.environ.get("LOGFIRE_TOKEN")
 
+    # Logging
+    LOG_LEVEL: str = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_QUEUE_SIZE: int = os.environ.get("LOG_QUEUE_SIZE", 10_000)
+    LOG_ERROR_SAMPLE_LIMIT: int = os.environ.get("LOG_ERROR_SAMPLE_LIMIT", 5)
+    LOG_ERROR_SAMPLE_WINDOW: float = os.environ.get("LOG_ERROR_SAMPLE_WINDOW", 60)
+
     # DB Settings
     POSTGRES_DATABASE_URL: str = os.environ.get("POSTGRES_DATABASE_URL")
+    POSTGRES_POOL_SIZE: int = os.environ.get("POSTGRES_POOL_SIZE", 20)
+    POSTGRES_MAX_OVERFLOW: int = os.environ.get("POSTGRES_MAX_OVERFLOW", 10)
+    POSTGRES_POOL_TIMEOUT: float = os.environ.get("POSTGRES_POOL_TIMEOUT", 30)
+    POSTGRES_POOL_RECYCLE: int = os.environ.get("POSTGRES_POOL_RECYCLE", 1800)
+    POSTGRES_POOL_PRE_PING: bool = os.environ.get("POSTGRES_POOL_PRE_PING", True)
+    POSTGRES_PGBOUNCER: bool = os.environ.get("POSTGRES_PGBOUNCER", False)
+    POSTGRES_PGBOUNCER_NULL_POOL: bool = os.environ.get(
+        "POSTGRES_PGBOUNCER_NULL_POOL", False
+    )
+    POSTGRES_REPLICA_URLS: str = os.environ.get("POSTGRES_REPLICA_URLS", "")
+    POSTGRES_REPLICA_STRATEGY: Literal["round_robin", "least_loaded"] = os.environ.get(
+        "POSTGRES_REPLICA_STRATEGY", "round_robin"
+    )
+    POSTGRES_REPLICA_HEALTH_CHECK_INTERVAL: int = os.environ.get(
+        "POSTGRES_REPLICA_HEALTH_CHECK_INTERVAL", 10
+    )
+    POSTGRES_REPLICA_HEALTH_CHECK_TIMEOUT: int = os.environ.get(
+        "POSTGRES_REPLICA_HEALTH_CHECK_TIMEOUT", 2
+    )
+    POSTGRES_READ_YOUR_WRITES: bool = os.environ.get("POSTGRES_READ_YOUR_WRITES", False)
+
+    # MongoDB (optional)
+    MONGO_DATABASE_URL: str | None = os.environ.get("MONGO_DATABASE_URL")
+    MONGO_MAX_POOL_SIZE: int = os.environ.get("MONGO_MAX_POOL_SIZE", 100)
+    MONGO_MIN_POOL_SIZE: int = os.environ.get("MONGO_MIN_POOL_SIZE", 0)
+    MONGO_MAX_IDLE_TIME_MS: int | None = os.environ.get("MONGO_MAX_IDLE_TIME_MS")
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int | None = os.environ.get(
+        "MONGO_WAIT_QUEUE_TIMEOUT_MS"
+    )
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = os.environ.get(
+        "MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000
+    )
 
     # REDIS
     REDIS_BROKER_URL: str = os.environ.get("REDIS_BROKER_URL")
+    REDIS_MAX_CONNECTIONS: int = os.environ.get("REDIS_MAX_CONNECTIONS", 50)
+    REDIS_POOL_TIMEOUT: float = os.environ.get("REDIS_POOL_TIMEOUT", 5)
+    REDIS_HEALTH_CHECK_INTERVAL: int = os.environ.get("REDIS_HEALTH_CHECK_INTERVAL", 30)
+    REDIS_SOCKET_TIMEOUT: float = os.environ.get("REDIS_SOCKET_TIMEOUT", 5)
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = os.environ.get(
+        "REDIS_SOCKET_CONNECT_TIMEOUT", 5
+    )
+
+    # Rate limiting
+    RATE_LIMIT_TIMES: int = os.environ.get("RATE_LIMIT_TIMES", 3)
+    RATE_LIMIT_SECONDS: float = os.environ.get("RATE_LIMIT_SECONDS", 1)
+    RATE_LIMIT_LEASE_SIZE: int = os.environ.get("RATE_LIMIT_LEASE_SIZE", 0)
+    RATE_LIMIT_REDIS_TIMEOUT: float = os.environ.get("RATE_LIMIT_REDIS_TIMEOUT", 0.1)
+    RATE_LIMIT_FAIL_OPEN: bool = os.environ.get("RATE_LIMIT_FAIL_OPEN", True)
+
+    # Cache
+    CACHE_SERIALIZER: Literal["orjson", "msgpack"] = os.environ.get(
+        "CACHE_SERIALIZER", "orjson"
+    )
+    CACHE_COMPRESSION: Literal["none", "zstd", "lz4"] = os.environ.get(
+        "CACHE_COMPRESSION", "none"
+    )
+    CACHE_COMPRESSION_MIN_SIZE: int = os.environ.get("CACHE_COMPRESSION_MIN_SIZE", 1024)
+    CACHE_COMPRESSION_LEVEL: int = os.environ.get("CACHE_COMPRESSION_LEVEL", 3)
+
+    # Cache (in-process L1 tier)
+    CACHE_L1_MAX_ENTRIES: int = os.environ.get("CACHE_L1_MAX_ENTRIES", 10_000)
+    CACHE_L1_MAX_BYTES: int = os.environ.get("CACHE_L1_MAX_BYTES", 64 * 1024 * 1024)
+    CACHE_L1_MAX_TTL: float = os.environ.get("CACHE_L1_MAX_TTL", 60)
+    CACHE_L1_POLICY: Literal["lru", "tinylfu"] = os.environ.get(
+        "CACHE_L1_POLICY", "lru"
+    )
+
+    # Outbound HTTP (InternalRequestClient)
+    HTTP_CLIENT_UPSTREAMS: str = os.environ.get("HTTP_CLIENT_UPSTREAMS", "")
+    HTTP_CLIENT_TIMEOUT: float = os.environ.get("HTTP_CLIENT_TIMEOUT", 10)
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = os.environ.get(
+        "HTTP_CLIENT_CONNECT_TIMEOUT", 3
+    )
+    HTTP_CLIENT_POOL_TIMEOUT: float = os.environ.get("HTTP_CLIENT_POOL_TIMEOUT", 1)
+    HTTP_CLIENT_MAX_CONNECTIONS: int = os.environ.get("HTTP_CLIENT_MAX_CONNECTIONS", 50)
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = os.environ.get(
+        "HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS", 20
+    )
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = os.environ.get(
+        "HTTP_CLIENT_KEEPALIVE_EXPIRY", 30
+    )
+    HTTP_CLIENT_HTTP2: bool = os.environ.get("HTTP_CLIENT_HTTP2", False)
+    HTTP_CLIENT_RETRIES: int = os.environ.get("HTTP_CLIENT_RETRIES", 2)
+    HTTP_CLIENT_BACKOFF_BASE: float = os.environ.get("HTTP_CLIENT_BACKOFF_BASE", 0.1)
+    HTTP_CLIENT_BACKOFF_MAX: float = os.environ.get("HTTP_CLIENT_BACKOFF_MAX", 2)
+    HTTP_CLIENT_BREAKER_FAILURE_THRESHOLD: int = os.environ.get(
+        "HTTP_CLIENT_BREAKER_FAILURE_THRESHOLD", 5
+    )
+    HTTP_CLIENT_BREAKER_RESET_TIMEOUT: float = os.environ.get(
+        "HTTP_CLIENT_BREAKER_RESET_TIMEOUT", 30
+    )
+    # Outbound HTTP cache (InternalRequestClient(..., cache=...))
+    HTTP_CACHE_MAX_TTL: int = os.environ.get("HTTP_CACHE_MAX_TTL", 3600)
+    HTTP_CACHE_REVALIDATE_TTL: int = os.environ.get("HTTP_CACHE_REVALIDATE_TTL", 300)
+
+    # Response compression
+    COMPRESSION_ENCODINGS: str = os.environ.get("COMPRESSION_ENCODINGS", "br,zstd,gzip")
+    COMPRESSION_BR_LEVEL: int = os.environ.get("COMPRESSION_BR_LEVEL", 4)
+    COMPRESSION_BR_MIN_SIZE: int = os.environ.get("COMPRESSION_BR_MIN_SIZE", 1024)
+    COMPRESSION_ZSTD_LEVEL: int = os.environ.get("COMPRESSION_ZSTD_LEVEL", 3)
+    COMPRESSION_ZSTD_MIN_SIZE: int = os.environ.get("COMPRESSION_ZSTD_MIN_SIZE", 1024)
+    COMPRESSION_GZIP_LEVEL: int = os.environ.get("COMPRESSION_GZIP_LEVEL", 6)
+    COMPRESSION_GZIP_MIN_SIZE: int = os.environ.get("COMPRESSION_GZIP_MIN_SIZE", 1024)
+    COMPRESSION_CACHE_VARIANTS: bool = os.environ.get(
+        "COMPRESSION_CACHE_VARIANTS", True
+    )
+
+    # Metrics
+    METRICS_ENABLED: bool = os.environ.get("METRICS_ENABLED", False)
+    QUERY_METRICS_ENABLED: bool = os.environ.get("QUERY_METRICS_ENABLED", False)
+    QUERY_METRICS_SAMPLE_RATE: float = os.environ.get("QUERY_METRICS_SAMPLE_RATE", 1.0)
+    QUERY_METRICS_SERVER_TIMING: bool = os.environ.get(
+        "QUERY_METRICS_SERVER_TIMING", True
+    )
+    QUERY_METRICS_N_PLUS_ONE_THRESHOLD: int = os.environ.get(
+        "QUERY_METRICS_N_PLUS_ONE_THRESHOLD", 5
+    )
 
     # JWT
     SECRET_KEY: str = os.environ.get("SECRET_KEY")
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = os.environ.get(
+        "AUTH_TOKEN_CACHE_MAX_ENTRIES", 10_000
+    )
+    AUTH_REVOCATION_CAPACITY: int = os.environ.get("AUTH_REVOCATION_CAPACITY", 100_000)
+    AUTH_REVOCATION_ERROR_RATE: float = os.environ.get(
+        "AUTH_REVOCATION_ERROR_RATE", 0.001
+    )
+    AUTH_REVOCATION_REFRESH_INTERVAL: float = os.environ.get(
+        "AUTH_REVOCATION_REFRESH_INTERVAL", 300
+    )
+
+    # Password hashing (argon2)
+    ARGON2_TIME_COST: int = os.environ.get("ARGON2_TIME_COST", 3)
+    ARGON2_MEMORY_COST: int = os.environ.get("ARGON2_MEMORY_COST", 65536)
+    ARGON2_PARALLELISM: int = os.environ.get("ARGON2_PARALLELISM", 4)
+    ARGON2_HASH_LEN: int = os.environ.get("ARGON2_HASH_LEN", 32)
+    ARGON2_SALT_LEN: int = os.environ.get("ARGON2_SALT_LEN", 16)
+    PASSWORD_HASHING_WORKERS: int = os.environ.get("PASSWORD_HASHING_WORKERS", 4)
 
 
 @lru_cache
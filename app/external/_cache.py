@@ -0,0 +1,198 @@
+import base64
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Literal
+
+import httpx
+
+from app.common.cache import (
+    CacheManager,
+    cache_codec,
+    generate_cache_key,
+    local_cache,
+)
+from app.core.settings import get_settings
+
+# Globals
+settings = get_settings()
+
+# Constants
+HTTP_CACHE_PREFIX = "http:"
+CACHEABLE_STATUS_CODES = frozenset({200, 203, 300, 301, 308, 404, 410})
+# The stored body is already decoded
+DROPPED_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+
+def parse_cache_control(value: str | None) -> dict[str, str | None]:
+    """
+    Parse a Cache-Control header e.g "public, max-age=60" -> {"public": None, "max-age": "60"}
+    """
+    directives: dict[str, str | None] = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.partition("=")
+        name = name.strip().lower()
+        if name:
+            directives[name] = argument.strip().strip('"') or None
+    return directives
+
+
+def freshness_lifetime(response: httpx.Response) -> float | None:
+    """
+    Seconds a response stays fresh from now (max-age minus Age, else Expires minus
+    Date), 0 if it must be revalidated and None if it must not be stored
+    """
+    directives = parse_cache_control(response.headers.get("cache-control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+
+    if "max-age" in directives:
+        try:
+            max_age = int(directives["max-age"] or 0)
+        except ValueError:
+            return 0
+        try:
+            age = int(response.headers.get("age", 0))
+        except ValueError:
+            age = 0
+        return max(max_age - age, 0)
+
+    expires = response.headers.get("expires")
+    if expires:
+        try:
+            date = response.headers.get("date")
+            now = parsedate_to_datetime(date).timestamp() if date else time.time()
+            return max(parsedate_to_datetime(expires).timestamp() - now, 0)
+        except (TypeError, ValueError):
+            return 0
+
+    return 0
+
+
+class HTTPCache:
+    """
+    Cache of upstream GET responses, in the in-process L1 cache (`local`, per
+    worker) or in redis through CacheManager (`redis`, shared by the workers).
+
+    Entries hold the response with its validators (ETag, Last-Modified) and stay
+    stored `HTTP_CACHE_REVALIDATE_TTL` seconds past their freshness when they have
+    validators, so stale entries are revalidated with a conditional request
+    instead of being downloaded again.
+    """
+
+    def __init__(self, backend: Literal["local", "redis"]):
+        self.backend = backend
+
+    @staticmethod
+    def key_data(url: str, params: Any, headers: dict[str, str] | None) -> dict:
+        """
+        The data identifying a request, the request headers are part of it since
+        upstream responses may vary on any of them (e.g Authorization)
+        """
+        return {
+            "url": url,
+            "params": sorted(httpx.QueryParams(params).multi_items()),
+            "headers": sorted((headers or {}).items()),
+        }
+
+    async def get(self, data: dict) -> dict | None:
+        """
+        Get the stored entry of a request
+        """
+        if self.backend == "local":
+            cached_data = local_cache.get(generate_cache_key(data, HTTP_CACHE_PREFIX))
+            return None if cached_data is None else cache_codec.decode(cached_data)
+
+        return await CacheManager(
+            ttl=0, cache_prefix=HTTP_CACHE_PREFIX, data=data
+        ).get()
+
+    async def set(self, data: dict, response: httpx.Response) -> dict | None:
+        """
+        Store a response if it is cacheable
+
+        Returns:
+            dict | None: The stored entry, None if it was not cacheable
+        """
+        fresh_for = freshness_lifetime(response)
+        if fresh_for is None or response.status_code not in CACHEABLE_STATUS_CODES:
+            return None
+
+        fresh_for = min(fresh_for, settings.HTTP_CACHE_MAX_TTL)
+        validators = "etag" in response.headers or "last-modified" in response.headers
+        ttl = int(fresh_for + (settings.HTTP_CACHE_REVALIDATE_TTL if validators else 0))
+        if ttl <= 0:
+            return None
+
+        entry = {
+            "status": response.status_code,
+            "headers": [
+                [name, value]
+                for name, value in response.headers.multi_items()
+                if name not in DROPPED_HEADERS
+            ],
+            "content": base64.b64encode(response.content).decode(),
+            "fresh_until": time.time() + fresh_for,
+        }
+
+        if self.backend == "local":
+            local_cache.set(
+                generate_cache_key(data, HTTP_CACHE_PREFIX),
+                cache_codec.encode(entry),
+                ttl,
+            )
+        else:
+            await CacheManager(ttl=ttl, cache_prefix=HTTP_CACHE_PREFIX, data=data).set(
+                entry
+            )
+        return entry
+
+    async def refresh(self, data: dict, entry: dict, response: httpx.Response) -> dict:
+        """
+        Update a stored entry with the headers of its 304 revalidation response
+        """
+        headers = httpx.Headers(entry["headers"])
+        headers.update(
+            {
+                name: value
+                for name, value in response.headers.items()
+                if name not in DROPPED_HEADERS
+            }
+        )
+        refreshed = httpx.Response(
+            entry["status"],
+            headers=headers,
+            content=base64.b64decode(entry["content"]),
+            request=response.request,
+        )
+        return await self.set(data, refreshed) or entry
+
+    @staticmethod
+    def is_fresh(entry: dict) -> bool:
+        return entry["fresh_until"] > time.time()
+
+    @staticmethod
+    def validators(entry: dict) -> dict[str, str]:
+        """
+        The conditional request headers revalidating an entry
+        """
+        headers = httpx.Headers(entry["headers"])
+        conditional = {}
+        if "etag" in headers:
+            conditional["If-None-Match"] = headers["etag"]
+        if "last-modified" in headers:
+            conditional["If-Modified-Since"] = headers["last-modified"]
+        return conditional
+
+    @staticmethod
+    def build_response(entry: dict, request: httpx.Request) -> httpx.Response:
+        """
+        Rebuild the response of a stored entry
+        """
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=base64.b64decode(entry["content"]),
+            request=request,
+        )
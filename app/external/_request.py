@@ -1,17 +1,193 @@
-from typing import Any
+import asyncio
+import random
+import time
+from typing import Any, Literal
 
 import httpx
 
+from app.common.cache import generate_cache_key
+from app.common.exceptions import BadGatewayError
+from app.core.http import http_client_registry
+from app.core.logger import get_logger
+from app.core.settings import get_settings
+from app.external._cache import HTTP_CACHE_PREFIX, HTTPCache
+
+# Globals
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Constants
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+# Failures where the request never reached the upstream, safe to retry for any method
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+# Failures of a slow (or saturated) upstream, retrying would hold the caller for
+# another full timeout
+NOT_RETRIED_ERRORS = (httpx.ReadTimeout, httpx.PoolTimeout)
+ERROR_RESPONSE_MAX_LENGTH = 1000
+
+# In-flight GETs per request key (coalescing)
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _fetch_done(key: str, task: asyncio.Task):
+    """
+    Done callback of coalesced GETs
+    """
+    _inflight.pop(key, None)
+
+    # Retrieve the exception so failures nobody waited for are not reported as unhandled
+    if not task.cancelled():
+        task.exception()
+
 
 class InternalRequestClient:
     """
     Internal client for async requests
+
+    Every client of the same `base_url` shares one connection pool and circuit
+    breaker (see `http_client_registry`). Idempotent requests are retried with
+    exponential backoff and jitter on transport errors and 502/503/504, others only
+    when the connection failed. Read and pool timeouts are not retried. Transport
+    errors, 5xx responses and calls rejected by the open breaker raise
+    `BadGatewayError`, 4xx responses are returned. A request counts as one breaker
+    failure however many times it was retried.
+
+    GETs can opt into an HTTP cache (`cache`) honouring the upstream's
+    Cache-Control, with stale entries revalidated by ETag/Last-Modified, and into
+    coalescing (`coalesce`): identical concurrent GETs of the worker share one
+    upstream request, and the same response object.
     """
 
-    def __init__(self, base_url: str, timeout: int = 10):
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float | None = None,
+        *,
+        service: str | None = None,
+        retries: int | None = None,
+        cache: Literal["local", "redis"] | None = None,
+        coalesce: bool = False,
+    ):
+        """
+        Args:
+            base_url: The upstream's base URL
+            timeout: (optional) Seconds to wait on the upstream, defaults to `HTTP_CLIENT_TIMEOUT`
+            service: (optional) Name of the upstream in errors, defaults to `base_url`
+            retries: (optional) Retries of a failed request, defaults to `HTTP_CLIENT_RETRIES`
+            cache: (optional) Cache GET responses in the worker's L1 cache or in redis
+            coalesce: (optional) Share one upstream request between identical concurrent GETs
+        """
         self.base_url = base_url
-        self.timeout = timeout
-        self.client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+        self.timeout = httpx.Timeout(
+            settings.HTTP_CLIENT_TIMEOUT if timeout is None else timeout,
+            connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+            pool=settings.HTTP_CLIENT_POOL_TIMEOUT,
+        )
+        self.service = service or base_url
+        self.retries = settings.HTTP_CLIENT_RETRIES if retries is None else retries
+        self.breaker = http_client_registry.get_breaker(base_url)
+        self.cache = HTTPCache(cache) if cache else None
+        self.coalesce = coalesce
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        The upstream's shared client, looked up on every use so clients outliving a
+        lifespan don't keep a closed one
+        """
+        return http_client_registry.get_client(self.base_url)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter, so clients retrying together spread out
+        return random.uniform(
+            0,
+            min(
+                settings.HTTP_CLIENT_BACKOFF_MAX,
+                settings.HTTP_CLIENT_BACKOFF_BASE * 2**attempt,
+            ),
+        )
+
+    async def request(
+        self, method: str, endpoint: str, **kwargs: Any
+    ) -> httpx.Response:
+        """
+        Send a request to the specified endpoint, retrying and tripping the circuit
+        breaker on failures. Keyword arguments are passed to `httpx.AsyncClient.request`.
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        loc = f"{method} {endpoint}"
+        payload = kwargs.get("json") or kwargs.get("data")
+        start = time.perf_counter()
+        attempt = 0
+
+        def error(msg: str, **extra: Any) -> BadGatewayError:
+            return BadGatewayError(
+                msg,
+                loc=loc,
+                service=self.service,
+                payload=payload,
+                elapsed=time.perf_counter() - start,
+                attempts=attempt + 1,
+                **extra,
+            )
+
+        if not self.breaker.allow():
+            raise error("Circuit breaker open")
+
+        client = self.client
+        while True:
+            try:
+                response = await client.request(
+                    method, endpoint, timeout=self.timeout, **kwargs
+                )
+            except httpx.TransportError as exc:
+                if (
+                    attempt < self.retries
+                    and not isinstance(exc, NOT_RETRIED_ERRORS)
+                    and (idempotent or isinstance(exc, NOT_SENT_ERRORS))
+                ):
+                    logger.warning(
+                        "Retrying %s %s: %r",
+                        self.service,
+                        loc,
+                        exc,
+                        extra={"attempt": attempt + 1},
+                    )
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                raise error(f"{type(exc).__name__}: {exc}") from exc
+
+            if response.status_code < 500:
+                self.breaker.record_success()
+                return response
+
+            if (
+                attempt < self.retries
+                and idempotent
+                and response.status_code in RETRY_STATUS_CODES
+            ):
+                logger.warning(
+                    "Retrying %s %s: %s",
+                    self.service,
+                    loc,
+                    response.status_code,
+                    extra={"attempt": attempt + 1},
+                )
+                await response.aclose()
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            self.breaker.record_failure()
+            raise error(
+                "Upstream server error",
+                response_status_code=response.status_code,
+                response=response.text[:ERROR_RESPONSE_MAX_LENGTH],
+            )
 
     async def get(
         self,
@@ -22,7 +198,54 @@ class InternalRequestClient:
         """
         Send a GET request to the specified endpoint.
         """
-        response = await self.client.get(endpoint, params=params, headers=headers)
+        if self.cache is None and not self.coalesce:
+            return await self.request("GET", endpoint, params=params, headers=headers)
+
+        data = HTTPCache.key_data(f"{self.base_url}{endpoint}", params, headers)
+        if not self.coalesce:
+            return await self._fetch(endpoint, params, headers, data)
+
+        # The cache lookup is shared too, so callers arriving while the response
+        # is being stored don't miss it
+        key = generate_cache_key(data, HTTP_CACHE_PREFIX)
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(endpoint, params, headers, data))
+            _inflight[key] = task
+            task.add_done_callback(lambda done: _fetch_done(key, done))
+        return await asyncio.shield(task)
+
+    async def _fetch(
+        self,
+        endpoint: str,
+        params: dict[str, Any] | None,
+        headers: dict[str, str] | None,
+        data: dict,
+    ) -> httpx.Response:
+        """
+        Serve a GET from the cache when fresh, else send it (revalidating the
+        stale cache entry if any) and store the response
+        """
+        entry = await self.cache.get(data) if self.cache is not None else None
+        if entry is not None:
+            if HTTPCache.is_fresh(entry):
+                return HTTPCache.build_response(
+                    entry,
+                    self.client.build_request(
+                        "GET", endpoint, params=params, headers=headers
+                    ),
+                )
+            headers = {**(headers or {}), **HTTPCache.validators(entry)}
+
+        response = await self.request("GET", endpoint, params=params, headers=headers)
+        if self.cache is None:
+            return response
+
+        if entry is not None and response.status_code == 304:
+            entry = await self.cache.refresh(data, entry, response)
+            return HTTPCache.build_response(entry, response.request)
+
+        await self.cache.set(data, response)
         return response
 
     async def post(
@@ -35,22 +258,23 @@ class InternalRequestClient:
         """
         Send a POST request to the specified endpoint.
         """
-        response = await self.client.post(
-            endpoint, data=data, json=json, headers=headers
+        return await self.request(
+            "POST", endpoint, data=data, json=json, headers=headers
         )
-        return response
 
     async def put(
         self,
         endpoint: str,
         data: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
         headers: dict[str, str] | None = None,
     ) -> httpx.Response:
         """
         Send a PUT request to the specified endpoint.
         """
-        response = await self.client.put(endpoint, data=data, headers=headers)
-        return response
+        return await self.request(
+            "PUT", endpoint, data=data, json=json, headers=headers
+        )
 
     async def delete(
         self, endpoint: str, headers: dict[str, str] | None = None
@@ -58,14 +282,12 @@ class InternalRequestClient:
         """
         Send a DELETE request to the specified endpoint.
         """
-        response = await self.client.delete(endpoint, headers=headers)
-        return response
+        return await self.request("DELETE", endpoint, headers=headers)
 
     async def close(self):
         """
-        Close the client connection.
+        No-op, the shared connection pool is closed by the app lifespan.
         """
-        await self.client.aclose()
 
     async def __aenter__(self):
         return self
@@ -1,24 +1,33 @@
 from contextlib import asynccontextmanager
 
 import logfire
-import redis.asyncio as redis
 from anyio import to_thread
 from fastapi import Depends, FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import ORJSONResponse
-from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
 from secure import Secure
 from sqlalchemy.orm import Session
 
+from app.common.auth import (
+    TOKEN_REVOCATION_CHANNEL,
+    handle_token_revocation,
+    token_revocation_list,
+)
+from app.common.cache import (
+    CACHE_INVALIDATION_CHANNEL,
+    get_cache_stats,
+    handle_cache_invalidation,
+)
 from app.common.dependencies import get_session
 from app.common.exceptions import (
     BadGatewayError,
     CustomHTTPException,
     InternalServerError,
 )
+from app.common.rate_limit import RateLimiter
+from app.common.security import password_hashing_pool
+from app.core.database import get_pool_stats, replica_router
 from app.core.handlers import (
     bad_gateway_error_exception_handler,
     base_exception_handler,
@@ -26,6 +35,18 @@ from app.core.handlers import (
     internal_server_error_exception_handler,
     request_validation_exception_handler,
 )
+from app.core.http import http_client_registry
+from app.core.instrumentation import route_report
+from app.core.logger import get_logger, logging_pipeline
+from app.core.middlewares import (
+    CompressionMiddleware,
+    QueryMetricsMiddleware,
+    RateLimitHeadersMiddleware,
+    RequestIdMiddleware,
+    SecurityHeadersMiddleware,
+)
+from app.core.mongo import mongo_registry
+from app.core.redis import pubsub_listener, redis_registry
 from app.core.settings import get_settings
 from app.core.tags import get_tags
 from app.sample_module.apis import router as sample_router
@@ -33,11 +54,11 @@ from app.sample_module.apis import router as sample_router
 # Globals
 tags = get_tags()
 settings = get_settings()
+logger = get_logger(__name__)
 secure_headers = Secure.with_default_headers()
 
-# constants
-REQ_RATE = 3  # Number of requests
-REQ_RATE_TIME = 1  # Number of seconds
+# Constants
+SECURITY_HEADERS_EXEMPT_PATHS = ("/", "/docs", "/openapi.json")
 
 
 # Lifespan (startup, shutdown)
@@ -45,21 +66,46 @@ REQ_RATE_TIME = 1  # Number of seconds
 async def lifespan(_: FastAPI):
     """This is the startup and shutdown code for the FastAPI application."""
     # Startup code
-    print("Starting Server...")
+    logging_pipeline.start()
+    logger.info("Starting Server...")
 
     # Bigger Threadpool i.e you send a bunch of requests it will handle a max of 1000 at a time, the default is 40 # pylint: disable=line-too-long
     limiter = to_thread.current_default_thread_limiter()
     limiter.total_tokens = 1000
 
-    print("Setting up rate limiter")
-    redis_connection = redis.from_url(
-        settings.REDIS_BROKER_URL, encoding="utf-8", decode_responses=True
-    )
-    await FastAPILimiter.init(redis_connection)
+    if replica_router.engines:
+        logger.info("Setting up read replica health checks")
+        replica_router.start()
+
+    logger.info("Setting up redis pool")
+    redis_registry.init()
+
+    if settings.MONGO_DATABASE_URL:
+        logger.info("Setting up mongo client")
+        mongo_registry.init()
+
+    logger.info("Setting up http clients")
+    http_client_registry.init()
+
+    logger.info("Setting up pub/sub listeners")
+    pubsub_listener.subscribe(CACHE_INVALIDATION_CHANNEL, handle_cache_invalidation)
+    pubsub_listener.subscribe(TOKEN_REVOCATION_CHANNEL, handle_token_revocation)
+    await pubsub_listener.start()
+
+    logger.info("Loading revoked tokens")
+    await token_revocation_list.start()
 
     # Shutdown Code
     yield
-    print("Shutting Down Server...")
+    logger.info("Shutting Down Server...")
+    await token_revocation_list.stop()
+    await pubsub_listener.stop()
+    await http_client_registry.close()
+    await redis_registry.close()
+    await mongo_registry.close()
+    await replica_router.stop()
+    password_hashing_pool.close()
+    logging_pipeline.stop()
 
 
 app = FastAPI(
@@ -85,24 +131,29 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.add_middleware(
-    GZipMiddleware,
-    minimum_size=5000,  # Minimum size of the response before it is compressed in bytes
-)
+# br/zstd/gzip, levels and minimum sizes per encoding are in the settings
+app.add_middleware(CompressionMiddleware)
 
+# RateLimit-* headers of the rate limited routes
+app.add_middleware(RateLimitHeadersMiddleware)
 
-@app.middleware("http")
-async def add_security_headers(request, call_next):
-    """
-    Middleware for adding security headers
-    """
-    response = await call_next(request)
+if settings.QUERY_METRICS_ENABLED:
+    app.add_middleware(
+        QueryMetricsMiddleware,
+        sample_rate=settings.QUERY_METRICS_SAMPLE_RATE,
+        server_timing=settings.QUERY_METRICS_SERVER_TIMING,
+    )
 
-    # Skip security headers for docs
-    if request.url.path not in ["/", "/docs", "/openapi.json"]:
-        await secure_headers.set_headers_async(response)
+# Security headers, skipped for the docs
+app.add_middleware(
+    SecurityHeadersMiddleware,
+    headers=secure_headers.headers,
+    exempt_paths=SECURITY_HEADERS_EXEMPT_PATHS,
+)
 
-    return response
+
+# Outermost, so every log line of the request carries its id
+app.add_middleware(RequestIdMiddleware)
 
 
 # Exception Handlers
@@ -129,9 +180,31 @@ async def route_healthcheck(_: Session = Depends(get_session)):
     return {"status": "Ok!"}
 
 
+# Metrics (per worker)
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def route_metrics():
+        """Connection pool, cache and upstream statistics of this worker"""
+        return {
+            "database": get_pool_stats(),
+            "redis": redis_registry.stats(),
+            "cache": get_cache_stats(),
+            "routes": route_report.report(),
+            "password_hashing": password_hashing_pool.stats(),
+            "upstreams": http_client_registry.stats(),
+        }
+
+
 # Routers
 app.include_router(
     sample_router,
     tags=[tags.SAMPLE],
-    dependencies=[Depends(RateLimiter(times=REQ_RATE, seconds=REQ_RATE_TIME))],
+    dependencies=[
+        Depends(
+            RateLimiter(
+                times=settings.RATE_LIMIT_TIMES, seconds=settings.RATE_LIMIT_SECONDS
+            )
+        )
+    ],
 )
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 
+from app.common.response_cache import cache_response
 from app.common.schemas import ResponseSchema
 
 # Globals
@@ -13,6 +14,7 @@ router = APIRouter()
     status_code=200,
     response_model=ResponseSchema,
 )
+@cache_response(ttl=60, response_model=ResponseSchema)
 async def route_sample_get():
     """
     This endpoint is a sample endpoint for the behemoth
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark of the cache key/encode/decode path: the legacy
+jsonable_encoder + json + sha256 path vs the CacheCodec (orjson/msgpack + TypeAdapter) path.
+
+Usage:
+    uv run python -m benchmarks.cache_codecs
+"""
+
+import hashlib
+import json
+import timeit
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from app.common.cache import generate_cache_key
+from app.common.codecs import CacheCodec, msgpack
+
+# Constants
+NUMBER = 2_000
+
+
+class Item(BaseModel):
+    """Sample cached item"""
+
+    id: int
+    name: str
+    price: Decimal
+    created_at: datetime
+    tags: list[str]
+
+
+KEY_DATA = {"user_id": uuid4(), "page": 3, "since": datetime.now(), "q": "shoes"}
+ITEMS = [
+    Item(
+        id=i,
+        name=f"item-{i}",
+        price=Decimal("19.99"),
+        created_at=datetime.now(),
+        tags=["a", "b", "c"],
+    )
+    for i in range(50)
+]
+
+
+def legacy_key():
+    json_str = json.dumps(jsonable_encoder(KEY_DATA), sort_keys=True)
+    return f"prefix:{hashlib.sha256(json_str.encode()).hexdigest()}"
+
+
+def legacy_encode():
+    return json.dumps(jsonable_encoder(ITEMS))
+
+
+LEGACY_PAYLOAD = legacy_encode()
+
+
+def legacy_decode():
+    return [Item(**data) for data in json.loads(LEGACY_PAYLOAD)]
+
+
+def bench(name: str, func):
+    seconds = timeit.timeit(func, number=NUMBER)
+    print(f"{name:<40} {seconds / NUMBER * 1_000_000:>10.1f} us/op")
+
+
+def main():
+    bench("key: legacy (json + sha256)", legacy_key)
+    bench("key: orjson + blake2b", lambda: generate_cache_key(KEY_DATA, "prefix:"))
+
+    codecs = {"orjson": CacheCodec()}
+    if msgpack is not None:
+        codecs["msgpack"] = CacheCodec(serializer="msgpack")
+
+    bench("encode: legacy (jsonable_encoder + json)", legacy_encode)
+    for name, codec in codecs.items():
+        bench(f"encode: {name}", lambda codec=codec: codec.encode(ITEMS))
+
+    bench("decode: legacy (json + Model(**data))", legacy_decode)
+    for name, codec in codecs.items():
+        payload = codec.encode(ITEMS)
+        bench(
+            f"decode: {name} + TypeAdapter",
+            lambda codec=codec, payload=payload: codec.decode(payload, list[Item]),
+        )
+
+
+if __name__ == "__main__":
+    main()
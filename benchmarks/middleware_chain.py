@@ -0,0 +1,109 @@
+"""
+Benchmark of the middleware chain (CORS + GZip + security headers) around a tiny
+JSON route: the old `@app.middleware("http")` security headers hook (BaseHTTPMiddleware
++ secure.set_headers_async per request) vs the pure ASGI SecurityHeadersMiddleware.
+
+Requests are sent straight to the ASGI app, no server or network involved.
+
+Usage:
+    uv run python -m benchmarks.middleware_chain
+"""
+
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from secure import Secure
+
+from app.core.middlewares import SecurityHeadersMiddleware
+
+# Constants
+REQUESTS = 5_000
+EXEMPT_PATHS = ("/", "/docs", "/openapi.json")
+secure_headers = Secure.with_default_headers()
+
+
+def build_app(security_headers: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "success", "msg": "pong", "data": None}
+
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"])
+    app.add_middleware(GZipMiddleware, minimum_size=5000)
+
+    if security_headers == "http middleware":
+
+        @app.middleware("http")
+        async def add_security_headers(request, call_next):
+            response = await call_next(request)
+            if request.url.path not in ["/", "/docs", "/openapi.json"]:
+                await secure_headers.set_headers_async(response)
+            return response
+
+    else:
+        app.add_middleware(
+            SecurityHeadersMiddleware,
+            headers=secure_headers.headers,
+            exempt_paths=EXEMPT_PATHS,
+        )
+
+    return app
+
+
+async def request(app: FastAPI):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"test"), (b"accept-encoding", b"gzip")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Wait for a disconnect that never comes (cancelled once the response is sent)
+        await asyncio.Event().wait()
+
+    async def send(_):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def bench(name: str, app: FastAPI):
+    # Warm up (builds the middleware stack)
+    for _ in range(100):
+        await request(app)
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await request(app)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:<20} {REQUESTS / elapsed:>10.0f} req/s"
+        f"   {elapsed / REQUESTS * 1_000_000:>7.1f} us/req"
+    )
+
+
+async def main():
+    await bench("http middleware", build_app("http middleware"))
+    await bench("pure ASGI", build_app("pure ASGI"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Benchmark of concurrent logins: argon2 verification inline on the event loop
+(the old `verify_password`) vs offloaded to the PasswordHashingPool.
+
+Reports the login throughput and the event loop lag seen by a probe task that
+sleeps in a loop, i.e how long every other request of the worker is stalled.
+
+Usage:
+    uv run python -m benchmarks.password_hashing
+"""
+
+import asyncio
+import statistics
+import time
+
+from argon2.exceptions import VerifyMismatchError
+
+from app.common.security import password_hashing_pool, ph, verify_password
+
+# Constants
+LOGINS = 64
+CONCURRENCY = 16
+PROBE_INTERVAL = 0.005
+PASSWORD = "correct horse battery staple"
+
+
+async def inline_verify(*, raw: str, hashed: str):
+    try:
+        return ph.verify(hash=hashed, password=raw)
+    except VerifyMismatchError:
+        return False
+
+
+async def probe(lags: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def run(name: str, verify, hashed: str):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def login():
+        async with semaphore:
+            assert await verify(raw=PASSWORD, hashed=hashed)
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(LOGINS)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe_task
+
+    print(
+        f"{name:<10} {LOGINS / elapsed:>8.1f} logins/s"
+        f"   loop lag avg {statistics.mean(lags) * 1000:>7.1f} ms"
+        f"   max {max(lags) * 1000:>7.1f} ms"
+    )
+
+
+async def main():
+    hashed = ph.hash(PASSWORD)
+    print(
+        f"{LOGINS} logins, {CONCURRENCY} concurrent, {ph.time_cost=} {ph.memory_cost=}"
+    )
+    await run("inline", inline_verify, hashed)
+    await run("pool", verify_password, hashed)
+    print(password_hashing_pool.stats())
+    password_hashing_pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
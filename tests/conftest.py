@@ -0,0 +1,114 @@
+import asyncio
+
+import fakeredis
+import httpx
+import pytest
+from fakeredis.aioredis import FakeAsyncRedisConnection
+from mongomock_motor import AsyncMongoMockClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.http import http_client_registry
+from app.core.redis import InstrumentedConnectionPool, redis_registry
+from app.core.settings import get_settings
+from tests.models import TestBase
+
+# Globals
+settings = get_settings()
+
+# Constants
+UPSTREAM_URL = "http://upstream"
+
+
+@pytest.fixture
+async def redis_server():
+    """
+    Back the shared redis pools with an in-memory fake server
+    """
+    server = fakeredis.FakeServer()
+    redis_registry.pool = InstrumentedConnectionPool(
+        connection_class=FakeAsyncRedisConnection,
+        server=server,
+        encoding="utf-8",
+        decode_responses=True,
+    )
+    redis_registry.binary_pool = InstrumentedConnectionPool(
+        connection_class=FakeAsyncRedisConnection, server=server
+    )
+    yield server
+    await redis_registry.close()
+
+
+@pytest.fixture
+def redis_client(redis_server):  # pylint: disable=unused-argument,redefined-outer-name
+    """
+    A decoding client of the fake redis
+    """
+    return redis_registry.get_client()
+
+
+@pytest.fixture
+async def db_engine():
+    """
+    An in-memory SQLite engine with the test models' tables
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(TestBase.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db_session(db_engine):  # pylint: disable=redefined-outer-name
+    """
+    A session on the in-memory SQLite database
+    """
+    async with AsyncSession(db_engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def mongo_collection():
+    """
+    A collection of an in-memory (mongomock) database
+    """
+    return AsyncMongoMockClient()["test"]["items"]
+
+
+class MockUpstream:
+    """
+    Answers the outbound requests with the scripted responses (or raised transport
+    errors) in order, the last one is repeated
+    """
+
+    def __init__(self):
+        self.responses: list = [httpx.Response(200)]
+        self.requests: list[httpx.Request] = []
+        self.delay = 0.0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = (
+            self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        )
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+async def upstream(monkeypatch):
+    """
+    A mocked upstream at UPSTREAM_URL behind the shared HTTP clients, retried
+    requests are not delayed
+    """
+    monkeypatch.setattr(settings, "HTTP_CLIENT_BACKOFF_BASE", 0)
+    mock = MockUpstream()
+    http_client_registry.clients[UPSTREAM_URL] = httpx.AsyncClient(
+        base_url=UPSTREAM_URL, transport=httpx.MockTransport(mock.handle)
+    )
+    yield mock
+    await http_client_registry.close()
+    http_client_registry.breakers.clear()
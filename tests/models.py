@@ -0,0 +1,31 @@
+from bson import ObjectId
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import declarative_base
+
+TestBase = declarative_base()
+
+
+class Item(TestBase):
+    __tablename__ = "items"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    price = Column(Integer, nullable=True)
+    owner_id = Column(Integer, ForeignKey("owners.id"), nullable=True)
+    created_at = Column(DateTime, nullable=True)
+
+
+class Owner(TestBase):
+    __tablename__ = "owners"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+
+
+class Document(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
+
+    id: ObjectId | None = Field(default=None, alias="_id")
+    name: str
+    price: int = 0
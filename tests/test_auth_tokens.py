@@ -0,0 +1,163 @@
+import time
+
+import jwt
+import pytest
+
+from app.common import auth
+from app.common.auth import (
+    TOKEN_REVOCATION_KEY,
+    BloomFilter,
+    TokenGenerator,
+    TokenRevocationList,
+    handle_token_revocation,
+    token_revocation_list,
+)
+from app.common.exceptions import Unauthorized
+
+SECRET_KEY = "test-secret"
+
+
+@pytest.fixture(autouse=True)
+async def empty_revocation_list(redis_server):  # pylint: disable=unused-argument
+    await token_revocation_list.load()
+
+
+@pytest.fixture
+def generator() -> TokenGenerator:
+    return TokenGenerator(secret_key=SECRET_KEY, expire_in=60)
+
+
+@pytest.fixture
+def decodes(monkeypatch) -> list:
+    calls = []
+    original = jwt.decode
+
+    def decode(*args, **kwargs):
+        calls.append(kwargs.get("jwt"))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", decode)
+    return calls
+
+
+def encode(**claims) -> str:
+    data = {"type": "access", "sub": "user-1", "jti": "jti-1"} | claims
+    return jwt.encode({k: v for k, v in data.items() if v is not None}, SECRET_KEY)
+
+
+async def test_verify_returns_the_sub_id(generator):
+    token = await generator.generate("user-42")
+
+    assert await generator.verify(token, "user") == "42"
+    assert await generator.subject(token) == "user-42"
+
+
+async def test_verified_tokens_are_cached(generator, decodes):
+    token = await generator.generate("user-42")
+
+    for _ in range(3):
+        assert await generator.verify(token, "user") == "42"
+
+    assert len(decodes) == 1
+
+
+async def test_wrong_sub_head_is_rejected_even_when_cached(generator):
+    token = await generator.generate("user-42")
+    await generator.verify(token, "user")
+
+    with pytest.raises(Unauthorized):
+        await generator.verify(token, "admin")
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        encode(exp=time.time() - 10),
+        encode(type="refresh"),
+        encode(sub=None),
+        encode(sub="nohead"),
+        jwt.encode({"type": "access", "sub": "user-1"}, "other-secret"),
+        "not.a.token",
+    ],
+)
+async def test_invalid_tokens_are_rejected(generator, token):
+    with pytest.raises(Unauthorized):
+        await generator.verify(token, "user")
+    assert await generator.subject(token) is None
+
+
+async def test_revoked_tokens_are_rejected_even_when_cached(generator):
+    token = await generator.generate("user-42")
+    await generator.verify(token, "user")
+
+    await generator.revoke(token)
+
+    with pytest.raises(Unauthorized, match="revoked"):
+        await generator.verify(token, "user")
+    # Other tokens of the user are still valid
+    assert await generator.verify(await generator.generate("user-42"), "user") == "42"
+
+
+async def test_revocations_reach_other_workers(generator, redis_client):
+    token = await generator.generate("user-42")
+    jti = jwt.decode(token, options={"verify_signature": False})["jti"]
+    await generator.revoke(token)
+
+    other_worker = TokenRevocationList(
+        capacity=1000, error_rate=0.01, refresh_interval=60
+    )
+    assert not await other_worker.is_revoked(jti)
+    await other_worker.load()
+    assert await other_worker.is_revoked(jti)
+    assert await redis_client.zscore(TOKEN_REVOCATION_KEY, jti) is not None
+
+
+async def test_published_revocations_update_the_bloom_filter():
+    await handle_token_revocation("published-jti")
+
+    assert "published-jti" in token_revocation_list.bloom
+
+
+async def test_tokens_without_exp_verify_and_stay_revoked(generator, redis_client):
+    token = encode(jti="no-exp")
+
+    assert await generator.verify(token, "user") == "1"
+    await generator.revoke(token)
+    await token_revocation_list.load()
+
+    with pytest.raises(Unauthorized):
+        await generator.verify(token, "user")
+    assert await redis_client.zscore(TOKEN_REVOCATION_KEY, "no-exp") == float("inf")
+
+
+async def test_tokens_without_jti_cannot_be_revoked(generator):
+    token = encode(jti=None)
+
+    assert await generator.verify(token, "user") == "1"
+    with pytest.raises(Unauthorized):
+        await generator.revoke(token)
+
+
+async def test_expired_revocations_are_dropped(redis_client):
+    await redis_client.zadd(TOKEN_REVOCATION_KEY, {"old": time.time() - 1})
+
+    await token_revocation_list.load()
+
+    assert not await token_revocation_list.is_revoked("old")
+    assert await redis_client.zcard(TOKEN_REVOCATION_KEY) == 0
+
+
+async def test_unflagged_ids_skip_redis(redis_server):
+    redis_server.connected = False
+
+    assert not await token_revocation_list.is_revoked("never-revoked")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"in-{i}")
+
+    assert all(f"in-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"out-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
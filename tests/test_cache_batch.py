@@ -0,0 +1,66 @@
+import pytest
+
+from app.common.cache import CacheManager, generate_cache_key, local_cache
+
+pytestmark = pytest.mark.usefixtures("redis_server")
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
+async def test_get_many_returns_hits_and_miss_indexes():
+    manager = CacheManager(ttl=60, cache_prefix="batch")
+    await manager.set_many([({"id": 1}, "one"), ({"id": 3}, "three")])
+
+    result = await manager.get_many([{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}])
+
+    assert result.hits == {0: "one", 2: "three"}
+    assert result.misses == [1, 3]
+
+
+async def test_get_many_uses_a_single_mget(redis_client, monkeypatch):
+    manager = CacheManager(ttl=60, cache_prefix="batch")
+    await manager.set_many([({"id": i}, i) for i in range(20)])
+    calls = []
+    original = manager.redis_client.mget
+
+    async def mget(keys):
+        calls.append(keys)
+        return await original(keys)
+
+    monkeypatch.setattr(manager.redis_client, "mget", mget)
+    result = await manager.get_many([{"id": i} for i in range(20)])
+
+    assert len(calls) == 1
+    assert result.hits == {i: i for i in range(20)}
+
+
+async def test_set_many_per_item_ttl(redis_client):
+    manager = CacheManager(ttl=60, cache_prefix="batch")
+    await manager.set_many([({"id": 1}, "one"), ({"id": 2}, "two", 5)])
+
+    assert 55 < await redis_client.ttl(generate_cache_key({"id": 1}, "batch")) <= 60
+    assert 0 < await redis_client.ttl(generate_cache_key({"id": 2}, "batch")) <= 5
+
+
+async def test_set_many_without_entries_is_a_noop():
+    await CacheManager(ttl=60, cache_prefix="batch").set_many([])
+
+
+async def test_local_get_many_fills_and_reads_l1(redis_client):
+    manager = CacheManager(ttl=60, cache_prefix="batch", local=True)
+    await manager.set_many([({"id": 1}, "one"), ({"id": 2}, "two")])
+    local_cache.clear()
+
+    await manager.get_many([{"id": 1}, {"id": 2}])
+    await redis_client.delete(
+        generate_cache_key({"id": 1}, "batch"), generate_cache_key({"id": 2}, "batch")
+    )
+
+    result = await manager.get_many([{"id": 1}, {"id": 2}])
+    assert result.hits == {0: "one", 1: "two"}
+    assert result.misses == []
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from app.common.cache import (
+    CACHE_INVALIDATION_CHANNEL,
+    WORKER_ID,
+    CacheManager,
+    LocalCache,
+    generate_cache_key,
+    handle_cache_invalidation,
+    local_cache,
+)
+
+pytestmark = pytest.mark.usefixtures("redis_server")
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2, max_bytes=10_000, max_ttl=60)
+    cache.set("a", b"1", 60)
+    cache.set("b", b"2", 60)
+    cache.get("a")
+    cache.set("c", b"3", 60)
+
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
+    assert cache.evictions == 1
+
+
+def test_local_cache_bounds_bytes():
+    cache = LocalCache(max_entries=100, max_bytes=200, max_ttl=60)
+    cache.set("a", b"x" * 100, 60)
+    cache.set("b", b"x" * 100, 60)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.size <= 200
+
+
+def test_local_cache_caps_ttl():
+    cache = LocalCache(max_entries=10, max_bytes=10_000, max_ttl=0.01)
+    cache.set("a", b"1", 60)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.size == 0
+
+
+def test_tinylfu_keeps_popular_entries():
+    cache = LocalCache(max_entries=2, max_bytes=10_000, max_ttl=60, policy="tinylfu")
+    cache.set("a", b"1", 60)
+    cache.set("b", b"2", 60)
+    for _ in range(5):
+        cache.get("a")
+        cache.get("b")
+
+    # Requested once, less popular than the victim
+    cache.get("c")
+    cache.set("c", b"3", 60)
+
+    assert cache.get("c") is None
+    assert cache.get("a") == b"1"
+
+
+async def test_local_reads_are_served_from_l1(redis_client):
+    manager = CacheManager(ttl=60, cache_prefix="l1", data={"id": 1}, local=True)
+    await manager.set({"name": "cached"})
+    await redis_client.delete(generate_cache_key({"id": 1}, "l1"))
+
+    assert await manager.get() == {"name": "cached"}
+
+
+async def test_l1_does_not_outlive_redis(redis_client):
+    manager = CacheManager(ttl=60, cache_prefix="l1", data={"id": 1}, local=True)
+    cache_key = generate_cache_key({"id": 1}, "l1")
+    await manager.set({"name": "cached"})
+    local_cache.clear()
+    await redis_client.pexpire(cache_key, 500)
+
+    assert await manager.get() == {"name": "cached"}
+    _, expires_at, _ = local_cache.entries[cache_key]
+    assert expires_at <= time.monotonic() + 0.5
+
+
+async def test_writes_publish_invalidations(redis_client):
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+
+    manager = CacheManager(ttl=60, cache_prefix="l1", data={"id": 1})
+    await manager.set({"name": "cached"})
+    # The first read consumes the (ignored) subscribe confirmation
+    message = await pubsub.get_message(timeout=1) or await pubsub.get_message(timeout=1)
+    await pubsub.aclose()
+
+    assert message["data"] == f"{WORKER_ID}:{generate_cache_key({'id': 1}, 'l1')}"
+
+
+async def test_invalidations_of_other_workers_drop_l1_entries():
+    manager = CacheManager(ttl=60, cache_prefix="l1", data={"id": 1}, local=True)
+    cache_key = generate_cache_key({"id": 1}, "l1")
+    await manager.set({"name": "cached"})
+
+    # Our own writes are already applied to L1
+    await handle_cache_invalidation(f"{WORKER_ID}:{cache_key}")
+    assert local_cache.get(cache_key) is not None
+
+    await handle_cache_invalidation(f"other-worker:unrelated\n{cache_key}")
+    assert local_cache.get(cache_key) is None
@@ -0,0 +1,122 @@
+import pytest
+
+from app.common.cache import (
+    CacheManager,
+    generate_cache_key,
+    invalidate_tags,
+    local_cache,
+    tag_key,
+)
+from app.common.crud import CRUDBase, model_tag, row_tag
+from tests.models import Item
+
+pytestmark = pytest.mark.usefixtures("redis_server")
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
+async def cache_tagged(key: str, *tags: str) -> CacheManager:
+    manager = CacheManager(ttl=60, cache_prefix="tags:", data={"key": key}, tags=tags)
+    await manager.set(key)
+    return manager
+
+
+async def test_entries_are_registered_under_their_tags(redis_client):
+    await cache_tagged("a", "model:items")
+
+    members = await redis_client.smembers(tag_key("model:items"))
+    assert members == {generate_cache_key({"key": "a"}, "tags:")}
+    assert 0 < await redis_client.ttl(tag_key("model:items")) <= 60
+
+
+async def test_invalidate_tags_deletes_every_tagged_entry(redis_client):
+    first = await cache_tagged("a", "model:items")
+    second = await cache_tagged("b", "model:items", "model:items:2")
+    other = await cache_tagged("c", "model:owners")
+
+    assert await invalidate_tags("model:items", "model:items:2", "unknown") == 2
+
+    assert await first.get() is None
+    assert await second.get() is None
+    assert await other.get() == "c"
+    assert not await redis_client.exists(tag_key("model:items"))
+
+
+async def test_invalidate_tags_drops_l1_entries():
+    manager = CacheManager(
+        ttl=60, cache_prefix="tags:", data={"key": "a"}, tags=("t",), local=True
+    )
+    await manager.set("a")
+
+    await invalidate_tags("t")
+
+    assert local_cache.get(generate_cache_key({"key": "a"}, "tags:")) is None
+
+
+async def test_invalidate_without_tags():
+    assert await invalidate_tags() == 0
+
+
+async def test_row_tags(db_session):
+    crud = CRUDBase(Item, db_session)
+    obj = await crud.create(data={"name": "a"})
+
+    assert model_tag(Item) == "model:items"
+    assert row_tag(Item, 3) == "model:items:3"
+    assert row_tag(Item, (3, 4)) == "model:items:3,4"
+    assert row_tag(Item, obj) == f"model:items:{obj.id}"
+
+
+async def test_crud_writes_invalidate_the_model_and_row_tags(db_session):
+    crud = CRUDBase(Item, db_session, invalidate_cache=True)
+    obj = await crud.create(data={"name": "a"})
+
+    listing = await cache_tagged("list", model_tag(Item))
+    detail = await cache_tagged("detail", row_tag(Item, obj.id))
+    unrelated = await cache_tagged("other", row_tag(Item, obj.id + 1))
+
+    await crud.update(obj=obj, data={"price": 10})
+
+    assert await listing.get() is None
+    assert await detail.get() is None
+    assert await unrelated.get() == "other"
+
+    listing = await cache_tagged("list", model_tag(Item))
+    await crud.delete(obj=obj)
+    assert await listing.get() is None
+
+
+async def test_crud_bulk_writes_invalidate_the_touched_rows(db_session):
+    crud = CRUDBase(Item, db_session, invalidate_cache=True)
+    await crud.create_many(data=[{"name": "a"}, {"name": "b"}], returning=False)
+    first = await cache_tagged("first", row_tag(Item, 1))
+    second = await cache_tagged("second", row_tag(Item, 2))
+
+    await crud.update_where(filters={"name": "a"}, data={"price": 1}, returning=False)
+
+    assert await first.get() is None
+    assert await second.get() == "second"
+
+
+async def test_crud_without_invalidation_keeps_entries(db_session):
+    crud = CRUDBase(Item, db_session)
+    listing = await cache_tagged("list", model_tag(Item))
+
+    await crud.create(data={"name": "a"})
+
+    assert await listing.get() == "list"
+
+
+async def test_redis_failures_do_not_fail_committed_writes(db_session, redis_server):
+    crud = CRUDBase(Item, db_session, invalidate_cache=True)
+    redis_server.connected = False
+
+    obj = await crud.create(data={"name": "a"})
+
+    assert obj.id is not None
+    assert await crud.get(name="a") is obj
@@ -0,0 +1,93 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from pydantic import BaseModel
+
+from app.common import codecs
+from app.common.cache import generate_cache_key
+from app.common.codecs import LZ4, MSGPACK, RAW, ZSTD, CacheCodec
+
+VALUE = {"id": 1, "name": "x" * 2000, "tags": ["a", "b"]}
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+    tags: list[str]
+
+
+@pytest.mark.parametrize("serializer", ["orjson", "msgpack"])
+@pytest.mark.parametrize("compression", ["none", "zstd", "lz4"])
+def test_round_trip(serializer, compression):
+    codec = CacheCodec(serializer=serializer, compression=compression)
+    encoded = codec.encode(VALUE)
+
+    assert codec.loads(encoded) == VALUE
+    assert codec.decode(encoded, Item) == Item(**VALUE)
+    assert codec.decode(encoded, list[Item] | Item) == Item(**VALUE)
+
+
+@pytest.mark.parametrize(
+    "compression, header", [("none", RAW), ("zstd", ZSTD), ("lz4", LZ4)]
+)
+def test_header_tells_the_encoding(compression, header):
+    encoded = CacheCodec(serializer="msgpack", compression=compression).encode(VALUE)
+
+    assert encoded[0] == header | MSGPACK
+
+
+def test_small_values_are_not_compressed():
+    codec = CacheCodec(compression="zstd", min_size=1024)
+
+    assert codec.encode({"id": 1})[0] == RAW
+    assert len(codec.encode(VALUE)) < len(CacheCodec().encode(VALUE))
+
+
+def test_values_stay_readable_after_a_codec_change():
+    encoded = CacheCodec(serializer="msgpack", compression="lz4").encode(VALUE)
+
+    assert CacheCodec().decode(encoded, Item) == Item(**VALUE)
+
+
+def test_models_and_non_json_types_are_encoded():
+    codec = CacheCodec()
+    value = {
+        "item": Item(**VALUE),
+        "price": Decimal("1.5"),
+        "day": datetime.date(2024, 1, 2),
+    }
+
+    assert codec.loads(codec.encode(value)) == {
+        "item": VALUE,
+        "price": "1.5",
+        "day": "2024-01-02",
+    }
+
+
+def test_convert_validates_primitives():
+    codec = CacheCodec()
+
+    assert codec.convert(VALUE) == VALUE
+    assert codec.convert(VALUE, Item) == Item(**VALUE)
+
+
+def test_missing_libraries_fail_at_construction(monkeypatch):
+    monkeypatch.setattr(codecs, "msgpack", None)
+    monkeypatch.setattr(codecs, "zstandard", None)
+    monkeypatch.setattr(codecs, "lz4_frame", None)
+
+    with pytest.raises(ImportError, match="--extra msgpack"):
+        CacheCodec(serializer="msgpack")
+    with pytest.raises(ImportError, match="--extra zstd"):
+        CacheCodec(compression="zstd")
+    with pytest.raises(ImportError, match="--extra lz4"):
+        CacheCodec(compression="lz4")
+
+
+def test_cache_keys_do_not_depend_on_key_order():
+    assert generate_cache_key({"a": 1, "b": 2}, "p:") == generate_cache_key(
+        {"b": 2, "a": 1}, "p:"
+    )
+    assert generate_cache_key({"a": 1}, "p:") != generate_cache_key({"a": 2}, "p:")
+    assert generate_cache_key({"day": datetime.date(2024, 1, 2)}, "p:").startswith("p:")
@@ -0,0 +1,164 @@
+import gzip
+
+import brotli
+import httpx
+import pytest
+import zstandard
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+from app.common import compression
+from app.common.compression import negotiate
+from app.core import middlewares
+from app.core.middlewares import CompressionMiddleware
+
+BODY = b"x" * 4096
+
+
+def make_app(encodings: tuple[str, ...] | None = ("br", "zstd", "gzip")) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, encodings=encodings)
+
+    @app.get("/large")
+    async def large():
+        return Response(BODY, media_type="text/plain", headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    async def small():
+        return Response(b"small", media_type="text/plain")
+
+    @app.get("/image")
+    async def image():
+        return Response(BODY, media_type="image/png")
+
+    @app.get("/no-transform")
+    async def no_transform():
+        return Response(
+            BODY, media_type="text/plain", headers={"Cache-Control": "no-transform"}
+        )
+
+    @app.get("/not-modified")
+    async def not_modified():
+        return Response(status_code=304, headers={"ETag": '"v1"'})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield BODY
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+async def fetch(path: str, accept_encoding: str, app: FastAPI | None = None):
+    """
+    The response and its raw (still encoded) body
+    """
+    transport = httpx.ASGITransport(app=app or make_app())
+    async with (
+        httpx.AsyncClient(transport=transport, base_url="http://test") as http,
+        http.stream(
+            "GET", path, headers={"Accept-Encoding": accept_encoding}
+        ) as response,
+    ):
+        body = b"".join([chunk async for chunk in response.aiter_raw()])
+    return response, body
+
+
+DECOMPRESS = {
+    "br": brotli.decompress,
+    "zstd": lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+    "gzip": gzip.decompress,
+}
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip, br;q=0.5", "gzip"),
+        ("zstd, gzip", "zstd"),
+        ("*", "br"),
+        ("br;q=0, *;q=0.1", "zstd"),
+        ("identity", None),
+        ("gzip;q=bad", None),
+        ("", None),
+    ],
+)
+def test_negotiate(accept_encoding, expected):
+    assert negotiate(accept_encoding, ("br", "zstd", "gzip")) == expected
+
+
+@pytest.mark.parametrize("encoding", ["br", "zstd", "gzip"])
+async def test_large_responses_are_compressed(encoding):
+    response, body = await fetch("/large", encoding)
+
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body) < len(BODY)
+    assert DECOMPRESS[encoding](body) == BODY
+
+
+async def test_compressed_responses_get_a_weak_etag():
+    compressed, _ = await fetch("/large", "gzip")
+    identity, _ = await fetch("/large", "identity")
+
+    assert compressed.headers["etag"] == 'W/"v1"'
+    assert identity.headers["etag"] == '"v1"'
+
+
+@pytest.mark.parametrize("path", ["/small", "/image", "/no-transform"])
+async def test_responses_sent_untouched(path):
+    response, body = await fetch(path, "gzip")
+
+    assert "content-encoding" not in response.headers
+    assert body in (BODY, b"small")
+
+
+async def test_not_modified_responses_pass_through():
+    response, body = await fetch("/not-modified", "gzip")
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"v1"'
+    assert "content-encoding" not in response.headers
+    assert body == b""
+
+
+async def test_streaming_responses_are_compressed_per_chunk():
+    response, body = await fetch("/stream", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(body) == BODY * 3
+
+
+@pytest.mark.parametrize("encoding", ["br", "zstd"])
+async def test_streaming_with_other_encodings(encoding):
+    response, body = await fetch("/stream", encoding)
+
+    assert response.headers["content-encoding"] == encoding
+    assert DECOMPRESS[encoding](body) == BODY * 3
+
+
+async def test_encodings_default_to_the_available_ones(monkeypatch):
+    monkeypatch.setattr(compression.settings, "COMPRESSION_ENCODINGS", "gzip")
+
+    response, _ = await fetch("/large", "br, gzip", app=make_app(encodings=None))
+
+    assert response.headers["content-encoding"] == "gzip"
+
+
+async def test_missing_encodings_are_skipped_with_a_warning(monkeypatch):
+    monkeypatch.setattr(compression.settings, "COMPRESSION_ENCODINGS", "br,lzma,gzip")
+    monkeypatch.setattr(compression, "brotli", None)
+    warnings = []
+    monkeypatch.setattr(
+        middlewares.logger, "warning", lambda msg, *args: warnings.append(args)
+    )
+
+    middleware = CompressionMiddleware(make_app(encodings=()))
+
+    assert middleware.encodings == ("gzip",)
+    assert warnings == [("br",), ("lzma",)]
@@ -0,0 +1,159 @@
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+
+from app.common import crud as crud_module
+from app.common.crud import CRUDBase
+from tests.models import Item
+
+
+class RecordingCRUD(CRUDBase):
+    """
+    Records the upsert statements instead of running them (ON CONFLICT is Postgres only)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = []
+
+    async def _run_bulk(self, stmt, returning, params=None):
+        self.statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+        return []
+
+
+def count_statements(engine, prefix: str) -> list:
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, *args):  # pylint: disable=unused-argument
+        if statement.startswith(prefix):
+            statements.append(statement)
+
+    return statements
+
+
+async def test_create_many_returns_the_rows(db_session):
+    crud = CRUDBase(Item, db_session)
+
+    objs = await crud.create_many(data=[{"name": "a", "price": 1}, {"name": "b"}])
+
+    assert [(obj.name, obj.price) for obj in objs] == [("a", 1), ("b", None)]
+    assert all(obj.id for obj in objs)
+
+
+async def test_create_many_without_returning_counts(db_session):
+    crud = CRUDBase(Item, db_session)
+
+    assert (
+        await crud.create_many(data=[{"name": "a"}, {"name": "b"}], returning=False)
+        == 2
+    )
+    assert len(await crud.get_all()) == 2
+
+
+async def test_create_many_batches(db_session, db_engine):
+    crud = CRUDBase(Item, db_session)
+    inserts = count_statements(db_engine, "INSERT")
+
+    objs = await crud.create_many(
+        data=[{"name": str(i)} for i in range(5)], batch_size=2
+    )
+
+    assert len(objs) == 5
+    assert len(inserts) == 3
+
+
+async def test_update_where(db_session):
+    crud = CRUDBase(Item, db_session)
+    await crud.create_many(data=[{"name": "a"}, {"name": "b"}, {"name": "c"}])
+
+    updated = await crud.update_where(filters={"price": None}, data={"price": 5})
+    assert {obj.price for obj in updated} == {5}
+    assert len(updated) == 3
+
+    assert (
+        await crud.update_where(
+            filters={"name": "a"}, data={"price": 1}, returning=False
+        )
+        == 1
+    )
+    assert (await crud.get(name="a")).price == 1
+
+
+async def test_delete_where(db_session):
+    crud = CRUDBase(Item, db_session)
+    await crud.create_many(data=[{"name": "a", "price": 1}, {"name": "b", "price": 2}])
+
+    deleted = await crud.delete_where(filters={"price": 1}, returning=True)
+
+    assert [obj.name for obj in deleted] == ["a"]
+    assert await crud.delete_where(filters={"price": 2}) == 1
+    assert await crud.get_all() == []
+
+
+async def test_get_in_batches(db_session, db_engine):
+    crud = CRUDBase(Item, db_session)
+    await crud.create_many(data=[{"name": str(i)} for i in range(5)])
+    selects = count_statements(db_engine, "SELECT")
+
+    objs = await crud.get_in(field="name", values=["0", "2", "4", "9"], batch_size=2)
+
+    assert sorted(obj.name for obj in objs) == ["0", "2", "4"]
+    assert len(selects) == 2
+
+
+async def test_upsert_updates_the_non_index_columns(db_session):
+    crud = RecordingCRUD(Item, db_session)
+
+    await crud.upsert_many(
+        data=[{"id": 1, "name": "a", "price": 1}], index_elements=["id"]
+    )
+
+    (statement,) = crud.statements
+    assert (
+        "ON CONFLICT (id) DO UPDATE SET name = excluded.name, price = excluded.price"
+        in statement
+    )
+
+
+async def test_upsert_groups_rows_by_columns(db_session):
+    crud = RecordingCRUD(Item, db_session)
+
+    await crud.upsert_many(
+        data=[
+            {"id": 1, "name": "a", "price": 1},
+            {"id": 2, "name": "b"},
+            {"id": 3, "price": 3, "name": "c"},
+        ],
+        index_elements=["id"],
+        update_fields=["name", "price"],
+    )
+
+    full, partial = crud.statements
+    assert "VALUES" in full and "price = excluded.price" in full
+    assert full.count("%(id_m") == 2
+    # Rows without price don't overwrite it with NULL
+    assert "DO UPDATE SET name = excluded.name" in partial
+    assert "price" not in partial
+
+
+async def test_upsert_without_update_columns_does_nothing(db_session):
+    crud = RecordingCRUD(Item, db_session)
+
+    await crud.upsert_many(
+        data=[{"id": 1}], index_elements=["id"], update_fields=["price"]
+    )
+
+    assert "ON CONFLICT (id) DO NOTHING" in crud.statements[0]
+
+
+async def test_upsert_chunks_fit_the_bind_parameter_limit(db_session, monkeypatch):
+    monkeypatch.setattr(crud_module, "MAX_BIND_PARAMS", 9)
+    crud = RecordingCRUD(Item, db_session)
+
+    await crud.upsert_many(
+        data=[{"id": i, "name": str(i), "price": i} for i in range(7)],
+        index_elements=["id"],
+    )
+
+    # 3 parameters per row, 3 rows per statement
+    assert len(crud.statements) == 3
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from app.common import cache
+from app.common.cache import CacheManager, generate_cache_key, local_cache
+
+pytestmark = pytest.mark.usefixtures("redis_server")
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+class CountingLoader:
+    def __init__(self, value, delay: float = 0.05):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
+def manager(**kwargs) -> CacheManager:
+    return CacheManager(ttl=60, cache_prefix="gos", data={"id": 1}, **kwargs)
+
+
+async def expire_envelope(redis_client):
+    """
+    Make the stored envelope expired (but still in redis)
+    """
+    cache_manager = manager()
+    cache_key = generate_cache_key({"id": 1}, "gos")
+    envelope = cache_manager.codec.loads(
+        await cache_manager.redis_client.get(cache_key)
+    )
+    envelope["e"] = time.time() - 1
+    await redis_client.delete(cache_key)
+    await cache_manager.redis_client.set(
+        cache_key, cache_manager.codec.encode(envelope)
+    )
+
+
+async def test_concurrent_misses_share_one_load():
+    loader = CountingLoader({"id": 1, "name": "a"})
+
+    results = await asyncio.gather(*(manager().get_or_set(loader) for _ in range(10)))
+
+    assert loader.calls == 1
+    assert results == [{"id": 1, "name": "a"}] * 10
+    assert not cache._inflight
+
+
+async def test_hits_skip_the_loader():
+    loader = CountingLoader({"id": 1, "name": "a"})
+    await manager().get_or_set(loader, beta=0)
+    await manager().get_or_set(loader, beta=0)
+
+    assert loader.calls == 1
+
+
+async def test_hits_and_misses_return_the_same_type():
+    loader = CountingLoader(Item(id=1, name="a"))
+
+    miss = await manager(model_class=Item).get_or_set(loader, beta=0)
+    hit = await manager(model_class=Item).get_or_set(loader, beta=0)
+
+    assert miss == hit == Item(id=1, name="a")
+
+
+async def test_loader_errors_propagate_and_are_not_cached():
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await manager().get_or_set(failing)
+
+    assert not cache._inflight
+    assert await manager().get_or_set(CountingLoader("ok")) == "ok"
+
+
+async def test_stale_values_are_served_while_refreshing(redis_client):
+    await manager().get_or_set(CountingLoader("old"), stale_ttl=30)
+    await expire_envelope(redis_client)
+    loader = CountingLoader("new")
+
+    assert await manager().get_or_set(loader, stale_ttl=30) == "old"
+
+    await asyncio.sleep(0.1)
+    assert loader.calls == 1
+    assert await manager().get_or_set(loader, stale_ttl=30, beta=0) == "new"
+
+
+async def test_expired_values_without_stale_window_are_reloaded(redis_client):
+    await manager().get_or_set(CountingLoader("old"))
+    await expire_envelope(redis_client)
+
+    assert await manager().get_or_set(CountingLoader("new")) == "new"
+
+
+async def test_early_refresh_returns_the_cached_value(monkeypatch):
+    await manager().get_or_set(CountingLoader("old"))
+    loader = CountingLoader("new")
+
+    # 0.05s loader * beta * -log(random()) lands past the 60s TTL
+    monkeypatch.setattr(cache.random, "random", lambda: 0.5)
+    assert await manager().get_or_set(loader, beta=1_000_000) == "old"
+
+    await asyncio.sleep(0.1)
+    assert loader.calls == 1
+
+
+async def test_lock_waits_for_the_holder(redis_client):
+    cache_key = generate_cache_key({"id": 1}, "gos")
+    await redis_client.set(f"{cache_key}:lock", "other-worker")
+    loader = CountingLoader("mine")
+
+    async def holder():
+        await asyncio.sleep(0.1)
+        cache_manager = manager()
+        envelope = {"v": "theirs", "d": 0.1, "e": time.time() + 60}
+        await cache_manager.redis_client.set(
+            cache_key, cache_manager.codec.encode(envelope)
+        )
+
+    result, _ = await asyncio.gather(
+        manager().get_or_set(loader, lock=True, lock_timeout=2), holder()
+    )
+
+    assert result == "theirs"
+    assert loader.calls == 0
+
+
+async def test_lock_is_released_after_loading(redis_client):
+    cache_key = generate_cache_key({"id": 1}, "gos")
+
+    await manager().get_or_set(CountingLoader("a"), lock=True)
+
+    assert not await redis_client.exists(f"{cache_key}:lock")
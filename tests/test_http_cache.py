@@ -0,0 +1,186 @@
+import asyncio
+from contextlib import suppress
+
+import httpx
+import pytest
+
+from app.common.cache import local_cache
+from app.common.exceptions import BadGatewayError
+from app.external import _request
+from app.external._cache import freshness_lifetime, parse_cache_control
+from app.external._request import InternalRequestClient
+from tests.conftest import UPSTREAM_URL
+
+pytestmark = pytest.mark.usefixtures("redis_server")
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    local_cache.clear()
+    yield
+    local_cache.clear()
+
+
+def response(status_code: int = 200, **headers: str) -> httpx.Response:
+    return httpx.Response(
+        status_code,
+        json={"id": 1},
+        headers={name.replace("_", "-"): value for name, value in headers.items()},
+    )
+
+
+def test_parse_cache_control():
+    assert parse_cache_control('public, max-age=60, no-cache="set-cookie"') == {
+        "public": None,
+        "max-age": "60",
+        "no-cache": "set-cookie",
+    }
+    assert parse_cache_control(None) == {}
+
+
+@pytest.mark.parametrize(
+    "headers, lifetime",
+    [
+        ({"cache_control": "max-age=60"}, 60),
+        ({"cache_control": "max-age=60", "age": "20"}, 40),
+        ({"cache_control": "max-age=10", "age": "20"}, 0),
+        ({"cache_control": "max-age=bad"}, 0),
+        ({"cache_control": "no-cache, max-age=60"}, 0),
+        ({"cache_control": "no-store, max-age=60"}, None),
+        (
+            {
+                "date": "Mon, 01 Jan 2024 00:00:00 GMT",
+                "expires": "Mon, 01 Jan 2024 00:01:00 GMT",
+            },
+            60,
+        ),
+        ({"expires": "0"}, 0),
+        ({}, 0),
+    ],
+)
+def test_freshness_lifetime(headers, lifetime):
+    assert freshness_lifetime(response(**headers)) == lifetime
+
+
+@pytest.mark.parametrize("backend", ["local", "redis"])
+async def test_fresh_responses_are_served_from_the_cache(upstream, backend):
+    upstream.responses = [response(cache_control="max-age=60")]
+    client = InternalRequestClient(UPSTREAM_URL, cache=backend)
+
+    first = await client.get("/items/1", params={"a": 1})
+    second = await client.get("/items/1", params={"a": 1})
+
+    assert len(upstream.requests) == 1
+    assert second.json() == first.json() == {"id": 1}
+    assert second.headers["cache-control"] == "max-age=60"
+    assert second.request.url == first.request.url
+
+
+async def test_requests_are_cached_by_params_and_headers(upstream):
+    upstream.responses = [response(cache_control="max-age=60")]
+    client = InternalRequestClient(UPSTREAM_URL, cache="local")
+
+    await client.get("/items", params={"page": 1})
+    await client.get("/items", params={"page": 2})
+    await client.get("/items", params={"page": 1}, headers={"Authorization": "a"})
+    await client.get("/items", params={"page": 1})
+
+    assert len(upstream.requests) == 3
+
+
+@pytest.mark.parametrize(
+    "stored",
+    [
+        response(cache_control="no-store"),
+        response(cache_control="max-age=0"),
+        response(500, cache_control="max-age=60"),
+        response(201, cache_control="max-age=60"),
+    ],
+)
+async def test_uncacheable_responses_are_not_stored(upstream, stored):
+    upstream.responses = [stored]
+    client = InternalRequestClient(UPSTREAM_URL, cache="local", retries=0)
+
+    for _ in range(2):
+        with suppress(BadGatewayError):
+            await client.get("/items")
+
+    assert len(upstream.requests) == 2
+
+
+@pytest.mark.parametrize("backend", ["local", "redis"])
+async def test_stale_responses_are_revalidated(upstream, backend):
+    upstream.responses = [
+        response(cache_control="no-cache", etag='"v1"'),
+        httpx.Response(304, headers={"cache-control": "max-age=60", "etag": '"v1"'}),
+        response(cache_control="no-cache", etag='"v2"'),
+    ]
+    client = InternalRequestClient(UPSTREAM_URL, cache=backend)
+
+    await client.get("/items/1")
+    revalidated = await client.get("/items/1")
+    cached = await client.get("/items/1")
+
+    assert upstream.requests[1].headers["if-none-match"] == '"v1"'
+    assert revalidated.status_code == 200
+    assert revalidated.json() == {"id": 1}
+    # The 304's headers made the entry fresh again
+    assert cached.headers["cache-control"] == "max-age=60"
+    assert len(upstream.requests) == 2
+
+
+async def test_last_modified_is_revalidated(upstream):
+    last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+    upstream.responses = [
+        response(cache_control="no-cache", last_modified=last_modified),
+        response(cache_control="no-cache", last_modified=last_modified),
+    ]
+    client = InternalRequestClient(UPSTREAM_URL, cache="local")
+
+    await client.get("/items/1")
+    await client.get("/items/1")
+
+    assert upstream.requests[1].headers["if-modified-since"] == last_modified
+
+
+async def test_concurrent_gets_are_coalesced(upstream):
+    upstream.delay = 0.05
+    upstream.responses = [response(), response()]
+    client = InternalRequestClient(UPSTREAM_URL, coalesce=True)
+
+    responses = await asyncio.gather(*(client.get("/items/1") for _ in range(5)))
+    other = await client.get("/items/2")
+
+    assert len(upstream.requests) == 2
+    assert all(response is responses[0] for response in responses)
+    assert other is not responses[0]
+    assert _request._inflight == {}
+
+
+async def test_coalesced_failures_reach_every_caller(upstream):
+    upstream.delay = 0.05
+    upstream.responses = [response(503)]
+    client = InternalRequestClient(UPSTREAM_URL, coalesce=True, retries=0)
+
+    results = await asyncio.gather(
+        *(client.get("/items/1") for _ in range(3)), return_exceptions=True
+    )
+
+    assert len(upstream.requests) == 1
+    assert all(isinstance(result, BadGatewayError) for result in results)
+    assert _request._inflight == {}
+
+
+async def test_cancelled_callers_do_not_cancel_the_shared_request(upstream):
+    upstream.delay = 0.05
+    upstream.responses = [response()]
+    client = InternalRequestClient(UPSTREAM_URL, coalesce=True)
+
+    cancelled = asyncio.create_task(client.get("/items/1"))
+    await asyncio.sleep(0.01)
+    waiting = asyncio.create_task(client.get("/items/1"))
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+
+    assert (await waiting).json() == {"id": 1}
+    assert len(upstream.requests) == 1
@@ -0,0 +1,157 @@
+import httpx
+import pytest
+
+from app.common.exceptions import BadGatewayError
+from app.core import http
+from app.core.http import CircuitBreaker, http_client_registry
+from app.external._request import InternalRequestClient
+from tests.conftest import UPSTREAM_URL
+
+
+@pytest.fixture
+def now(monkeypatch) -> list[float]:
+    clock = [0.0]
+    monkeypatch.setattr(http.time, "monotonic", lambda: clock[0])
+    return clock
+
+
+async def test_responses_are_returned(upstream):
+    upstream.responses = [httpx.Response(200, json={"ok": True})]
+
+    async with InternalRequestClient(UPSTREAM_URL) as client:
+        response = await client.get("/items", params={"page": 2})
+
+    assert response.json() == {"ok": True}
+    assert str(upstream.requests[0].url) == f"{UPSTREAM_URL}/items?page=2"
+
+
+async def test_client_errors_are_returned_without_retries(upstream):
+    upstream.responses = [httpx.Response(404)]
+    client = InternalRequestClient(UPSTREAM_URL)
+
+    response = await client.get("/missing")
+
+    assert response.status_code == 404
+    assert len(upstream.requests) == 1
+    assert client.breaker.failures == 0
+
+
+async def test_idempotent_requests_are_retried(upstream):
+    upstream.responses = [
+        httpx.Response(503),
+        httpx.ConnectError("refused"),
+        httpx.Response(200),
+    ]
+
+    response = await InternalRequestClient(UPSTREAM_URL).put("/items/1", json={})
+
+    assert response.status_code == 200
+    assert len(upstream.requests) == 3
+
+
+async def test_posts_are_only_retried_when_not_sent(upstream):
+    upstream.responses = [httpx.ConnectError("refused"), httpx.Response(503)]
+    client = InternalRequestClient(UPSTREAM_URL)
+
+    with pytest.raises(BadGatewayError) as exc_info:
+        await client.post("/items", json={"name": "a"})
+
+    assert len(upstream.requests) == 2
+    assert exc_info.value.response_status_code == 503
+    assert exc_info.value.payload == {"name": "a"}
+    assert exc_info.value.attempts == 2
+
+
+async def test_read_timeouts_are_not_retried(upstream):
+    upstream.responses = [httpx.ReadTimeout("slow")]
+
+    with pytest.raises(BadGatewayError, match="ReadTimeout"):
+        await InternalRequestClient(UPSTREAM_URL).get("/slow")
+
+    assert len(upstream.requests) == 1
+
+
+async def test_exhausted_retries_count_as_one_failure(upstream):
+    upstream.responses = [httpx.Response(502, text="down")]
+    client = InternalRequestClient(UPSTREAM_URL, retries=2, service="upstream")
+
+    with pytest.raises(BadGatewayError) as exc_info:
+        await client.get("/items")
+
+    assert len(upstream.requests) == 3
+    assert exc_info.value.attempts == 3
+    assert exc_info.value.service == "upstream"
+    assert exc_info.value.response == "down"
+    assert client.breaker.failures == 1
+
+
+async def test_open_breaker_rejects_calls(upstream, monkeypatch):
+    monkeypatch.setattr(http.settings, "HTTP_CLIENT_BREAKER_FAILURE_THRESHOLD", 2)
+    upstream.responses = [httpx.Response(500)]
+    client = InternalRequestClient(UPSTREAM_URL, retries=0)
+
+    for _ in range(2):
+        with pytest.raises(BadGatewayError):
+            await client.get("/items")
+    with pytest.raises(BadGatewayError, match="Circuit breaker open"):
+        await client.get("/items")
+
+    assert len(upstream.requests) == 2
+    assert http_client_registry.stats()[UPSTREAM_URL] == {
+        "state": "open",
+        "failures": 2,
+        "rejected": 1,
+    }
+
+
+async def test_clients_of_an_upstream_share_the_pool_and_breaker(upstream):
+    first = InternalRequestClient(UPSTREAM_URL)
+    second = InternalRequestClient(UPSTREAM_URL, timeout=1)
+
+    assert first.client is second.client
+    assert first.breaker is second.breaker
+
+    # Clients outliving the lifespan get a new pool
+    pool = first.client
+    await http_client_registry.close()
+    assert pool.is_closed
+    assert first.client is not pool
+    assert first.client is second.client
+
+
+def test_breaker_half_open_trial(now):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] = 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # One trial at a time
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats() == {"state": "closed", "failures": 0, "rejected": 2}
+
+
+def test_breaker_trial_expires(now):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    now[0] = 30
+    assert breaker.allow()
+    now[0] = 59
+    assert not breaker.allow()
+    # The trial never reported back
+    now[0] = 60
+    assert breaker.allow()
@@ -0,0 +1,128 @@
+import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.common.crud import CRUDBase
+from app.common.exceptions import BadRequest
+from app.common.paginators import (
+    decode_cursor,
+    encode_cursor,
+    get_keyset_pagination_metadata,
+    keyset_paginate,
+)
+from tests.models import Item
+
+SORT_KEYS = [Item.created_at, Item.id]
+START = datetime.datetime(2024, 1, 1, 12, 0, 0, 123456)
+
+
+@pytest.fixture
+async def items(db_session):
+    # Pairs of rows share a timestamp, the id breaks the ties
+    data = [
+        {"name": str(i), "created_at": START + datetime.timedelta(minutes=i // 2)}
+        for i in range(10)
+    ]
+    return await CRUDBase(Item, db_session).create_many(data=data)
+
+
+async def fetch_page(db_session, cursor=None, order_by="desc", size=3):
+    qs = await keyset_paginate(
+        qs=select(Item),
+        sort_keys=SORT_KEYS,
+        size=size,
+        cursor=cursor,
+        order_by=order_by,
+    )
+    rows = (await db_session.execute(qs)).scalars().all()
+    return await get_keyset_pagination_metadata(
+        items=rows, sort_keys=SORT_KEYS, size=size, cursor=cursor, order_by=order_by
+    )
+
+
+def ordered_ids(items, order_by: str) -> list[int]:
+    ordered = sorted(items, key=lambda item: (item.created_at, item.id))
+    ids = [item.id for item in ordered]
+    return ids if order_by == "asc" else ids[::-1]
+
+
+@pytest.mark.parametrize("order_by", ["asc", "desc"])
+async def test_walks_every_page_forward_and_back(db_session, items, order_by):
+    pages = []
+    cursor = None
+    while True:
+        page, metadata = await fetch_page(db_session, cursor, order_by)
+        pages.append([item.id for item in page])
+        assert metadata["has_prev_page"] == (len(pages) > 1)
+        cursor = metadata["next_cursor"]
+        if cursor is None:
+            assert not metadata["has_next_page"]
+            break
+
+    assert [item_id for page in pages for item_id in page] == ordered_ids(
+        items, order_by
+    )
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+
+    # Back from the last page with the prev cursors
+    backwards = [pages[-1]]
+    cursor = metadata["prev_cursor"]
+    while cursor is not None:
+        page, metadata = await fetch_page(db_session, cursor, order_by)
+        backwards.append([item.id for item in page])
+        cursor = metadata["prev_cursor"]
+
+    assert backwards[::-1] == pages
+    assert not metadata["has_prev_page"] and metadata["has_next_page"]
+
+
+async def test_empty_result(db_session):
+    page, metadata = await fetch_page(db_session)
+
+    assert page == []
+    assert metadata["next_cursor"] is None and metadata["prev_cursor"] is None
+
+
+def test_cursor_values_get_their_column_types_back():
+    cursor = encode_cursor(values=[START, 7], direction="next", order_by="desc")
+
+    values, direction = decode_cursor(
+        cursor=cursor, sort_keys=SORT_KEYS, order_by="desc"
+    )
+
+    assert values == [START, 7]
+    assert isinstance(values[0], datetime.datetime)
+    assert direction == "next"
+
+
+def test_tampered_cursors_are_rejected():
+    cursor = encode_cursor(values=[START, 7], direction="next", order_by="desc")
+    payload, signature = cursor.split(".")
+    forged = encode_cursor(values=[START, 8], direction="next", order_by="desc")
+
+    for bad in (
+        f"{forged.split('.')[0]}.{signature}",
+        f"{payload}.{signature[:-2]}AA",
+        payload,
+        "garbage",
+        "",
+    ):
+        with pytest.raises(BadRequest):
+            decode_cursor(cursor=bad, sort_keys=SORT_KEYS, order_by="desc")
+
+
+def test_cursors_are_bound_to_the_sort():
+    cursor = encode_cursor(values=[START, 7], direction="next", order_by="desc")
+
+    with pytest.raises(BadRequest):
+        decode_cursor(cursor=cursor, sort_keys=SORT_KEYS, order_by="asc")
+    with pytest.raises(BadRequest):
+        decode_cursor(cursor=cursor, sort_keys=[Item.id], order_by="desc")
+
+
+def test_uncoercible_values_are_rejected():
+    cursor = encode_cursor(values=["not a date", 7], direction="next", order_by="desc")
+
+    with pytest.raises(BadRequest):
+        decode_cursor(cursor=cursor, sort_keys=SORT_KEYS, order_by="desc")
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import event
+
+from app.common.cache import CacheManager, local_cache
+from app.common.crud import CRUDBase
+from app.common.loaders import CRUDLoader
+from tests.models import Item, Owner
+
+
+class ItemSchema(BaseModel):
+    id: int
+    name: str
+
+
+@pytest.fixture
+async def crud(db_session):
+    crud = CRUDBase(Item, db_session)
+    await crud.create_many(data=[{"name": f"item {i}"} for i in range(1, 6)])
+    return crud
+
+
+@pytest.fixture
+def selects(db_engine):
+    statements = []
+
+    @event.listens_for(db_engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, *args):  # pylint: disable=unused-argument
+        if statement.startswith("SELECT"):
+            statements.append(statement)
+
+    return statements
+
+
+async def test_loads_of_a_tick_share_one_query(crud, selects):
+    loader = CRUDLoader(crud)
+
+    items = await asyncio.gather(*(loader.load(key) for key in (3, 1, 3, 99, 2)))
+
+    assert [item and item.id for item in items] == [3, 1, 3, None, 2]
+    assert len(selects) == 1
+
+
+async def test_loads_are_memoized(crud, selects):
+    loader = CRUDLoader(crud)
+    first = await loader.load(1)
+
+    assert await loader.load(1) is first
+    assert await loader.load_many([1, 2]) == [first, await loader.load(2)]
+    assert len(selects) == 2
+
+
+async def test_loads_of_different_ticks_are_different_queries(crud, selects):
+    loader = CRUDLoader(crud)
+    await loader.load(1)
+    await loader.load(2)
+
+    assert len(selects) == 2
+
+
+async def test_clear_and_prime(crud, selects):
+    loader = CRUDLoader(crud)
+    await loader.load(1)
+
+    loader.clear(1)
+    await loader.load(1)
+    assert len(selects) == 2
+
+    loader.prime(2, "primed")
+    assert await loader.load(2) == "primed"
+
+    loader.clear()
+    await loader.load_many([1, 2])
+    assert len(selects) == 3
+
+
+async def test_other_fields(crud):
+    loader = CRUDLoader(crud, field="name")
+
+    item = await loader.load("item 4")
+
+    assert item.id == 4
+
+
+async def test_errors_reach_every_load_and_are_not_memoized(crud, monkeypatch):
+    loader = CRUDLoader(crud)
+
+    async def fail(**kwargs):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(crud, "get_in", fail)
+    results = await asyncio.gather(
+        loader.load(1), loader.load(2), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    monkeypatch.undo()
+    assert (await loader.load(1)).id == 1
+
+
+async def test_loaders_sharing_a_session_take_turns(crud, db_session):
+    owners = CRUDBase(Owner, db_session)
+    await owners.create_many(data=[{"name": "owner"}])
+    items_loader, owners_loader = CRUDLoader(crud), CRUDLoader(owners)
+
+    item, owner = await asyncio.gather(items_loader.load(1), owners_loader.load(1))
+
+    assert item.id == 1 and owner.name == "owner"
+
+
+async def test_cached_loads(crud, selects, redis_server):  # pylint: disable=unused-argument
+    local_cache.clear()
+    cache = CacheManager(ttl=60, cache_prefix="items:", model_class=ItemSchema)
+
+    first = await CRUDLoader(crud, cache=cache).load_many([1, 2])
+    second = await CRUDLoader(crud, cache=cache).load_many([1, 2, 3])
+
+    assert first == [ItemSchema(id=1, name="item 1"), ItemSchema(id=2, name="item 2")]
+    assert second[:2] == first
+    assert second[2] == ItemSchema(id=3, name="item 3")
+    # The second loader only queried the key missing from the cache
+    assert len(selects) == 2
+    assert selects[1].count("?") == 1
+
+
+@pytest.mark.usefixtures("redis_server")
+def test_cache_requires_a_model_class(crud):
+    with pytest.raises(ValueError):
+        CRUDLoader(crud, cache=CacheManager(ttl=60, cache_prefix="items:"))
@@ -0,0 +1,177 @@
+import logging
+import queue
+
+import httpx
+import orjson
+import pytest
+from fastapi import FastAPI
+
+from app.core import logger as logger_module
+from app.core.database import InstrumentedNullPool, InstrumentedQueuePool
+from app.core.handlers import base_exception_handler
+from app.core.logger import (
+    ContextQueueHandler,
+    ErrorSampler,
+    JSONFormatter,
+    LoggingPipeline,
+    get_logger,
+    request_id_var,
+)
+from app.core.middlewares import RequestIdMiddleware
+
+
+def make_record(msg: str = "hello", *, level: int = logging.INFO, **extra):
+    record = logging.LogRecord("app.test", level, __file__, 10, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.fixture
+def captured():
+    """
+    Records of the app loggers, as prepared for the listener thread
+    """
+    log_queue: queue.Queue = queue.Queue()
+    handler = ContextQueueHandler(log_queue)
+    app_logger = logging.getLogger("app")
+    app_logger.addHandler(handler)
+    yield log_queue
+    app_logger.removeHandler(handler)
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+    app.add_exception_handler(Exception, base_exception_handler)
+
+    @app.get("/id")
+    async def current_id():
+        return {"request_id": request_id_var.get()}
+
+    @app.get("/error")
+    async def error():
+        raise RuntimeError("boom")
+
+    return app
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=make_app(), raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+def test_json_formatter_adds_the_request_id_and_extra_fields():
+    record = make_record("user %s", request_id="abc", user_id=3)
+    record.args = ("joined",)
+
+    data = orjson.loads(JSONFormatter().format(record))
+
+    assert data["message"] == "user joined"
+    assert data["level"] == "INFO"
+    assert data["logger"] == "app.test"
+    assert data["request_id"] == "abc"
+    assert data["user_id"] == 3
+    assert "suppressed" not in data
+
+
+def test_error_sampler_drops_repeated_errors(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(logger_module.time, "monotonic", lambda: now[0])
+    sampler = ErrorSampler(limit=2, window=60)
+
+    passed = [sampler.filter(make_record(level=logging.ERROR)) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert sampler.filter(make_record("other", level=logging.ERROR))
+    assert sampler.filter(make_record(level=logging.WARNING))
+
+    now[0] = 61
+    record = make_record(level=logging.ERROR)
+    assert sampler.filter(record)
+    assert record.suppressed == 3
+
+
+def test_queue_handler_captures_the_request_id_and_traceback():
+    handler = ContextQueueHandler(queue.Queue())
+    token = request_id_var.set("req-1")
+    try:
+        try:
+            raise ValueError("bad")
+        except ValueError as exc:
+            record = make_record("failed %s", level=logging.ERROR)
+            record.args = ("here",)
+            record.exc_info = (type(exc), exc, exc.__traceback__)
+            prepared = handler.prepare(record)
+    finally:
+        request_id_var.reset(token)
+
+    assert prepared.request_id == "req-1"
+    assert prepared.msg == "failed here"
+    assert prepared.exc_info is None
+    assert "ValueError: bad" in prepared.exc_text
+
+
+def test_queue_handler_drops_records_when_full():
+    handler = ContextQueueHandler(queue.Queue(maxsize=1))
+
+    handler.emit(make_record())
+    handler.emit(make_record())
+
+    assert handler.dropped == 1
+
+
+def test_pipeline_writes_json_lines(capsys):
+    app_logger = logging.getLogger("app")
+    level, propagate = app_logger.level, app_logger.propagate
+    pipeline = LoggingPipeline()
+    pipeline.start()
+    try:
+        get_logger("app.test").info("started", extra={"port": 80})
+    finally:
+        pipeline.stop()
+        app_logger.setLevel(level)
+        app_logger.propagate = propagate
+    pipeline.stop()
+
+    (line,) = capsys.readouterr().out.splitlines()
+    data = orjson.loads(line)
+    assert data["message"] == "started"
+    assert data["port"] == 80
+    assert app_logger.handlers == []
+
+
+def test_get_logger_keeps_loggers_under_the_app_logger():
+    assert get_logger("app.core.x").name == "app.core.x"
+    assert get_logger("worker").name == "app.worker"
+
+
+def test_pool_loggers_stay_at_warning():
+    for pool_class in (InstrumentedQueuePool, InstrumentedNullPool):
+        pool_logger = logging.getLogger(
+            f"{pool_class.__module__}.{pool_class.__name__}"
+        )
+        assert pool_logger.getEffectiveLevel() == logging.WARNING
+
+
+async def test_request_id_is_returned_and_reset(client):
+    response = await client.get("/id", headers={"X-Request-ID": "abc-1"})
+    generated = await client.get("/id", headers={"X-Request-ID": "not valid!"})
+
+    assert response.json() == {"request_id": "abc-1"}
+    assert response.headers["x-request-id"] == "abc-1"
+    assert generated.headers["x-request-id"] == generated.json()["request_id"]
+    assert generated.headers["x-request-id"] != "not valid!"
+    assert request_id_var.get() is None
+
+
+async def test_unhandled_errors_are_logged_with_the_request_id(client, captured):
+    response = await client.get("/error", headers={"X-Request-ID": "abc-2"})
+
+    assert response.status_code == 500
+    assert response.json()["error"]["msg"] == "Internal Server Error"
+    assert response.headers["x-request-id"] == "abc-2"
+    record = captured.get_nowait()
+    assert record.request_id == "abc-2"
+    assert "RuntimeError: boom" in record.exc_text
+    assert request_id_var.get() is None
@@ -0,0 +1,111 @@
+import pytest
+from pydantic import BaseModel
+from pymongo import DeleteOne, InsertOne, UpdateMany
+
+from app.common.crud import AsyncMongoCRUDBase
+from tests.models import Document
+
+
+class Name(BaseModel):
+    name: str
+
+
+class CountingCollection:
+    """
+    Counts the calls made to a collection
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls: list[str] = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(self.collection, name)
+
+
+@pytest.fixture
+def collection(mongo_collection):
+    return CountingCollection(mongo_collection)
+
+
+@pytest.fixture
+def crud(collection):
+    return AsyncMongoCRUDBase(Document, collection)
+
+
+async def test_insert_many_in_batches(crud, collection):
+    ids = await crud.insert_many(
+        [{"name": str(i), "price": i} for i in range(5)], batch_size=2
+    )
+
+    assert len(ids) == 5
+    assert collection.calls == ["insert_many"] * 3
+    assert len(await crud.find_many({})) == 5
+
+
+async def test_bulk_write_sums_the_counts(crud, collection):
+    await crud.insert_many([{"name": "a", "price": 1}, {"name": "b", "price": 1}])
+
+    counts = await crud.bulk_write(
+        [
+            InsertOne({"name": "c", "price": 2}),
+            UpdateMany({"price": 1}, {"$set": {"price": 3}}),
+            DeleteOne({"name": "a"}),
+        ],
+        batch_size=2,
+    )
+
+    assert counts == {
+        "inserted": 1,
+        "matched": 2,
+        "modified": 2,
+        "deleted": 1,
+        "upserted": 0,
+    }
+    assert collection.calls.count("bulk_write") == 2
+
+
+async def test_find_many_filters_sorts_and_pages(crud):
+    await crud.insert_many([{"name": str(i), "price": i % 3} for i in range(6)])
+
+    docs = await crud.find_many(
+        {"price": {"$gt": 0}}, sort=[("price", -1), ("name", 1)], skip=1, limit=2
+    )
+
+    assert [(doc.name, doc.price) for doc in docs] == [("5", 2), ("1", 1)]
+    assert all(isinstance(doc, Document) for doc in docs)
+
+
+async def test_find_many_projections(crud):
+    await crud.insert_many([{"name": "a", "price": 1}])
+
+    (projected,) = await crud.find_many(
+        {}, projection={"name": 1, "_id": 0}, model=Name
+    )
+    (raw,) = await crud.find_many({}, projection=["name"], raw=True)
+
+    assert projected == Name(name="a")
+    assert set(raw) == {"_id", "name"}
+
+
+async def test_trusted_documents_skip_validation(crud):
+    await crud.insert_many([{"name": "a", "price": "not an int"}])
+
+    (doc,) = await crud.find_many({}, trusted=True)
+
+    assert doc.price == "not an int"
+    with pytest.raises(ValueError):
+        await crud.find_many({})
+
+
+async def test_stream_yields_every_document(crud):
+    await crud.insert_many([{"name": str(i)} for i in range(5)])
+
+    names = [
+        doc.name async for doc in crud.stream({}, sort=[("name", 1)], batch_size=2)
+    ]
+    raw = [doc async for doc in crud.stream({"name": "0"}, raw=True)]
+
+    assert names == ["0", "1", "2", "3", "4"]
+    assert raw[0]["name"] == "0"
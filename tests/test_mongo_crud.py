@@ -0,0 +1,60 @@
+import pytest
+from bson import ObjectId
+
+from app.common.crud import AsyncMongoCRUDBase
+from app.core import mongo
+from tests.models import Document
+
+
+@pytest.fixture
+def crud(mongo_collection):
+    return AsyncMongoCRUDBase(Document, mongo_collection)
+
+
+async def test_create_and_get(crud):
+    created = await crud.create({"name": "a", "price": 1})
+
+    assert isinstance(created.id, ObjectId)
+    assert await crud.get({"_id": created.id}) == created
+    assert await crud.get({"name": "missing"}) is None
+
+
+async def test_create_does_not_mutate_the_data(crud):
+    data = {"name": "a"}
+    await crud.create(data)
+
+    assert data == {"name": "a"}
+
+
+async def test_update_returns_the_updated_document(crud):
+    created = await crud.create({"name": "a", "price": 1})
+
+    updated = await crud.update({"_id": created.id}, {"price": 2})
+
+    assert updated.price == 2
+    assert updated.id == created.id
+    assert await crud.update({"name": "missing"}, {"price": 2}) is None
+
+
+async def test_delete(crud):
+    created = await crud.create({"name": "a"})
+
+    assert await crud.delete(str(created.id)) is True
+    assert await crud.delete(str(created.id)) is False
+    assert await crud.get({"_id": created.id}) is None
+
+
+async def test_registry_shares_one_client(monkeypatch):
+    monkeypatch.setattr(
+        mongo.settings, "MONGO_DATABASE_URL", "mongodb://localhost:27017/app"
+    )
+    registry = mongo.MongoClientRegistry()
+
+    collection = registry.get_collection("items")
+
+    assert registry.init() is registry.client
+    assert collection.database.name == "app"
+    assert registry.get_collection("items", database="other").database.name == "other"
+
+    await registry.close()
+    assert registry.client is None
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+from argon2 import PasswordHasher
+
+from app.common import security
+from app.common.security import (
+    PasswordHashingPool,
+    hash_password,
+    verify_and_update_password,
+    verify_password,
+)
+
+
+async def test_hash_and_verify():
+    hashed = await hash_password(raw="secret")
+
+    assert hashed.startswith("$argon2")
+    assert await verify_password(raw="secret", hashed=hashed)
+    assert not await verify_password(raw="wrong", hashed=hashed)
+
+
+async def test_up_to_date_hashes_are_kept():
+    hashed = await hash_password(raw="secret")
+
+    assert await verify_and_update_password(raw="secret", hashed=hashed) == (
+        True,
+        None,
+    )
+    assert await verify_and_update_password(raw="wrong", hashed=hashed) == (
+        False,
+        None,
+    )
+
+
+async def test_outdated_hashes_are_rehashed():
+    outdated = PasswordHasher(
+        time_cost=security.ph.time_cost + 1, memory_cost=security.ph.memory_cost
+    ).hash("secret")
+
+    valid, new_hash = await verify_and_update_password(raw="secret", hashed=outdated)
+
+    assert valid
+    assert new_hash != outdated
+    assert not security.ph.check_needs_rehash(new_hash)
+    assert await verify_password(raw="secret", hashed=new_hash)
+
+
+async def test_pool_runs_at_most_max_workers_at_once():
+    pool = PasswordHashingPool(max_workers=2)
+    lock = threading.Lock()
+    running = peak = 0
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return threading.current_thread().name
+
+    try:
+        names = await asyncio.gather(*(pool.run(work) for _ in range(6)))
+    finally:
+        pool.close()
+
+    assert peak == 2
+    assert all(name.startswith("password-hashing") for name in names)
+    stats = pool.stats()
+    assert stats["completed"] == 6
+    assert stats["running"] == stats["waiting"] == 0
+    assert stats["waiting_max"] >= 4
+    assert stats["wait_time_max"] > 0
+
+
+async def test_pool_does_not_block_the_event_loop():
+    pool = PasswordHashingPool(max_workers=1)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    ticker = asyncio.create_task(tick())
+    try:
+        await pool.run(time.sleep, 0.05)
+    finally:
+        ticker.cancel()
+        pool.close()
+
+    assert ticks > 5
+
+
+async def test_closed_pool_restarts_on_use():
+    pool = PasswordHashingPool(max_workers=1)
+    assert pool.stats()["wait_time_avg"] == 0.0
+
+    assert await pool.run(sum, [1, 2]) == 3
+    pool.close()
+    assert pool.executor is None
+
+    assert await pool.run(sum, [3, 4]) == 7
+    pool.close()
+    assert pool.stats()["completed"] == 2
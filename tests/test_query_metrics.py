@@ -0,0 +1,115 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import instrumentation
+from app.core.instrumentation import (
+    RequestMetrics,
+    current_metrics,
+    instrument_cache,
+    instrument_engine,
+    route_report,
+)
+from app.core.middlewares import QueryMetricsMiddleware
+from tests.models import Item
+
+
+@pytest.fixture(autouse=True)
+def clear_route_report(monkeypatch):
+    monkeypatch.setattr(
+        instrumentation.settings, "QUERY_METRICS_N_PLUS_ONE_THRESHOLD", 3
+    )
+    route_report.routes.clear()
+    yield
+    route_report.routes.clear()
+
+
+@instrument_cache
+async def cache_op():
+    return "cached"
+
+
+def make_app(db_engine, **kwargs) -> FastAPI:
+    instrument_engine(db_engine)
+    app = FastAPI()
+    app.add_middleware(QueryMetricsMiddleware, **kwargs)
+
+    @app.get("/items/{count}")
+    async def items(count: int):
+        async with AsyncSession(db_engine) as session:
+            for item_id in range(count):
+                await session.execute(select(Item).where(Item.id == item_id))
+        await cache_op()
+        return {}
+
+    return app
+
+
+async def get(app: FastAPI, path: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        return await http.get(path)
+
+
+async def test_server_timing_counts_queries_and_cache_ops(db_engine):
+    response = await get(make_app(db_engine), "/items/2")
+
+    server_timing = response.headers["server-timing"]
+    assert 'desc="2 queries"' in server_timing
+    assert 'desc="1 ops"' in server_timing
+    assert "total;dur=" in server_timing
+
+
+async def test_repeated_statements_are_reported_per_route(db_engine):
+    app = make_app(db_engine)
+    await get(app, "/items/1")
+    await get(app, "/items/4")
+
+    report = route_report.report()["/items/{count}"]
+    assert report["requests"] == 2
+    assert report["queries"] == 5
+    assert report["queries_max"] == 4
+    assert report["queries_avg"] == 2.5
+    assert report["cache_ops"] == 2
+    assert list(report["n_plus_one"].values()) == [4]
+
+
+async def test_unsampled_requests_are_not_measured(db_engine):
+    response = await get(make_app(db_engine, sample_rate=0), "/items/2")
+
+    assert "server-timing" not in response.headers
+    assert route_report.report() == {}
+
+
+async def test_server_timing_can_be_disabled(db_engine):
+    response = await get(make_app(db_engine, server_timing=False), "/items/2")
+
+    assert "server-timing" not in response.headers
+    assert route_report.report()["/items/{count}"]["queries"] == 2
+
+
+async def test_unmatched_paths_are_grouped(db_engine):
+    app = make_app(db_engine)
+    await get(app, "/missing/1")
+    await get(app, "/missing/2")
+
+    assert list(route_report.report()) == ["<unmatched>"]
+
+
+async def test_queries_outside_requests_are_not_counted(db_session, db_engine):
+    instrument_engine(db_engine)
+    await db_session.execute(select(Item))
+
+    metrics = RequestMetrics()
+    token = current_metrics.set(metrics)
+    try:
+        await db_session.execute(select(Item))
+        assert await cache_op() == "cached"
+    finally:
+        current_metrics.reset(token)
+
+    await db_session.execute(select(Item))
+    assert metrics.queries == 1
+    assert metrics.cache_ops == 1
@@ -0,0 +1,171 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.common import rate_limit
+from app.common.auth import TokenGenerator, token_revocation_list
+from app.common.exceptions import CustomHTTPException
+from app.common.rate_limit import RateLimiter
+from app.core.handlers import custom_http_exception_handler
+from app.core.middlewares import RateLimitHeadersMiddleware
+
+pytestmark = pytest.mark.usefixtures("redis_server")
+
+
+def make_app(limiter: RateLimiter) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RateLimitHeadersMiddleware)
+    app.add_exception_handler(CustomHTTPException, custom_http_exception_handler)  # type: ignore
+
+    @app.get("/limited", dependencies=[Depends(limiter)])
+    async def limited():
+        return {"ok": True}
+
+    return app
+
+
+async def send(limiter: RateLimiter, count: int, **kwargs) -> list[httpx.Response]:
+    transport = httpx.ASGITransport(app=make_app(limiter))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        return [await http.get("/limited", **kwargs) for _ in range(count)]
+
+
+def remaining(responses: list[httpx.Response]) -> list[int]:
+    return [
+        int(response.headers["ratelimit-remaining"])
+        for response in responses
+        if response.status_code == 200
+    ]
+
+
+async def test_requests_over_the_limit_are_rejected():
+    responses = await send(RateLimiter(times=5, seconds=60, lease=0), 6)
+
+    assert remaining(responses) == [4, 3, 2, 1, 0]
+    rejected = responses[-1]
+    assert rejected.status_code == 429
+    assert rejected.headers["ratelimit-limit"] == "5"
+    assert rejected.headers["ratelimit-remaining"] == "0"
+    assert rejected.headers["ratelimit-policy"] == "5;w=60"
+    assert 0 < int(rejected.headers["retry-after"]) <= 12
+
+
+async def test_leases_spend_tokens_locally(monkeypatch):
+    limiter = RateLimiter(times=5, seconds=60, lease=3)
+    calls = []
+    original = limiter._take
+
+    async def take(key, quantity):
+        calls.append(quantity)
+        return await original(key, quantity)
+
+    monkeypatch.setattr(limiter, "_take", take)
+    responses = await send(limiter, 6)
+
+    # Same headers as without leases, redis is only asked when the lease is spent
+    assert remaining(responses) == [4, 3, 2, 1, 0]
+    assert responses[-1].status_code == 429
+    assert len(calls) == 3
+
+
+async def test_limits_are_per_client():
+    limiter = RateLimiter(times=1, seconds=60, lease=0)
+    app = make_app(limiter)
+
+    statuses = []
+    for client in (("1.1.1.1", 1), ("2.2.2.2", 1), ("1.1.1.1", 1)):
+        transport = httpx.ASGITransport(app=app, client=client)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as http:
+            statuses.append((await http.get("/limited")).status_code)
+
+    assert statuses == [200, 200, 429]
+
+
+async def test_route_limits_are_shared_by_every_client():
+    limiter = RateLimiter(times=1, seconds=60, by="route", lease=0)
+    app = make_app(limiter)
+
+    statuses = []
+    for client in (("1.1.1.1", 1), ("2.2.2.2", 1)):
+        transport = httpx.ASGITransport(app=app, client=client)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as http:
+            statuses.append((await http.get("/limited")).status_code)
+
+    assert statuses == [200, 429]
+
+
+async def test_user_limits_use_the_token_subject():
+    await token_revocation_list.load()
+    generator = TokenGenerator(secret_key="test-secret", expire_in=60)
+    limiter = RateLimiter(
+        times=1, seconds=60, by="user", lease=0, token_generator=generator
+    )
+    alice = await generator.generate("user-1")
+    bob = await generator.generate("user-2")
+
+    statuses = [
+        response.status_code
+        for token in (alice, bob, alice)
+        for response in await send(
+            limiter, 1, headers={"Authorization": f"Bearer {token}"}
+        )
+    ]
+
+    assert statuses == [200, 200, 429]
+
+
+async def test_invalid_tokens_fall_back_to_the_ip():
+    await token_revocation_list.load()
+    generator = TokenGenerator(secret_key="test-secret", expire_in=60)
+    limiter = RateLimiter(
+        times=1, seconds=60, by="user", lease=0, token_generator=generator
+    )
+
+    statuses = [
+        response.status_code
+        for token in ("made-up", "other")
+        for response in await send(
+            limiter, 1, headers={"Authorization": f"Bearer {token}"}
+        )
+    ]
+
+    assert statuses == [200, 429]
+
+
+def test_user_limits_require_a_token_generator():
+    with pytest.raises(ValueError):
+        RateLimiter(times=1, seconds=1, by="user")
+
+
+async def test_custom_identifier():
+    limiter = RateLimiter(
+        times=1,
+        seconds=60,
+        lease=0,
+        identifier=lambda request: request.headers.get("x-tenant", ""),
+    )
+
+    first = await send(limiter, 1, headers={"X-Tenant": "a"})
+    second = await send(limiter, 1, headers={"X-Tenant": "b"})
+    third = await send(limiter, 1, headers={"X-Tenant": "a"})
+
+    assert first[0].status_code == second[0].status_code == 200
+    assert third[0].status_code == 429
+
+
+async def test_redis_failures_fail_open(redis_server):
+    redis_server.connected = False
+
+    responses = await send(RateLimiter(times=1, seconds=60, lease=0), 2)
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert "ratelimit-remaining" not in responses[0].headers
+
+
+async def test_redis_failures_fail_closed(redis_server, monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_FAIL_OPEN", False)
+    redis_server.connected = False
+
+    with pytest.raises(RedisConnectionError):
+        await send(RateLimiter(times=1, seconds=60, lease=0), 1)
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app.common import dependencies
+from app.common.dependencies import db_session, get_read_session, get_session
+from app.core import database
+from app.core.database import ReplicaRouter
+from tests.models import Item, TestBase
+
+
+async def make_database(path, name: str):
+    """
+    A SQLite database whose single item is named after it, to tell where queries went
+    """
+    engine = database.make_engine(f"sqlite+aiosqlite:///{path / name}.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(TestBase.metadata.create_all)
+        await conn.execute(insert(Item).values(name=name))
+    return engine
+
+
+@pytest.fixture
+async def engines(tmp_path, monkeypatch):
+    primary = await make_database(tmp_path, "primary")
+    replicas = [
+        await make_database(tmp_path, "replica1"),
+        await make_database(tmp_path, "replica2"),
+    ]
+    router = ReplicaRouter(replicas, "round_robin")
+
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "replica_router", router)
+    monkeypatch.setattr(
+        dependencies,
+        "AsyncSessionLocal",
+        sessionmaker(bind=primary, class_=AsyncSession, expire_on_commit=False),
+    )
+    yield primary, replicas, router
+
+    for engine in (primary, *replicas):
+        await engine.dispose()
+
+
+async def read_from(session) -> str:
+    return (
+        await session.execute(select(Item.name).order_by(Item.id).limit(1))
+    ).scalar_one()
+
+
+async def test_read_sessions_are_spread_over_the_replicas(engines):
+    seen = []
+    for _ in range(4):
+        async with db_session(read_only=True) as session:
+            seen.append(await read_from(session))
+            # A session sticks to its replica
+            assert await read_from(session) == seen[-1]
+
+    assert seen == ["replica1", "replica2", "replica1", "replica2"]
+
+
+async def test_writes_go_to_the_primary(engines):
+    async with db_session() as session:
+        assert await read_from(session) == "primary"
+
+    async with db_session(read_only=True) as session:
+        session.add(Item(name="new"))
+        await session.flush()
+        await session.commit()
+
+    primary, _, _ = engines
+    async with AsyncSession(primary) as session:
+        names = (await session.execute(select(Item.name))).scalars().all()
+    assert sorted(names) == ["new", "primary"]
+
+
+async def test_reads_fall_back_to_the_primary(engines):
+    _, replicas, router = engines
+    router.down.update(replicas)
+
+    async with db_session(read_only=True) as session:
+        assert await read_from(session) == "primary"
+
+
+async def test_health_checks_update_the_replicas_status(engines, tmp_path):
+    _, replicas, router = engines
+    broken = database.make_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/dir.db")
+    router.engines.append(broken)
+    router.down.add(replicas[0])
+
+    await router.check()
+
+    assert router.down == {broken}
+    await broken.dispose()
+
+
+async def test_least_loaded_picks_the_idlest_replica(engines):
+    _, replicas, _ = engines
+    router = ReplicaRouter(replicas, "least_loaded")
+
+    async with replicas[0].connect():
+        assert router.pick() is replicas[1]
+
+
+async def test_read_your_writes_pins_the_request_to_the_primary(engines, monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "POSTGRES_READ_YOUR_WRITES", True)
+    request = Request({"type": "http", "headers": []})
+
+    read = get_read_session(request)
+    session = await anext(read)
+    assert (await read_from(session)).startswith("replica")
+
+    write = get_session(request)
+    write_session = await anext(write)
+    write_session.add(Item(name="new"))
+    await write_session.commit()
+
+    assert await read_from(session) == "primary"
+    for generator in (read, write):
+        await generator.aclose()
@@ -0,0 +1,141 @@
+import gzip
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from pydantic import BaseModel
+
+from app.common.cache import invalidate_tags
+from app.common.response_cache import cache_response
+
+pytestmark = pytest.mark.usefixtures("redis_server")
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+calls: list[str] = []
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}", response_model=Item)
+    @cache_response(ttl=60, response_model=Item, tags=("items",))
+    async def get_item(item_id: int):
+        calls.append("item")
+        return {"id": item_id, "name": "x" * 1000, "secret": "dropped"}
+
+    @app.get("/me")
+    @cache_response(ttl=60, vary=("authorization",))
+    async def get_me(request: Request):
+        calls.append("me")
+        return {"auth": request.headers.get("authorization")}
+
+    @app.get("/search")
+    @cache_response(ttl=60)
+    async def search(q: str = "", page: int = 1):
+        calls.append("search")
+        return {"q": q, "page": page}
+
+    @app.get("/compressed")
+    @cache_response(ttl=60, precompress=True)
+    async def compressed():
+        calls.append("compressed")
+        return {"data": "x" * 2000}
+
+    return app
+
+
+@pytest.fixture
+async def client():
+    calls.clear()
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+async def test_hits_skip_the_route(client):
+    first = await client.get("/items/1")
+    second = await client.get("/items/1")
+
+    assert calls == ["item"]
+    assert first.json() == second.json() == {"id": 1, "name": "x" * 1000}
+    assert first.headers["etag"] == second.headers["etag"]
+    assert second.headers["cache-control"] == "public, max-age=60"
+
+
+async def test_matching_if_none_match_gets_a_304(client):
+    etag = (await client.get("/items/1")).headers["etag"]
+
+    not_modified = await client.get("/items/1", headers={"If-None-Match": etag})
+    weak = await client.get("/items/1", headers={"If-None-Match": f"W/{etag}"})
+    other = await client.get("/items/1", headers={"If-None-Match": '"other"'})
+
+    assert not_modified.status_code == weak.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert other.status_code == 200
+
+
+async def test_vary_headers_are_part_of_the_key(client):
+    alice = await client.get("/me", headers={"Authorization": "alice"})
+    bob = await client.get("/me", headers={"Authorization": "bob"})
+    await client.get("/me", headers={"Authorization": "alice"})
+
+    assert calls == ["me", "me"]
+    assert alice.json() != bob.json()
+    assert alice.headers["vary"].startswith("authorization")
+    assert alice.headers["cache-control"].startswith("private")
+
+
+async def test_query_param_order_shares_the_entry(client):
+    await client.get("/search?q=a&page=2")
+    await client.get("/search?page=2&q=a")
+    await client.get("/search?page=3&q=a")
+
+    assert calls == ["search", "search"]
+
+
+async def test_precompressed_variants(client):
+    plain = await client.get("/compressed", headers={"Accept-Encoding": "identity"})
+    gzipped = await client.get("/compressed", headers={"Accept-Encoding": "gzip"})
+
+    assert calls == ["compressed"]
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.json() == plain.json()
+    assert gzipped.headers["etag"] != plain.headers["etag"]
+    assert "accept-encoding" in gzipped.headers["vary"]
+
+
+async def test_precompressed_variant_bytes(redis_client):
+    transport = httpx.ASGITransport(app=make_app())
+    async with (
+        httpx.AsyncClient(transport=transport, base_url="http://test") as http,
+        http.stream(
+            "GET", "/compressed", headers={"Accept-Encoding": "gzip"}
+        ) as response,
+    ):
+        body = b"".join([chunk async for chunk in response.aiter_raw()])
+
+    assert gzip.decompress(body) == b'{"data":"' + b"x" * 2000 + b'"}'
+
+
+async def test_invalidating_tags_drops_responses(client):
+    await client.get("/items/1")
+    await invalidate_tags("items")
+    await client.get("/items/1")
+
+    assert calls == ["item", "item"]
+
+
+async def test_redis_failures_serve_the_route_uncached(client, redis_server):
+    redis_server.connected = False
+
+    first = await client.get("/items/1")
+    second = await client.get("/items/1")
+
+    assert first.status_code == second.status_code == 200
+    assert calls == ["item", "item"]
@@ -0,0 +1,146 @@
+import datetime
+from decimal import Decimal
+
+import httpx
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ConfigDict
+
+from app.common.exceptions import CustomHTTPException, NotFound
+from app.common.responses import envelope, envelope_response, error_envelope
+from app.common.schemas import (
+    PaginatedResponseSchema,
+    PaginationSchema,
+    ResponseSchema,
+)
+from app.core.handlers import (
+    custom_http_exception_handler,
+    request_validation_exception_handler,
+)
+from tests.models import Item
+
+
+class ItemSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+
+
+META = PaginationSchema(
+    total_no_items=2,
+    total_no_pages=1,
+    page=1,
+    size=10,
+    count=2,
+    has_next_page=False,
+    has_prev_page=False,
+)
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_exception_handler(CustomHTTPException, custom_http_exception_handler)  # type: ignore
+    app.add_exception_handler(
+        RequestValidationError,
+        request_validation_exception_handler,  # type: ignore
+    )
+
+    @app.get("/items", response_model=PaginatedResponseSchema[list[ItemSchema]])
+    async def item_list():
+        items = [Item(id=1, name="a", price=3), Item(id=2, name="b")]
+        return envelope_response(
+            items, model=list[ItemSchema], from_attributes=True, meta=META
+        )
+
+    @app.get("/items/{item_id}", response_model=ResponseSchema[ItemSchema])
+    async def item_detail(item_id: int):
+        raise NotFound("Item not found", loc=["item_id"])
+
+    return app
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+def test_envelope_matches_the_response_schema():
+    data = {"id": 1, "name": "a"}
+
+    body = envelope(data, msg="Created")
+
+    assert orjson.loads(body) == {"status": "success", "msg": "Created", "data": data}
+    assert (
+        orjson.loads(body)
+        == ResponseSchema[dict](msg="Created", data=data).model_dump()
+    )
+
+
+def test_envelope_dumps_with_the_model():
+    items = [ItemSchema(id=1, name="a"), ItemSchema(id=2, name="b")]
+
+    body = envelope(items, model=list[ItemSchema], meta=META)
+
+    assert orjson.loads(body) == PaginatedResponseSchema[list[ItemSchema]](
+        data=items, meta=META
+    ).model_dump(mode="json")
+
+
+def test_envelope_validates_orm_objects_into_the_model():
+    body = envelope(
+        [Item(id=1, name="a", price=3)], model=list[ItemSchema], from_attributes=True
+    )
+
+    assert orjson.loads(body)["data"] == [{"id": 1, "name": "a"}]
+
+
+def test_envelope_encodes_non_json_types():
+    body = envelope({"price": Decimal("1.5"), "day": datetime.date(2024, 1, 2)})
+
+    assert orjson.loads(body)["data"] == {"price": "1.5", "day": "2024-01-02"}
+
+
+def test_error_envelope():
+    assert orjson.loads(error_envelope("Bad", ["body", "name"])) == {
+        "status": "error",
+        "error": {"msg": "Bad", "loc": ["body", "name"]},
+        "data": None,
+    }
+
+
+async def test_envelope_response_is_sent_as_is(client):
+    response = await client.get("/items")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["data"] == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+    assert response.json()["meta"]["count"] == 2
+
+
+async def test_response_model_still_drives_the_schema(client):
+    schema = (await client.get("/openapi.json")).json()
+
+    response_schema = schema["paths"]["/items"]["get"]["responses"]["200"]
+    assert (
+        "PaginatedResponseSchema"
+        in response_schema["content"]["application/json"]["schema"]["$ref"]
+    )
+
+
+async def test_errors_use_the_error_envelope(client):
+    not_found = await client.get("/items/1")
+    invalid = await client.get("/items/abc")
+
+    assert not_found.status_code == 404
+    assert not_found.json() == {
+        "status": "error",
+        "error": {"msg": "Item not found", "loc": ["item_id"]},
+        "data": None,
+    }
+    assert invalid.status_code == 400
+    assert invalid.json()["error"]["loc"] == ["path", "item_id"]
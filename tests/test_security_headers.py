@@ -0,0 +1,79 @@
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+from app.core.middlewares import SecurityHeadersMiddleware
+
+HEADERS = {
+    "Strict-Transport-Security": "max-age=63072000",
+    "X-Frame-Options": "DENY",
+    "X-Content-Type-Options": "nosniff",
+}
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        SecurityHeadersMiddleware, headers=HEADERS, exempt_paths=("/docs",)
+    )
+
+    @app.get("/plain")
+    async def plain():
+        return {"ok": True}
+
+    @app.get("/framed")
+    async def framed():
+        return Response(b"ok", headers={"x-frame-options": "SAMEORIGIN"})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for chunk in (b"a", b"b", b"c"):
+                yield chunk
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+async def test_headers_are_added(client):
+    response = await client.get("/plain")
+
+    for name, value in HEADERS.items():
+        assert response.headers[name] == value
+    assert response.json() == {"ok": True}
+
+
+async def test_route_headers_are_replaced(client):
+    response = await client.get("/framed")
+
+    assert response.headers.get_list("x-frame-options") == ["DENY"]
+
+
+async def test_streaming_responses_keep_their_body(client):
+    response = await client.get("/stream")
+
+    assert response.text == "abc"
+    assert response.headers["x-content-type-options"] == "nosniff"
+
+
+async def test_errors_get_the_headers(client):
+    response = await client.get("/missing")
+
+    assert response.status_code == 404
+    assert response.headers["x-frame-options"] == "DENY"
+
+
+async def test_exempt_paths_are_untouched(client):
+    response = await client.get("/docs")
+
+    assert response.status_code == 200
+    assert "x-frame-options" not in response.headers
@@ -0,0 +1,79 @@
+import csv
+import io
+
+import orjson
+import pytest
+
+from app.common.crud import CRUDBase
+from app.common.responses import csv_response, ndjson_response
+from tests.models import Item
+
+
+async def aiter_rows(rows):
+    for row in rows:
+        yield row
+
+
+async def chunks(response) -> list[bytes]:
+    return [chunk async for chunk in response.body_iterator]
+
+
+@pytest.fixture
+async def crud(db_session):
+    crud = CRUDBase(Item, db_session)
+    await crud.create_many(data=[{"name": f"item {i}", "price": i} for i in range(7)])
+    return crud
+
+
+async def test_crud_stream_yields_every_row(crud):
+    names = [item.name async for item in crud.stream(yield_per=2)]
+
+    assert names == [f"item {i}" for i in range(7)]
+
+
+async def test_ndjson_streams_rows_in_chunks(crud):
+    response = ndjson_response(
+        crud.stream(),
+        formatter=lambda item: {"name": item.name, "price": item.price},
+        filename="items.ndjson",
+        chunk_size=3,
+    )
+
+    body = await chunks(response)
+
+    assert len(body) == 3
+    lines = b"".join(body).splitlines()
+    assert [orjson.loads(line) for line in lines] == [
+        {"name": f"item {i}", "price": i} for i in range(7)
+    ]
+    assert response.media_type == "application/x-ndjson"
+    assert (
+        response.headers["content-disposition"] == 'attachment; filename="items.ndjson"'
+    )
+
+
+async def test_ndjson_of_no_rows_is_empty():
+    assert await chunks(ndjson_response(aiter_rows([]))) == []
+
+
+async def test_csv_streams_a_header_and_the_rows(crud):
+    response = csv_response(crud.stream(), fields=["name", "price"], chunk_size=5)
+
+    body = await chunks(response)
+
+    assert len(body) == 2
+    rows = list(csv.DictReader(io.StringIO(b"".join(body).decode())))
+    assert rows == [{"name": f"item {i}", "price": str(i)} for i in range(7)]
+    assert response.media_type.startswith("text/csv")
+
+
+async def test_csv_of_dicts_ignores_extra_keys():
+    response = csv_response(aiter_rows([{"a": 1, "b": 2, "c": 3}]), fields=["b", "a"])
+
+    assert b"".join(await chunks(response)) == b"b,a\r\n2,1\r\n"
+
+
+async def test_csv_of_no_rows_sends_the_header():
+    response = csv_response(aiter_rows([]), fields=["a"])
+
+    assert b"".join(await chunks(response)) == b"a\r\n"